@@ -1,3 +1,4 @@
+import queue
 import threading
 import time
 from .sender import send_batch
@@ -10,40 +11,69 @@ LOCK = threading.Lock()
 MAX_SIZE = 50
 FLUSH_INTERVAL = 10
 
+# Full batches waiting for the background worker. Sending (and retrying)
+# happens only on that thread, never on the instrumented call's thread.
+MAX_PENDING_BATCHES = 100
+SEND_QUEUE = queue.Queue(maxsize=MAX_PENDING_BATCHES)
+
+
+def _take(buffer):
+    # Caller holds LOCK.
+    batch = buffer[:]
+    buffer.clear()
+    return batch
+
+
+def _enqueue(event_type, batch):
+    try:
+        SEND_QUEUE.put_nowait((event_type, batch))
+    except queue.Full:
+        print(f"[AegisAI] send queue full, dropped {len(batch)} {event_type} events")
+
 
 def add_ml_event(event):
     with LOCK:
         ML_BUFFER.append(event)
-        if len(ML_BUFFER) >= MAX_SIZE:
-            flush_ml()
+        batch = _take(ML_BUFFER) if len(ML_BUFFER) >= MAX_SIZE else None
+    if batch:
+        _enqueue("ml", batch)
 
 
 def add_llm_event(event):
     with LOCK:
         LLM_BUFFER.append(event)
-        if len(LLM_BUFFER) >= MAX_SIZE:
-            flush_llm()
+        batch = _take(LLM_BUFFER) if len(LLM_BUFFER) >= MAX_SIZE else None
+    if batch:
+        _enqueue("llm", batch)
 
 
 def flush_ml():
-    global ML_BUFFER
-    if ML_BUFFER:
-        send_batch("ml", ML_BUFFER.copy())
-        ML_BUFFER.clear()
+    with LOCK:
+        batch = _take(ML_BUFFER)
+    if batch:
+        send_batch("ml", batch)
 
 
 def flush_llm():
-    global LLM_BUFFER
-    if LLM_BUFFER:
-        send_batch("llm", LLM_BUFFER.copy())
-        LLM_BUFFER.clear()
+    with LOCK:
+        batch = _take(LLM_BUFFER)
+    if batch:
+        send_batch("llm", batch)
 
 
 def background_flusher():
+    next_flush = time.monotonic() + FLUSH_INTERVAL
     while True:
-        time.sleep(FLUSH_INTERVAL)
-        flush_ml()
-        flush_llm()
+        try:
+            event_type, batch = SEND_QUEUE.get(timeout=max(next_flush - time.monotonic(), 0))
+        except queue.Empty:
+            pass
+        else:
+            send_batch(event_type, batch)
+        if time.monotonic() >= next_flush:
+            flush_ml()
+            flush_llm()
+            next_flush = time.monotonic() + FLUSH_INTERVAL
 
 
 def start_background_worker():
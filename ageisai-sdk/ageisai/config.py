@@ -2,3 +2,8 @@ class Config:
     CLIENT_ID = None
     TOKEN = None
     SERVER_URL = "http://localhost:8000"
+    # "json" or "msgpack" (columnar MessagePack; needs the msgpack package)
+    WIRE_FORMAT = "json"
+    # Extra attempts after a timeout, connection error, 429 or 5xx. Retries
+    # resend the same batch and event IDs, so the server drops duplicates.
+    MAX_RETRIES = 2
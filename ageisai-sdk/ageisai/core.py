@@ -7,11 +7,14 @@ from .buffer import start_background_worker
 from .config import Config
 
 
-def init(client_id, client_secret, server_url=None):
+def init(client_id, client_secret, server_url=None, wire_format=None):
 
     if server_url:
         Config.SERVER_URL = server_url
 
+    if wire_format:
+        Config.WIRE_FORMAT = wire_format
+
     Config.CLIENT_ID = client_id
 
     authenticate(client_id, client_secret)
@@ -1,22 +1,87 @@
+import hashlib
+import json
+import time
+import uuid
+
 import requests
 from .config import Config
 
+try:
+    import msgpack
+except ImportError:  # optional: pip install aegisai[msgpack]
+    msgpack = None
+
+MSGPACK_CONTENT_TYPE = "application/msgpack"
+BATCH_ID_HEADER = "X-Batch-ID"
+RETRY_BACKOFF_SECONDS = 0.5
+
+
+def stamp_ids(events):
+    """
+    Give every event an event_id (kept if already set) and return the batch
+    ID, a hash of the batch's event IDs. Both are fixed before the first
+    attempt, so a retry of the same batch carries the same IDs.
+    """
+    for event in events:
+        event.setdefault("event_id", uuid.uuid4().hex)
+    digest = hashlib.sha256("\n".join(event["event_id"] for event in events).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+def encode_batch(events):
+    """
+    Return (body, content_type) for a batch. With WIRE_FORMAT "msgpack" the
+    batch is column-oriented: each key is sent once with a list of values,
+    so repeated keys like model_name and float timestamps stay compact.
+    """
+    if Config.WIRE_FORMAT == "msgpack" and msgpack is not None:
+        keys = []
+        for event in events:
+            for key in event:
+                if key not in keys:
+                    keys.append(key)
+        columns = {key: [event.get(key) for event in events] for key in keys}
+        body = msgpack.packb({"columns": columns}, use_bin_type=True, default=str)
+        return body, MSGPACK_CONTENT_TYPE
+
+    body = json.dumps({"events": events}, default=str).encode("utf-8")
+    return body, "application/json"
+
+
+def _retryable(response):
+    return response.status_code == 429 or response.status_code >= 500
+
 
 def send_batch(event_type, events):
 
     if not Config.TOKEN:
         return
 
+    batch_id = stamp_ids(events)
+    body, content_type = encode_batch(events)
+
     headers = {
-        "Authorization": f"Bearer {Config.TOKEN}"
+        "Authorization": f"Bearer {Config.TOKEN}",
+        "Content-Type": content_type,
+        BATCH_ID_HEADER: batch_id,
     }
 
-    try:
-        requests.post(
-            f"{Config.SERVER_URL}/ingest/{event_type}",
-            json={"events": events},
-            headers=headers,
-            timeout=5
-        )
-    except Exception as e:
-        print("[AegisAI] send failed:", e)
+    for attempt in range(Config.MAX_RETRIES + 1):
+        last_attempt = attempt == Config.MAX_RETRIES
+        try:
+            response = requests.post(
+                f"{Config.SERVER_URL}/ingest/{event_type}",
+                data=body,
+                headers=headers,
+                timeout=5
+            )
+        except requests.RequestException as e:
+            if last_attempt:
+                print("[AegisAI] send failed:", e)
+                return
+        else:
+            if not _retryable(response) or last_attempt:
+                if response.status_code >= 400:
+                    print("[AegisAI] send failed:", response.status_code)
+                return
+        time.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
@@ -7,4 +7,7 @@ setup(
     install_requires=[
         "requests"
     ],
+    extras_require={
+        "msgpack": ["msgpack"]
+    },
 )
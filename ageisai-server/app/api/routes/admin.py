@@ -0,0 +1,55 @@
+import asyncio
+import hmac
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import get_settings
+from app.core.loop_monitor import loop_monitor, sample_profile
+
+
+router = APIRouter()
+
+
+async def require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    expected = get_settings().admin_token
+    if not expected:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found",
+        )
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, expected):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid admin token",
+        )
+
+
+@router.get("/loop", dependencies=[Depends(require_admin)])
+async def get_loop_stats():
+    """Worst loop lag since start and the stacks of recent loop stalls."""
+    return loop_monitor.stats()
+
+
+@router.post(
+    "/profile",
+    dependencies=[Depends(require_admin)],
+    response_class=PlainTextResponse,
+)
+async def profile(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+):
+    """
+    Sample every thread's stack for `seconds` and return collapsed stacks
+    (flamegraph.pl / speedscope input). Sampling runs on a worker thread, so
+    the server keeps serving while it profiles itself.
+    """
+    seconds = min(seconds, get_settings().profile_max_seconds)
+    collapsed = await asyncio.to_thread(sample_profile, seconds, interval_ms / 1000)
+    if collapsed is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running",
+        )
+    return PlainTextResponse(collapsed)
@@ -1,9 +1,9 @@
 import secrets
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from passlib.context import CryptContext
 
-from app.auth.dependencies import get_current_api_key
+from app.auth.credentials import hash_secret, verify_client_credentials
+from app.auth.dependencies import get_current_api_key, invalidate_api_key
 from app.db.mongo import get_db
 from app.models.domain import APIKey
 from app.schemas.auth import (
@@ -15,21 +15,12 @@ from app.auth.jwt_utils import create_access_token
 
 
 router = APIRouter()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 @router.post("/token", response_model=TokenResponse)
 async def login_for_access_token(payload: TokenRequest, db=Depends(get_db)):
-    record = await db["api_keys"].find_one(
-        {"client_id": payload.clientId, "is_active": True}
-    )
-    if not record:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid credentials",
-        )
-    api_key = APIKey(**record)
-    if not pwd_context.verify(payload.clientSecret, api_key.client_secret_hash):
+    api_key = await verify_client_credentials(db, payload.clientId, payload.clientSecret)
+    if api_key is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
@@ -68,15 +59,31 @@ async def refresh_client_secret(
     Rotate the clientSecret for the current API key and return the new plaintext secret.
     """
     new_secret = secrets.token_urlsafe(32)
-    new_hash = pwd_context.hash(new_secret)
+    new_hash = await hash_secret(new_secret)
 
     await db["api_keys"].update_one(
         {"_id": api_key.id},
         {"$set": {"client_secret_hash": new_hash}},
     )
+    invalidate_api_key(api_key.client_id)
 
     return ClientCredentialsResponse(
         clientId=api_key.client_id,
         clientSecret=new_secret,
     )
 
+
+@router.post("/credentials/revoke", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_client_credentials(
+    api_key: APIKey = Depends(get_current_api_key),
+    db=Depends(get_db),
+):
+    """
+    Deactivate the API key represented by the token. Already-issued tokens stay
+    valid until they expire; new logins and key lookups fail immediately.
+    """
+    await db["api_keys"].update_one(
+        {"_id": api_key.id},
+        {"$set": {"is_active": False}},
+    )
+    invalidate_api_key(api_key.client_id)
@@ -1,21 +1,40 @@
-from fastapi import APIRouter, Depends
+import asyncio
+from datetime import datetime, timedelta
+from typing import Literal, Optional
 
-from app.auth.dependencies import get_current_org_id
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from app.auth.dependencies import STREAM_SCOPE, get_current_api_key, get_current_org_id, get_stream_org_id
+from app.auth.jwt_utils import create_access_token
+from app.core.config import get_settings
+from app.core.pubsub import broker, encode_sse
+from app.core.response_cache import cached_response
 from app.db.mongo import get_db
+from app.models.domain import APIKey
 from app.schemas.dashboard import (
     AlertOut,
+    DashboardSummaryOut,
     HealthScoreOut,
+    LatencyPercentilesOut,
     ModelsResponse,
     ModelSummary,
     RiskDistributionOut,
+    StreamTokenOut,
+)
+from app.services.risk_counter_service import get_org_risk_counts
+from app.services.rollup_service import (
+    latency_percentiles,
+    mean_latency_by_model,
+    pick_granularity,
+    to_utc_naive,
 )
 
 
 router = APIRouter()
 
 
-@router.get("/health", response_model=HealthScoreOut)
-async def get_health(org_id=Depends(get_current_org_id), db=Depends(get_db)):
+async def _load_health(db, org_id) -> HealthScoreOut:
     doc = await db["health_scores"].find_one({"organization_id": org_id})
     if not doc:
         return HealthScoreOut(score=100.0, details={}, updated_at=None)  # type: ignore[arg-type]
@@ -26,8 +45,7 @@ async def get_health(org_id=Depends(get_current_org_id), db=Depends(get_db)):
     )
 
 
-@router.get("/alerts", response_model=list[AlertOut])
-async def get_alerts(org_id=Depends(get_current_org_id), db=Depends(get_db)):
+async def _load_alerts(db, org_id) -> list[AlertOut]:
     cursor = (
         db["alerts"]
         .find({"organization_id": org_id})
@@ -51,20 +69,7 @@ async def get_alerts(org_id=Depends(get_current_org_id), db=Depends(get_db)):
     return alerts
 
 
-@router.get("/models", response_model=ModelsResponse)
-async def get_models(org_id=Depends(get_current_org_id), db=Depends(get_db)):
-    pipeline = [
-        {"$match": {"organization_id": org_id}},
-        {
-            "$group": {
-                "_id": "$model_name",
-                "mean_latency_ms": {"$avg": "$latency_ms"},
-            }
-        },
-    ]
-    cursor = db["ml_events"].aggregate(pipeline)
-    ml_stats = await cursor.to_list(length=100)
-
+async def _load_latest_drift(db, org_id) -> dict:
     drift_by_model = {}
     drift_cursor = (
         db["drift_metrics"]
@@ -74,39 +79,161 @@ async def get_models(org_id=Depends(get_current_org_id), db=Depends(get_db)):
     )
     for d in await drift_cursor.to_list(length=100):
         drift_by_model.setdefault(d["model_name"], d["drift_score"])
+    return drift_by_model
+
+
+async def _load_models(db, org_id) -> ModelsResponse:
+    latency_by_model, drift_by_model = await asyncio.gather(
+        mean_latency_by_model(db, org_id, "ml", "day"),
+        _load_latest_drift(db, org_id),
+    )
 
     models: list[ModelSummary] = []
-    for stat in ml_stats:
-        model_name = stat["_id"]
+    for model_name, latency in latency_by_model.items():
         models.append(
             ModelSummary(
                 model_name=model_name,
-                mean_latency_ms=stat["mean_latency_ms"],
+                mean_latency_ms=latency,
                 drift_score=drift_by_model.get(model_name, 0.0),
             )
         )
     return ModelsResponse(models=models)
 
 
-@router.get("/risk-distribution", response_model=RiskDistributionOut)
-async def get_risk_distribution(org_id=Depends(get_current_org_id), db=Depends(get_db)):
-    """Aggregate risk labels from both ML and LLM events for the org."""
-    pipeline = [
-        {"$match": {"organization_id": org_id, "riskLabel": {"$exists": True, "$in": ["normal", "suspicious", "risky"]}}},
-        {"$group": {"_id": "$riskLabel", "count": {"$sum": 1}}},
-    ]
-    ml_cursor = db["ml_events"].aggregate(pipeline)
-    llm_cursor = db["llm_events"].aggregate(pipeline)
-    ml_counts = await ml_cursor.to_list(length=10)
-    llm_counts = await llm_cursor.to_list(length=10)
-    counts = {"normal": 0, "suspicious": 0, "risky": 0}
-    for row in ml_counts + llm_counts:
-        label = row["_id"]
-        if label in counts:
-            counts[label] += row["count"]
+async def _load_risk_distribution(db, org_id) -> RiskDistributionOut:
+    counts = await get_org_risk_counts(db, org_id)
     return RiskDistributionOut(
         normalCount=counts["normal"],
         suspiciousCount=counts["suspicious"],
         riskyCount=counts["risky"],
     )
 
+
+async def _load_summary(db, org_id) -> DashboardSummaryOut:
+    health, alerts, models, risk_distribution = await asyncio.gather(
+        _load_health(db, org_id),
+        _load_alerts(db, org_id),
+        _load_models(db, org_id),
+        _load_risk_distribution(db, org_id),
+    )
+    return DashboardSummaryOut(
+        health=health,
+        alerts=alerts,
+        models=models.models,
+        risk_distribution=risk_distribution,
+    )
+
+
+@router.get("/health", response_model=HealthScoreOut)
+async def get_health(request: Request, org_id=Depends(get_current_org_id), db=Depends(get_db)):
+    return await cached_response(request, org_id, lambda: _load_health(db, org_id))
+
+
+@router.get("/alerts", response_model=list[AlertOut])
+async def get_alerts(request: Request, org_id=Depends(get_current_org_id), db=Depends(get_db)):
+    return await cached_response(request, org_id, lambda: _load_alerts(db, org_id))
+
+
+@router.get("/models", response_model=ModelsResponse)
+async def get_models(request: Request, org_id=Depends(get_current_org_id), db=Depends(get_db)):
+    return await cached_response(request, org_id, lambda: _load_models(db, org_id))
+
+
+@router.get("/models/{model_name}/latency", response_model=LatencyPercentilesOut)
+async def get_model_latency(
+    request: Request,
+    model_name: str,
+    source: Literal["ml", "llm"] = "ml",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: Optional[Literal["minute", "hour", "day"]] = Query(None),
+    org_id=Depends(get_current_org_id),
+    db=Depends(get_db),
+):
+    """
+    Latency percentiles, request counts and error rates for a model, per time
+    bucket and over the whole range (default: the last 24 hours). Computed by
+    merging the rollups' quantile sketches, so the cost depends on the number
+    of buckets, not events. Granularity defaults to the coarsest one that
+    resolves the range.
+    """
+    end = to_utc_naive(end) if end is not None else datetime.utcnow()
+    start = to_utc_naive(start) if start is not None else end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="start must be before end")
+    granularity = granularity or pick_granularity(start, end)
+
+    async def build() -> LatencyPercentilesOut:
+        result = await latency_percentiles(db, org_id, source, model_name, granularity, start, end)
+        return LatencyPercentilesOut(
+            model_name=model_name,
+            source=source,
+            granularity=granularity,
+            start=start,
+            end=end,
+            **result,
+        )
+
+    return await cached_response(request, org_id, build)
+
+
+@router.get("/risk-distribution", response_model=RiskDistributionOut)
+async def get_risk_distribution(
+    request: Request, org_id=Depends(get_current_org_id), db=Depends(get_db)
+):
+    """Risk label totals from both ML and LLM events, read from the org's counter document."""
+    return await cached_response(request, org_id, lambda: _load_risk_distribution(db, org_id))
+
+
+@router.get("/summary", response_model=DashboardSummaryOut)
+async def get_summary(request: Request, org_id=Depends(get_current_org_id), db=Depends(get_db)):
+    """Health, alerts, models and risk distribution in one response; queries run concurrently."""
+    return await cached_response(request, org_id, lambda: _load_summary(db, org_id))
+
+
+@router.post("/stream/token", response_model=StreamTokenOut)
+async def create_stream_token(api_key: APIKey = Depends(get_current_api_key)):
+    """A short-lived token that only opens /dashboard/stream, for EventSource clients."""
+    ttl = get_settings().stream_token_ttl_seconds
+    token = create_access_token(
+        subject=api_key.client_id,
+        extra_claims={"orgId": str(api_key.organization_id), "scope": STREAM_SCOPE},
+        expires_in=timedelta(seconds=ttl),
+    )
+    return StreamTokenOut(token=token, expires_in=ttl)
+
+
+@router.get("/stream")
+async def stream_events(request: Request, org_id=Depends(get_stream_org_id)):
+    """
+    Server-Sent Events for the org: `alert` for new alerts, `health` when the
+    health score changes and `rollup` with per-model minute-bucket deltas.
+    A `lagged` event reports frames dropped because the client fell behind.
+    Authenticates with a Bearer header or a stream token in `?token=`; the
+    token is only checked when connecting.
+    """
+    heartbeat = get_settings().stream_heartbeat_seconds
+
+    async def frames():
+        sub = broker.subscribe(org_id)
+        try:
+            yield b": connected\n\n"
+            while True:
+                try:
+                    frame = await asyncio.wait_for(sub.queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    frame = b": ping\n\n"
+                if sub.dropped:
+                    yield encode_sse("lagged", {"dropped": sub.dropped})
+                    sub.dropped = 0
+                yield frame
+        finally:
+            broker.unsubscribe(sub)
+
+    return StreamingResponse(
+        frames(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
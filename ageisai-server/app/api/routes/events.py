@@ -0,0 +1,225 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.auth.dependencies import get_current_org_id
+from app.db.mongo import event_filter, get_db
+from app.schemas.dashboard import AlertOut
+from app.schemas.events import (
+    AlertPage,
+    LLMEventOut,
+    LLMEventPage,
+    MLEventOut,
+    MLEventPage,
+)
+from app.services.segment_store import load_llm_bodies
+
+
+router = APIRouter()
+
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(ts: datetime, oid: ObjectId) -> str:
+    raw = json.dumps({"t": ts.isoformat(), "id": str(oid)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["t"]), ObjectId(data["id"])
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+
+async def _keyset_page(
+    collection,
+    query: Dict[str, Any],
+    time_field: str,
+    cursor: Optional[str],
+    limit: int,
+    projection: Optional[Dict[str, int]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Newest-first page of `query` ordered by (time_field, _id). The cursor is
+    the last (time, _id) seen, so each page is an index range scan no matter
+    how deep the client has paged.
+    """
+    if cursor:
+        ts, oid = decode_cursor(cursor)
+        query = {
+            **query,
+            "$or": [
+                {time_field: {"$lt": ts}},
+                {time_field: ts, "_id": {"$lt": oid}},
+            ],
+        }
+    docs = (
+        await collection.find(query, projection=projection)
+        .sort([(time_field, -1), ("_id", -1)])
+        .limit(limit + 1)
+        .to_list(length=limit + 1)
+    )
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        next_cursor = encode_cursor(last[time_field], last["_id"])
+    return docs, next_cursor
+
+
+def _time_range(start: Optional[datetime], end: Optional[datetime]) -> Dict[str, datetime]:
+    bounds: Dict[str, datetime] = {}
+    if start is not None:
+        bounds["$gte"] = start
+    if end is not None:
+        bounds["$lte"] = end
+    return bounds
+
+
+def _event_query(
+    org_id,
+    model_name: Optional[str],
+    risk_label: Optional[str],
+    start: Optional[datetime],
+    end: Optional[datetime],
+) -> Dict[str, Any]:
+    query: Dict[str, Any] = {"organization_id": org_id}
+    if model_name:
+        query["model_name"] = model_name
+    if risk_label:
+        query["riskLabel"] = risk_label
+    bounds = _time_range(start, end)
+    if bounds:
+        query["timestamp"] = bounds
+    return event_filter(query)
+
+
+@router.get("/alerts", response_model=AlertPage)
+async def list_alerts(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    model_name: Optional[str] = None,
+    type: Optional[str] = None,
+    severity: Optional[str] = None,
+    resolved: Optional[bool] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    org_id=Depends(get_current_org_id),
+    db=Depends(get_db),
+):
+    query: Dict[str, Any] = {"organization_id": org_id}
+    if model_name:
+        query["model_name"] = model_name
+    if type:
+        query["type"] = type
+    if severity:
+        query["severity"] = severity
+    if resolved is not None:
+        query["resolved"] = resolved
+    bounds = _time_range(start, end)
+    if bounds:
+        query["created_at"] = bounds
+    docs, next_cursor = await _keyset_page(db["alerts"], query, "created_at", cursor, limit)
+    items = [
+        AlertOut(
+            id=str(doc["_id"]),
+            model_name=doc.get("model_name"),
+            type=doc["type"],
+            message=doc["message"],
+            severity=doc["severity"],
+            created_at=doc["created_at"],
+            resolved=doc.get("resolved", False),
+        )
+        for doc in docs
+    ]
+    return AlertPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/ml", response_model=MLEventPage)
+async def list_ml_events(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    model_name: Optional[str] = None,
+    risk_label: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    include_bodies: bool = False,
+    org_id=Depends(get_current_org_id),
+    db=Depends(get_db),
+):
+    """Browse ML events newest first. `input_data` is only returned with include_bodies=true."""
+    query = _event_query(org_id, model_name, risk_label, start, end)
+    projection = None if include_bodies else {"input_data": 0}
+    docs, next_cursor = await _keyset_page(
+        db["ml_events"], query, "timestamp", cursor, limit, projection
+    )
+    items = [
+        MLEventOut(
+            id=str(doc["_id"]),
+            model_name=doc["model_name"],
+            prediction=doc.get("prediction"),
+            input_data=doc.get("input_data"),
+            latency_ms=doc["latency_ms"],
+            timestamp=doc["timestamp"],
+            riskScore=doc.get("riskScore"),
+            riskLabel=doc.get("riskLabel"),
+        )
+        for doc in docs
+    ]
+    return MLEventPage(items=items, next_cursor=next_cursor)
+
+
+@router.get("/llm", response_model=LLMEventPage)
+async def list_llm_events(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    model_name: Optional[str] = None,
+    risk_label: Optional[str] = None,
+    flag: Optional[List[str]] = Query(None),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    include_bodies: bool = False,
+    org_id=Depends(get_current_org_id),
+    db=Depends(get_db),
+):
+    """
+    Browse LLM events newest first. Every `flag` given must be present.
+    `prompt`/`response` are only returned with include_bodies=true.
+    """
+    query = _event_query(org_id, model_name, risk_label, start, end)
+    if flag:
+        query["flags"] = {"$all": flag}
+    projection = None
+    if not include_bodies:
+        projection = {"prompt": 0, "response": 0, "prompt_segments": 0, "response_segments": 0}
+    docs, next_cursor = await _keyset_page(
+        db["llm_events"], query, "timestamp", cursor, limit, projection
+    )
+    if include_bodies:
+        await load_llm_bodies(db, docs)
+    items = [
+        LLMEventOut(
+            id=str(doc["_id"]),
+            model_name=doc["model_name"],
+            prompt=doc.get("prompt"),
+            response=doc.get("response"),
+            latency_ms=doc["latency_ms"],
+            token_count=doc.get("token_count", 0),
+            timestamp=doc["timestamp"],
+            riskScore=doc.get("riskScore"),
+            riskLabel=doc.get("riskLabel"),
+            flags=doc.get("flags", []),
+        )
+        for doc in docs
+    ]
+    return LLMEventPage(items=items, next_cursor=next_cursor)
@@ -1,20 +1,82 @@
-from fastapi import APIRouter, BackgroundTasks, Depends
+import asyncio
+import logging
+import zlib
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import msgpack
+import orjson
+from bson import ObjectId
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import TypeAdapter, ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
 
 from app.auth.dependencies import get_current_org_id
-from app.db.mongo import get_db
-from app.schemas.ingest import LLMEventBatch, MLEventBatch
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.metrics import events_ingested, ingest_batch_size, ingest_duplicates, timed_task
+from app.core.ndjson import iter_ndjson_lines
+from app.core.pubsub import broker
+from app.core.rate_limit import ingest_quotas, retry_after_header
+from app.core.response_cache import bump_org_version
+from app.core.structured_logging import span
+from app.db.mongo import add_event_meta, get_db, is_timeseries_storage
+from app.schemas.ingest import (
+    LLMEventBatch,
+    LLMEventIn,
+    MLEventBatch,
+    MLEventIn,
+    llm_column_batch_adapter,
+    llm_event_adapter,
+    llm_event_batch_adapter,
+    ml_column_batch_adapter,
+    ml_event_adapter,
+    ml_event_batch_adapter,
+)
+from app.services.baseline_profiler import baseline_learner
 from app.services.drift_detector import compute_drift_score
+from app.services.feature_drift import (
+    compute_feature_drift,
+    feature_drift_score,
+    record_feature_histograms,
+)
 from app.services.health_service import compute_health_score
 from app.services.alert_service import (
     create_drift_alert_if_needed,
+    create_feature_drift_alert_if_needed,
     create_health_alert_if_needed,
     create_risk_alert_if_needed,
 )
 from app.services.ml_risk_classifier import compute_ml_risk
 from app.services.llm_risk_classifier import compute_llm_risk
+from app.services.risk_counter_service import record_risk_counts
+from app.services.rollup_service import record_event_rollups
+from app.services.scoring_profiles import scoring_profiles
+from app.services.segment_store import (
+    compute_segmented_llm_risk,
+    is_segmented,
+    store_llm_bodies,
+)
 
 
 router = APIRouter()
+logger = logging.getLogger("aegisai.ingest")
+
+# Invalid lines listed per chunk in a streaming ingest report.
+MAX_CHUNK_ERRORS = 20
+
+MSGPACK_CONTENT_TYPES = {"application/msgpack", "application/x-msgpack", "application/vnd.msgpack"}
+# Column values that may be null; a null drops the field, as if omitted.
+OPTIONAL_COLUMNS = ("timestamp", "error", "event_id")
+
+BATCH_ID_HEADER = "x-batch-id"
+_settings = get_settings()
+# (org, source, batch ID) -> events in the batch, for batches already inserted.
+_recent_batches: TTLCache[int] = TTLCache(
+    _settings.ingest_batch_id_max_entries, ttl_seconds=_settings.ingest_batch_id_ttl_seconds
+)
 
 
 def approximate_token_count(text: str) -> int:
@@ -22,183 +84,709 @@ def approximate_token_count(text: str) -> int:
     return max(1, int(len(text) / 4))
 
 
-@router.post("/ml")
+def _is_msgpack(request: Request) -> bool:
+    content_type = request.headers.get("content-type", "")
+    return content_type.split(";", 1)[0].strip().lower() in MSGPACK_CONTENT_TYPES
+
+
+async def load_body(request: Request) -> Any:
+    """
+    Decode the raw request body once per request: MessagePack when the
+    Content-Type says so, otherwise JSON via orjson. Ingest routes take no
+    pydantic body parameter, so FastAPI never decodes it itself.
+    """
+    if not hasattr(request.state, "decoded_body"):
+        body = await request.body()
+        if _is_msgpack(request):
+            try:
+                request.state.decoded_body = msgpack.unpackb(body, raw=False)
+            except (ValueError, msgpack.UnpackException):
+                raise RequestValidationError(
+                    [
+                        {
+                            "type": "msgpack_invalid",
+                            "loc": ("body",),
+                            "msg": "MessagePack decode error",
+                            "input": {},
+                        }
+                    ]
+                )
+        else:
+            try:
+                request.state.decoded_body = orjson.loads(body)
+            except orjson.JSONDecodeError as exc:
+                raise RequestValidationError(
+                    [
+                        {
+                            "type": "json_invalid",
+                            "loc": ("body", exc.pos),
+                            "msg": "JSON decode error",
+                            "input": {},
+                        }
+                    ]
+                )
+    return request.state.decoded_body
+
+
+def _batch_length(decoded: Any) -> int:
+    if not isinstance(decoded, dict):
+        return 0
+    events = decoded.get("events")
+    if isinstance(events, list):
+        return len(events)
+    columns = decoded.get("columns")
+    if isinstance(columns, dict) and isinstance(columns.get("model_name"), list):
+        return len(columns["model_name"])
+    return 0
+
+
+def _columns_to_docs(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    names = list(columns)
+    length = len(columns["model_name"])
+    for name in names:
+        if len(columns[name]) != length:
+            raise RequestValidationError(
+                [
+                    {
+                        "type": "column_length",
+                        "loc": ("body", "columns", name),
+                        "msg": f"Column has {len(columns[name])} values, expected {length}",
+                        "input": {},
+                    }
+                ]
+            )
+    docs = [dict(zip(names, values)) for values in zip(*columns.values())]
+    for name in OPTIONAL_COLUMNS:
+        if name in columns:
+            for doc in docs:
+                if doc[name] is None:
+                    del doc[name]
+    return docs
+
+
+def validate_batch(adapter: TypeAdapter, column_adapter: TypeAdapter, body: Any) -> List[Dict[str, Any]]:
+    """
+    Validate a decoded batch straight into insertable event dicts. Accepts
+    the row form {"events": [...]} or the column form {"columns": {...}}.
+    """
+    try:
+        if isinstance(body, dict) and "columns" in body:
+            return _columns_to_docs(column_adapter.validate_python(body)["columns"])
+        return adapter.validate_python(body)["events"]
+    except ValidationError as exc:
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in exc.errors(include_url=False)]
+        )
+
+
+def _openapi_body(model) -> Dict[str, Any]:
+    """Document `model` as the request body of a route that parses it itself."""
+    schema = model.model_json_schema()
+    defs = schema.pop("$defs", {})
+
+    def inline(node):
+        if isinstance(node, dict):
+            ref = node.get("$ref", "")
+            if ref.startswith("#/$defs/"):
+                return inline(defs[ref[len("#/$defs/"):]])
+            return {k: inline(v) for k, v in node.items()}
+        if isinstance(node, list):
+            return [inline(v) for v in node]
+        return node
+
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {"schema": inline(schema)},
+                "application/msgpack": {
+                    "schema": {
+                        "description": "The same batch, or {\"columns\": {field: [values...]}} with equal-length columns.",
+                    }
+                },
+            },
+        }
+    }
+
+
+async def enforce_ingest_quota(
+    request: Request,
+    org_id=Depends(get_current_org_id),
+    db=Depends(get_db),
+) -> None:
+    """
+    Charge the batch against the org's token buckets. The bytes bucket is
+    checked first, from Content-Length when the client sends it, so a batch
+    over the byte quota is refused before its body is read or decoded. Only
+    then is the body decoded to count events and both buckets charged. A
+    throttled batch is never validated or inserted; the decoded body is kept
+    on the request for the route. A batch ID seen recently is not charged;
+    the route answers it as a duplicate.
+    """
+    if _seen_batch(request, org_id) is not None:
+        return
+    with span("quota"):
+        quota = await ingest_quotas.get(db, org_id)
+        declared = _content_length(request)
+        if declared is not None:
+            _raise_if_throttled(quota.check_bytes(declared))
+    body = await request.body()
+    if declared is None:
+        _raise_if_throttled(quota.check_bytes(len(body)))
+    with span("decode"):
+        decoded = await load_body(request)
+    with span("quota"):
+        _raise_if_throttled(quota.try_admit(_batch_length(decoded), len(body)))
+
+
+def _content_length(request: Request) -> Optional[int]:
+    try:
+        return int(request.headers["content-length"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _raise_if_throttled(wait: Optional[float]) -> None:
+    if wait is not None:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Ingest quota exceeded",
+            headers=retry_after_header(wait),
+        )
+
+
+@router.get("/quota")
+async def get_ingest_quota(org_id=Depends(get_current_org_id), db=Depends(get_db)):
+    """Current limits, available tokens and throttle counters for this org (this process)."""
+    quota = await ingest_quotas.get(db, org_id)
+    return quota.stats()
+
+
+def _prepare_ml_docs(docs: List[Dict[str, Any]], org_id) -> None:
+    now = datetime.utcnow()
+    for doc in docs:
+        doc["organization_id"] = org_id
+        doc.setdefault("timestamp", now)
+
+
+def _prepare_llm_docs(docs: List[Dict[str, Any]], org_id) -> None:
+    now = datetime.utcnow()
+    for doc in docs:
+        doc["organization_id"] = org_id
+        doc["token_count"] = approximate_token_count(doc["prompt"] + doc["response"])
+        doc.setdefault("timestamp", now)
+
+
+def _record_ingested(org_id, source: str, count: int) -> None:
+    ingest_batch_size.observe(count, source)
+    events_ingested.inc(str(org_id), source, amount=count)
+
+
+def _batch_key(request: Request, org_id) -> Optional[tuple]:
+    batch_id = request.headers.get(BATCH_ID_HEADER)
+    if not batch_id:
+        return None
+    source = request.url.path.rstrip("/").rsplit("/", 1)[-1]
+    return (str(org_id), source, batch_id)
+
+
+def _seen_batch(request: Request, org_id) -> Optional[int]:
+    """Event count of this request's batch if the same batch ID was inserted recently."""
+    key = _batch_key(request, org_id)
+    return _recent_batches.get(key) if key is not None else None
+
+
+def _remember_batch(request: Request, org_id, count: int) -> None:
+    key = _batch_key(request, org_id)
+    if key is not None:
+        _recent_batches.put(key, count)
+
+
+def _duplicate_batch(source: str, count: int) -> Dict[str, Any]:
+    ingest_duplicates.inc(source, "batch")
+    return {"ingested": 0, "duplicates": count, "duplicate_batch": True}
+
+
+async def insert_events(db, source: str, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Insert event docs and return the ones actually inserted, each with its
+    _id. Events with an event_id are upserted in one unordered bulk write on
+    the unique (organization_id, event_id) index, so an event the org already
+    has (a client retry) is left alone and left out of the result. Time-series
+    collections cannot carry that index; there every event is inserted and
+    only the batch ID cache catches resends.
+    """
+    collection = db[f"{source}_events"]
+    keyed: Dict[str, Dict[str, Any]] = {}
+    plain: List[Dict[str, Any]] = []
+    if is_timeseries_storage():
+        plain = docs
+    else:
+        for doc in docs:
+            if doc.get("event_id"):
+                # A repeated ID within one batch is a duplicate too.
+                keyed.setdefault(doc["event_id"], doc)
+            else:
+                plain.append(doc)
+
+    inserted: List[Dict[str, Any]] = []
+    if keyed:
+        keyed_docs = list(keyed.values())
+        ops = []
+        for doc in keyed_docs:
+            doc["_id"] = ObjectId()
+            ops.append(
+                UpdateOne(
+                    {"organization_id": doc["organization_id"], "event_id": doc["event_id"]},
+                    {"$setOnInsert": doc},
+                    upsert=True,
+                )
+            )
+        try:
+            result = await collection.bulk_write(ops, ordered=False)
+            upserted = result.upserted_ids
+        except BulkWriteError as exc:
+            # Concurrent resends of an ID race on the unique index; the loser
+            # gets a duplicate key error and the event is already stored.
+            if any(error.get("code") != 11000 for error in exc.details.get("writeErrors", [])):
+                raise
+            upserted = {item["index"]: item["_id"] for item in exc.details.get("upserted", [])}
+        inserted = [keyed_docs[i] for i in sorted(upserted)]
+    if plain:
+        await collection.insert_many(plain)
+        inserted += plain
+
+    if len(inserted) < len(docs):
+        ingest_duplicates.inc(source, "event", amount=len(docs) - len(inserted))
+    return inserted
+
+
+async def _store_llm_bodies(db, org_id, docs: List[Dict[str, Any]]) -> None:
+    """
+    Move prompt/response text into segments, skipping events the org already
+    has: a client retry is dropped by insert_events and must not write (or
+    re-date) segments either.
+    """
+    if not get_settings().llm_segment_storage:
+        return
+    event_ids = [doc["event_id"] for doc in docs if doc.get("event_id")]
+    if event_ids and not is_timeseries_storage():
+        stored = {
+            doc["event_id"]
+            async for doc in db["llm_events"].find(
+                {"organization_id": org_id, "event_id": {"$in": event_ids}},
+                projection={"_id": 0, "event_id": 1},
+            )
+        }
+        if stored:
+            docs = [doc for doc in docs if doc.get("event_id") not in stored]
+    await store_llm_bodies(db, org_id, docs)
+
+
+async def track_ml_distributions(db, org_id, docs: List[Dict[str, Any]]) -> None:
+    """Learn baselines for unprofiled models and count events into live drift histograms."""
+    await baseline_learner.observe(db, org_id, docs)
+    await record_feature_histograms(db, org_id, docs)
+
+
+@timed_task("drift_task")
+async def update_drift(db, org_id, model_names: List[str]) -> None:
+    for model_name in model_names:
+        latency_score = await compute_drift_score(db, org_id, model_name)
+        feature_drift = await compute_feature_drift(db, org_id, model_name)
+        if latency_score is None and feature_drift is None:
+            continue
+        now = datetime.utcnow()
+        drift_score = latency_score or 0.0
+        drift_doc = {
+            "organization_id": org_id,
+            "model_name": model_name,
+            "window_start": now,
+            "window_end": now,
+            "mean_latency_ms": 0.0,
+            "latency_drift_score": latency_score,
+            "created_at": now,
+        }
+        if feature_drift is not None:
+            drift_score = max(drift_score, feature_drift_score(feature_drift["max_psi"]))
+            drift_doc["window_start"] = feature_drift.pop("window_start")
+            drift_doc["window_end"] = feature_drift.pop("window_end")
+            drift_doc["feature_drift"] = feature_drift
+        drift_doc["drift_score"] = drift_score
+        await db["drift_metrics"].insert_one(drift_doc)
+        bump_org_version(org_id)
+        if latency_score is not None:
+            await create_drift_alert_if_needed(db, org_id, model_name, latency_score)
+        if feature_drift is not None:
+            await create_feature_drift_alert_if_needed(db, org_id, model_name, feature_drift)
+
+
+@timed_task("ml_risk_task")
+async def score_ml_events(db, org_id, inserted_ids: List[Any], docs: List[Dict[str, Any]]) -> None:
+    scoring = scoring_profiles.get(org_id)
+    drift_by_model = {}
+    profile_by_model = {}
+    labeled = []
+    for oid, doc in zip(inserted_ids, docs):
+        model_name = doc["model_name"]
+        if model_name not in drift_by_model:
+            latest = await db["drift_metrics"].find_one(
+                {"organization_id": org_id, "model_name": model_name},
+                sort=[("created_at", -1)],
+                projection={"drift_score": 1},
+            )
+            drift_by_model[model_name] = (
+                latest["drift_score"] if latest else 0.0
+            )
+        if model_name not in profile_by_model:
+            profile_by_model[model_name] = await db["model_profiles"].find_one(
+                {"organization_id": org_id, "model_name": model_name}
+            )
+        profile = profile_by_model[model_name]
+        input_data = doc.get("input_data") or {}
+        probabilities = input_data.get("probabilities")
+        features = input_data.get("features", input_data)
+        feature_stats = None
+        if profile and "feature_stats" in profile:
+            feature_stats = profile.get("feature_stats")
+        risk_result = compute_ml_risk(
+            prediction=doc["prediction"],
+            probabilities=probabilities,
+            drift_score=drift_by_model[model_name],
+            feature_stats=feature_stats,
+            features=features if isinstance(features, dict) else None,
+            profile=scoring,
+        )
+        await db["ml_events"].update_one(
+            {"_id": oid},
+            {
+                "$set": {
+                    "riskScore": risk_result["riskScore"],
+                    "riskLabel": risk_result["riskLabel"],
+                }
+            },
+        )
+        labeled.append((model_name, doc["timestamp"], risk_result["riskLabel"]))
+        if risk_result["riskLabel"] == "risky":
+            await create_risk_alert_if_needed(
+                db,
+                org_id,
+                source="ml",
+                model_name=model_name,
+                risk_score=risk_result["riskScore"],
+                flags=None,
+            )
+    await record_risk_counts(db, org_id, "ml", labeled)
+
+
+@timed_task("llm_risk_task")
+async def score_llm_events(db, org_id, inserted_ids: List[Any], docs: List[Dict[str, Any]]) -> None:
+    scoring = scoring_profiles.get(org_id)
+    labeled = []
+    for oid, doc in zip(inserted_ids, docs):
+        if is_segmented(doc):
+            risk_result = await compute_segmented_llm_risk(db, doc, scoring)
+        else:
+            risk_result = compute_llm_risk(
+                prompt=doc["prompt"],
+                response=doc.get("response", ""),
+                profile=scoring,
+            )
+        await db["llm_events"].update_one(
+            {"_id": oid},
+            {
+                "$set": {
+                    "riskScore": risk_result["riskScore"],
+                    "riskLabel": risk_result["riskLabel"],
+                    "flags": risk_result.get("flags", []),
+                }
+            },
+        )
+        labeled.append((doc["model_name"], doc["timestamp"], risk_result["riskLabel"]))
+        if risk_result["riskLabel"] == "risky":
+            await create_risk_alert_if_needed(
+                db,
+                org_id,
+                source="llm",
+                model_name=doc.get("model_name"),
+                risk_score=risk_result["riskScore"],
+                flags=risk_result.get("flags"),
+            )
+    await record_risk_counts(db, org_id, "llm", labeled)
+
+
+@timed_task("health_task")
+async def update_health(db, org_id) -> None:
+    score = await compute_health_score(db, org_id)
+    now = datetime.utcnow()
+    previous = await db["health_scores"].find_one_and_update(
+        {"organization_id": org_id},
+        {
+            "$set": {
+                "score": score,
+                "updated_at": now,
+            },
+            "$setOnInsert": {
+                "details": {},
+                "created_at": now,
+                "organization_id": org_id,
+            },
+        },
+        upsert=True,
+        projection={"score": 1},
+    )
+    bump_org_version(org_id)
+    if previous is None or previous.get("score") != score:
+        broker.publish(org_id, "health", {"score": score, "updated_at": now})
+    await create_health_alert_if_needed(db, org_id, score)
+
+
+@router.post(
+    "/ml",
+    dependencies=[Depends(enforce_ingest_quota)],
+    openapi_extra=_openapi_body(MLEventBatch),
+)
 async def ingest_ml_events(
-    payload: MLEventBatch,
+    request: Request,
     background_tasks: BackgroundTasks,
     org_id=Depends(get_current_org_id),
     db=Depends(get_db),
 ):
-    docs = []
-    for event in payload.events:
-        docs.append(
-            {
-                "organization_id": org_id,
-                "model_name": event.model_name,
-                "prediction": event.prediction,
-                "input_data": event.input_data,
-                "latency_ms": event.latency_ms,
-                "timestamp": event.timestamp,
-            }
+    seen = _seen_batch(request, org_id)
+    if seen is not None:
+        return _duplicate_batch("ml", seen)
+    with span("validate"):
+        docs = validate_batch(
+            ml_event_batch_adapter, ml_column_batch_adapter, await load_body(request)
         )
+    _prepare_ml_docs(docs, org_id)
+    inserted = []
     if docs:
-        result = await db["ml_events"].insert_many(docs)
-        inserted_ids = result.inserted_ids
-        model_names = list({e.model_name for e in payload.events})
-
-        async def drift_task():
-            for model_name in model_names:
-                drift_score = await compute_drift_score(db, org_id, model_name)
-                if drift_score is None:
-                    continue
-                from datetime import datetime
-
-                now = datetime.utcnow()
-                drift_doc = {
-                    "organization_id": org_id,
-                    "model_name": model_name,
-                    "window_start": now,
-                    "window_end": now,
-                    "mean_latency_ms": 0.0,
-                    "drift_score": drift_score,
-                    "created_at": now,
-                }
-                await db["drift_metrics"].insert_one(drift_doc)
-                await create_drift_alert_if_needed(db, org_id, model_name, drift_score)
-
-        async def ml_risk_task():
-            drift_by_model = {}
-            profile_by_model = {}
-            for oid, doc in zip(inserted_ids, docs):
-                model_name = doc["model_name"]
-                if model_name not in drift_by_model:
-                    latest = await db["drift_metrics"].find_one(
-                        {"organization_id": org_id, "model_name": model_name},
-                        sort=[("created_at", -1)],
-                        projection={"drift_score": 1},
-                    )
-                    drift_by_model[model_name] = (
-                        latest["drift_score"] if latest else 0.0
-                    )
-                if model_name not in profile_by_model:
-                    profile_by_model[model_name] = await db["model_profiles"].find_one(
-                        {"organization_id": org_id, "model_name": model_name}
-                    )
-                profile = profile_by_model[model_name]
-                input_data = doc.get("input_data") or {}
-                probabilities = input_data.get("probabilities")
-                features = input_data.get("features", input_data)
-                feature_stats = None
-                if profile and "feature_stats" in profile:
-                    feature_stats = profile.get("feature_stats")
-                risk_result = compute_ml_risk(
-                    prediction=doc["prediction"],
-                    probabilities=probabilities,
-                    drift_score=drift_by_model[model_name],
-                    feature_stats=feature_stats,
-                    features=features if isinstance(features, dict) else None,
-                )
-                await db["ml_events"].update_one(
-                    {"_id": oid},
-                    {
-                        "$set": {
-                            "riskScore": risk_result["riskScore"],
-                            "riskLabel": risk_result["riskLabel"],
-                        }
-                    },
-                )
-                if risk_result["riskLabel"] == "risky":
-                    await create_risk_alert_if_needed(
-                        db,
-                        org_id,
-                        source="ml",
-                        model_name=model_name,
-                        risk_score=risk_result["riskScore"],
-                        flags=None,
-                    )
-
-        background_tasks.add_task(drift_task)
-        background_tasks.add_task(ml_risk_task)
+        add_event_meta(docs)
+        with span("insert"):
+            inserted = await insert_events(db, "ml", docs)
+        _remember_batch(request, org_id, len(docs))
+    if inserted:
+        _record_ingested(org_id, "ml", len(inserted))
+        with span("enqueue"):
+            model_names = list({doc["model_name"] for doc in inserted})
+            inserted_ids = [doc["_id"] for doc in inserted]
+            background_tasks.add_task(record_event_rollups, db, org_id, "ml", inserted)
+            background_tasks.add_task(track_ml_distributions, db, org_id, inserted)
+            background_tasks.add_task(update_drift, db, org_id, model_names)
+            background_tasks.add_task(score_ml_events, db, org_id, inserted_ids, inserted)
 
-    return {"ingested": len(docs)}
+    return {"ingested": len(inserted), "duplicates": len(docs) - len(inserted)}
 
 
-@router.post("/llm")
+@router.post(
+    "/llm",
+    dependencies=[Depends(enforce_ingest_quota)],
+    openapi_extra=_openapi_body(LLMEventBatch),
+)
 async def ingest_llm_events(
-    payload: LLMEventBatch,
+    request: Request,
     background_tasks: BackgroundTasks,
     org_id=Depends(get_current_org_id),
     db=Depends(get_db),
 ):
-    docs = []
-    for event in payload.events:
-        token_count = approximate_token_count(event.prompt + event.response)
-        docs.append(
-            {
-                "organization_id": org_id,
-                "model_name": event.model_name,
-                "prompt": event.prompt,
-                "response": event.response,
-                "latency_ms": event.latency_ms,
-                "token_count": token_count,
-                "timestamp": event.timestamp,
-            }
+    seen = _seen_batch(request, org_id)
+    if seen is not None:
+        return _duplicate_batch("llm", seen)
+    with span("validate"):
+        docs = validate_batch(
+            llm_event_batch_adapter, llm_column_batch_adapter, await load_body(request)
         )
-
+    _prepare_llm_docs(docs, org_id)
+    inserted = []
     if docs:
-        result = await db["llm_events"].insert_many(docs)
-        inserted_ids = result.inserted_ids
-
-        async def llm_risk_task():
-            for oid, doc in zip(inserted_ids, docs):
-                risk_result = compute_llm_risk(
-                    prompt=doc["prompt"],
-                    response=doc.get("response", ""),
-                )
-                await db["llm_events"].update_one(
-                    {"_id": oid},
-                    {
-                        "$set": {
-                            "riskScore": risk_result["riskScore"],
-                            "riskLabel": risk_result["riskLabel"],
-                            "flags": risk_result.get("flags", []),
-                        }
-                    },
-                )
-                if risk_result["riskLabel"] == "risky":
-                    await create_risk_alert_if_needed(
-                        db,
-                        org_id,
-                        source="llm",
-                        model_name=doc.get("model_name"),
-                        risk_score=risk_result["riskScore"],
-                        flags=risk_result.get("flags"),
-                    )
-
-        async def health_task():
-            score = await compute_health_score(db, org_id)
-            from datetime import datetime
-
-            now = datetime.utcnow()
-            await db["health_scores"].update_one(
-                {"organization_id": org_id},
-                {
-                    "$set": {
-                        "score": score,
-                        "updated_at": now,
-                    },
-                    "$setOnInsert": {
-                        "details": {},
-                        "created_at": now,
-                        "organization_id": org_id,
-                    },
-                },
-                upsert=True,
-            )
-            await create_health_alert_if_needed(db, org_id, score)
+        with span("segments"):
+            await _store_llm_bodies(db, org_id, docs)
+        add_event_meta(docs)
+        with span("insert"):
+            inserted = await insert_events(db, "llm", docs)
+        _remember_batch(request, org_id, len(docs))
+    if inserted:
+        _record_ingested(org_id, "llm", len(inserted))
+        with span("enqueue"):
+            inserted_ids = [doc["_id"] for doc in inserted]
+            background_tasks.add_task(record_event_rollups, db, org_id, "llm", inserted)
+            background_tasks.add_task(score_llm_events, db, org_id, inserted_ids, inserted)
+            background_tasks.add_task(update_health, db, org_id)
+
+    return {"ingested": len(inserted), "duplicates": len(docs) - len(inserted)}
+
+
+def _format_errors(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc']) or 'event'}: {err['msg']}"
+        for err in exc.errors(include_url=False)
+    )
+
 
-        background_tasks.add_task(llm_risk_task)
-        background_tasks.add_task(health_task)
+async def _stream_ingest(
+    request: Request,
+    db,
+    org_id,
+    source: str,
+    adapter: TypeAdapter,
+    prepare: Callable[[List[Dict[str, Any]], Any], None],
+    score: Callable[..., Awaitable[None]],
+    before_insert: Optional[Callable[..., Awaitable[None]]] = None,
+    after_insert: Optional[Callable[..., Awaitable[None]]] = None,
+) -> Dict[str, Any]:
+    """
+    Insert an NDJSON body in chunks of `ingest_stream_chunk_size` events.
+    Each chunk is inserted, rolled up and scored while the next one is being
+    parsed; at most one chunk is in flight, so memory stays at two chunks no
+    matter how large the upload is. Quota is charged per chunk; when the org
+    is over its rate, reading pauses until tokens are available, which pushes
+    back on the uploader instead of failing the stream.
+    """
+    settings = get_settings()
+    chunk_size = settings.ingest_stream_chunk_size
+    quota = await ingest_quotas.get(db, org_id)
+    gzip = request.headers.get("content-encoding", "").lower() == "gzip"
+    report: Dict[str, Any] = {"ingested": 0, "duplicates": 0, "rejected": 0, "chunks": 0, "errors": []}
+    model_names = set()
 
-    return {"ingested": len(docs)}
+    async def flush(index: int, docs: List[Dict[str, Any]], n_bytes: int, errors: List[Dict[str, Any]]) -> None:
+        chunk_report = {"chunk": index, "inserted": 0, "rejected": len(errors), "lines": errors[:MAX_CHUNK_ERRORS]}
+        if docs:
+            with span("quota"):
+                while (wait := quota.try_admit(len(docs), n_bytes)) is not None:
+                    await asyncio.sleep(wait)
+            prepare(docs, org_id)
+            try:
+                if before_insert is not None:
+                    await before_insert(db, org_id, docs)
+                add_event_meta(docs)
+                with span("insert"):
+                    inserted = await insert_events(db, source, docs)
+            except PyMongoError as exc:
+                logger.exception("Stream ingest chunk %d failed for org %s", index, org_id)
+                chunk_report["rejected"] += len(docs)
+                chunk_report["error"] = str(exc)
+            else:
+                chunk_report["inserted"] = len(inserted)
+                report["duplicates"] += len(docs) - len(inserted)
+                if inserted:
+                    _record_ingested(org_id, source, len(inserted))
+                    await record_event_rollups(db, org_id, source, inserted)
+                    if after_insert is not None:
+                        await after_insert(db, org_id, inserted)
+                    await score(db, org_id, [doc["_id"] for doc in inserted], inserted)
+        report["ingested"] += chunk_report["inserted"]
+        report["rejected"] += chunk_report["rejected"]
+        if chunk_report["rejected"]:
+            report["errors"].append(chunk_report)
 
+    pending: Optional[asyncio.Task] = None
+    docs: List[Dict[str, Any]] = []
+    errors: List[Dict[str, Any]] = []
+    n_bytes = 0
+    try:
+        async for line_no, line in iter_ndjson_lines(
+            request.stream(), gzip, settings.ingest_stream_max_line_bytes
+        ):
+            if line is None:
+                errors.append({"line": line_no, "error": "line exceeds maximum length"})
+            else:
+                n_bytes += len(line)
+                try:
+                    doc = adapter.validate_json(line)
+                except ValidationError as exc:
+                    errors.append({"line": line_no, "error": _format_errors(exc)})
+                else:
+                    docs.append(doc)
+                    model_names.add(doc["model_name"])
+            if len(docs) + len(errors) >= chunk_size:
+                if pending is not None:
+                    await pending
+                pending = asyncio.create_task(flush(report["chunks"], docs, n_bytes, errors))
+                report["chunks"] += 1
+                docs, errors, n_bytes = [], [], 0
+        if docs or errors:
+            if pending is not None:
+                await pending
+            pending = asyncio.create_task(flush(report["chunks"], docs, n_bytes, errors))
+            report["chunks"] += 1
+    except zlib.error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid gzip body",
+        )
+    finally:
+        if pending is not None:
+            await pending
+    report["model_names"] = model_names
+    return report
+
+
+_ml_stream_body = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/x-ndjson": {"schema": MLEventIn.model_json_schema()}},
+    }
+}
+_llm_stream_body = {
+    "requestBody": {
+        "required": True,
+        "content": {"application/x-ndjson": {"schema": LLMEventIn.model_json_schema()}},
+    }
+}
+
+
+@router.post("/ml/stream", openapi_extra=_ml_stream_body)
+async def stream_ml_events(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    org_id=Depends(get_current_org_id),
+    db=Depends(get_db),
+):
+    """
+    Ingest newline-delimited ML events of any size; send `Content-Encoding:
+    gzip` for a compressed body. Invalid lines are reported per chunk and do
+    not stop the upload.
+    """
+    report = await _stream_ingest(
+        request,
+        db,
+        org_id,
+        "ml",
+        ml_event_adapter,
+        _prepare_ml_docs,
+        score_ml_events,
+        after_insert=track_ml_distributions,
+    )
+    model_names = report.pop("model_names")
+    if model_names:
+        background_tasks.add_task(update_drift, db, org_id, list(model_names))
+    return report
+
+
+@router.post("/llm/stream", openapi_extra=_llm_stream_body)
+async def stream_llm_events(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    org_id=Depends(get_current_org_id),
+    db=Depends(get_db),
+):
+    """
+    Ingest newline-delimited LLM events of any size; send `Content-Encoding:
+    gzip` for a compressed body. Invalid lines are reported per chunk and do
+    not stop the upload.
+    """
+    report = await _stream_ingest(
+        request,
+        db,
+        org_id,
+        "llm",
+        llm_event_adapter,
+        _prepare_llm_docs,
+        score_llm_events,
+        before_insert=_store_llm_bodies,
+    )
+    if report.pop("model_names"):
+        background_tasks.add_task(update_health, db, org_id)
+    return report
@@ -0,0 +1,103 @@
+import asyncio
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from app.api.routes.ingest import load_body
+from app.auth.dependencies import get_current_org_id
+from app.db.mongo import get_db
+from app.schemas.profiles import (
+    BaselineImportIn,
+    ProfileOut,
+    ProfileSavedOut,
+    baseline_import_adapter,
+)
+from app.services.baseline_profiler import (
+    PROFILES,
+    ProfileBuilder,
+    profile_from_window,
+    save_profile,
+)
+from app.services.rollup_service import to_utc_naive
+
+
+router = APIRouter()
+
+
+async def _save(db, org_id, model_name: str, builder: ProfileBuilder, source: str) -> ProfileSavedOut:
+    if not builder.events:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No rows to profile")
+    profile = builder.build()
+    version = await save_profile(db, org_id, model_name, profile, source)
+    return ProfileSavedOut(
+        model_name=model_name,
+        version=version,
+        events=builder.events,
+        features=len(profile["histograms"]),
+    )
+
+
+@router.get("/{model_name}", response_model=ProfileOut)
+async def get_profile(model_name: str, org_id=Depends(get_current_org_id), db=Depends(get_db)):
+    doc = await db[PROFILES].find_one({"organization_id": org_id, "model_name": model_name})
+    if not doc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return ProfileOut(**{**doc, "version": doc.get("version", 0)})
+
+
+@router.put(
+    "/{model_name}/baseline",
+    response_model=ProfileSavedOut,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": BaselineImportIn.model_json_schema()}},
+        }
+    },
+)
+async def import_baseline(
+    request: Request,
+    model_name: str,
+    org_id=Depends(get_current_org_id),
+    db=Depends(get_db),
+):
+    """
+    Replace the model's baseline with one built from training data sent as
+    columns (JSON or MessagePack). Statistics are computed off the event loop.
+    """
+    try:
+        body = baseline_import_adapter.validate_python(await load_body(request))
+    except ValidationError as exc:
+        raise RequestValidationError(
+            [{**err, "loc": ("body", *err["loc"])} for err in exc.errors(include_url=False)]
+        )
+    lengths = {len(values) for values in body["features"].values()}
+    for name in ("predictions", "latency_ms"):
+        if body.get(name) is not None:
+            lengths.add(len(body[name]))
+    if len(lengths) > 1:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="All columns must have the same length",
+        )
+
+    builder = ProfileBuilder()
+    await asyncio.to_thread(
+        builder.add_columns, body["features"], body.get("predictions"), body.get("latency_ms")
+    )
+    return await _save(db, org_id, model_name, builder, "import")
+
+
+@router.post("/{model_name}/baseline/window", response_model=ProfileSavedOut)
+async def profile_window(
+    model_name: str,
+    start: datetime,
+    end: datetime,
+    org_id=Depends(get_current_org_id),
+    db=Depends(get_db),
+):
+    """Replace the model's baseline with one built from its ingested events in [start, end)."""
+    builder = await profile_from_window(db, org_id, model_name, to_utc_naive(start), to_utc_naive(end))
+    return await _save(db, org_id, model_name, builder, "window")
@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, Response, status
+from pymongo import ReturnDocument
+
+from app.auth.dependencies import get_current_org_id
+from app.db.mongo import get_db
+from app.schemas.scoring import ScoringProfileIn, ScoringProfileOut
+from app.services.scoring_profiles import SCORING_PROFILES, scoring_profiles
+
+
+router = APIRouter()
+
+PROFILE_FIELDS = ("ml_weights", "llm_weights", "thresholds", "prompt_length_cap")
+
+
+async def _write(db, org_id, update: dict) -> dict:
+    """Apply an update that bumps the version, so every worker recompiles the profile."""
+    doc = await db[SCORING_PROFILES].find_one_and_update(
+        {"organization_id": org_id},
+        {
+            **update,
+            "$inc": {"version": 1},
+            "$currentDate": {"updated_at": True},
+            "$setOnInsert": {"created_at": datetime.utcnow()},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    scoring_profiles.put(doc)
+    return doc
+
+
+@router.get("", response_model=ScoringProfileOut)
+async def get_scoring_profile(org_id=Depends(get_current_org_id), db=Depends(get_db)):
+    """The org's risk scoring weights and thresholds; defaults where not overridden."""
+    doc = await db[SCORING_PROFILES].find_one({"organization_id": org_id})
+    return ScoringProfileOut.model_validate(doc or {})
+
+
+@router.put("", response_model=ScoringProfileOut)
+async def put_scoring_profile(
+    payload: ScoringProfileIn,
+    org_id=Depends(get_current_org_id),
+    db=Depends(get_db),
+):
+    """
+    Replace the org's scoring profile. New events are scored with it at once
+    on this worker and within SCORING_PROFILE_REFRESH_SECONDS on the others;
+    stored events keep their scores until rescored (app.workers.rescore).
+    """
+    doc = await _write(db, org_id, {"$set": payload.model_dump()})
+    return ScoringProfileOut.model_validate(doc)
+
+
+@router.delete("", status_code=status.HTTP_204_NO_CONTENT)
+async def reset_scoring_profile(org_id=Depends(get_current_org_id), db=Depends(get_db)):
+    """Go back to the built-in scoring. The document stays, so other workers see the new version."""
+    await _write(db, org_id, {"$unset": {field: "" for field in PROFILE_FIELDS}})
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
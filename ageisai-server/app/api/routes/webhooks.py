@@ -0,0 +1,65 @@
+from datetime import datetime
+from typing import Any, Dict, List
+
+from bson import ObjectId
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+
+from app.auth.dependencies import get_current_org_id
+from app.db.mongo import get_db
+from app.schemas.webhooks import WebhookIn, WebhookOut
+from app.services.webhook_notifier import WEBHOOKS, UnsafeWebhookURL, check_webhook_url, webhook_notifier
+
+
+router = APIRouter()
+
+
+def _webhook_out(doc: Dict[str, Any]) -> WebhookOut:
+    webhook_id = str(doc["_id"])
+    return WebhookOut(
+        id=webhook_id,
+        url=doc["url"],
+        min_severity=doc.get("min_severity", "warning"),
+        enabled=doc.get("enabled", True),
+        has_secret=bool(doc.get("secret")),
+        created_at=doc["created_at"],
+        circuit=webhook_notifier.circuit_state(webhook_id),
+    )
+
+
+@router.get("", response_model=List[WebhookOut])
+async def list_webhooks(org_id=Depends(get_current_org_id), db=Depends(get_db)):
+    cursor = db[WEBHOOKS].find({"organization_id": org_id}).sort("created_at", 1)
+    return [_webhook_out(doc) async for doc in cursor]
+
+
+@router.post("", response_model=WebhookOut, status_code=status.HTTP_201_CREATED)
+async def create_webhook(payload: WebhookIn, org_id=Depends(get_current_org_id), db=Depends(get_db)):
+    """Send this org's new alerts to `url`, batched (see README, Webhook Alerts)."""
+    url = str(payload.url)
+    try:
+        await check_webhook_url(url)
+    except UnsafeWebhookURL as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    doc = {
+        "organization_id": org_id,
+        "url": url,
+        "secret": payload.secret,
+        "min_severity": payload.min_severity,
+        "enabled": True,
+        "created_at": datetime.utcnow(),
+    }
+    result = await db[WEBHOOKS].insert_one(doc)
+    doc["_id"] = result.inserted_id
+    webhook_notifier.invalidate(org_id)
+    return _webhook_out(doc)
+
+
+@router.delete("/{webhook_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_webhook(webhook_id: str, org_id=Depends(get_current_org_id), db=Depends(get_db)):
+    if not ObjectId.is_valid(webhook_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Webhook not found")
+    result = await db[WEBHOOKS].delete_one({"_id": ObjectId(webhook_id), "organization_id": org_id})
+    if not result.deleted_count:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Webhook not found")
+    webhook_notifier.invalidate(org_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,82 @@
+import asyncio
+import hashlib
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.auth.dependencies import load_active_api_key
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.models.domain import APIKey
+
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_settings = get_settings()
+
+# bcrypt is deliberately slow (~100-300 ms of CPU). It runs on a small
+# dedicated pool so a burst of logins never blocks the event loop, and the
+# semaphore keeps waiting logins parked as cheap coroutines rather than
+# piling work onto the pool.
+_bcrypt_pool = ThreadPoolExecutor(
+    max_workers=_settings.bcrypt_max_workers,
+    thread_name_prefix="bcrypt",
+)
+_bcrypt_slots = asyncio.Semaphore(_settings.bcrypt_max_workers)
+
+# Recently verified (client_id, secret digest, stored hash) triples. The digest
+# is keyed with a per-process random key, so the cache never holds anything
+# that could be used to recover or replay a secret. Including the stored hash
+# means a rotated secret misses the cache.
+_digest_key = os.urandom(32)
+_verified: TTLCache[bool] = TTLCache(
+    _settings.credential_cache_max_entries,
+    ttl_seconds=_settings.credential_cache_ttl_seconds,
+)
+
+# One verification in flight per (client_id, secret digest); concurrent logins
+# with the same credentials await the same task.
+_inflight: Dict[Tuple[str, bytes], "asyncio.Task[Optional[APIKey]]"] = {}
+
+
+def _secret_digest(secret: str) -> bytes:
+    return hmac.new(_digest_key, secret.encode("utf-8"), hashlib.sha256).digest()
+
+
+async def _run_bcrypt(func, *args):
+    async with _bcrypt_slots:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_bcrypt_pool, func, *args)
+
+
+async def hash_secret(secret: str) -> str:
+    return await _run_bcrypt(pwd_context.hash, secret)
+
+
+async def _verify(db, client_id: str, secret: str, digest: bytes) -> Optional[APIKey]:
+    api_key = await load_active_api_key(db, client_id)
+    if api_key is None:
+        return None
+    cache_key = (client_id, digest, api_key.client_secret_hash)
+    if _verified.get(cache_key):
+        return api_key
+    if not await _run_bcrypt(pwd_context.verify, secret, api_key.client_secret_hash):
+        return None
+    _verified.put(cache_key, True)
+    return api_key
+
+
+async def verify_client_credentials(db, client_id: str, secret: str) -> Optional[APIKey]:
+    """Return the active API key if the secret matches, else None."""
+    digest = _secret_digest(secret)
+    key = (client_id, digest)
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_verify(db, client_id, secret, digest))
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shield so one caller disconnecting does not cancel the shared check.
+    return await asyncio.shield(task)
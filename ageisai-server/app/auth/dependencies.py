@@ -3,12 +3,42 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
 from app.auth.jwt_utils import decode_token
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.structured_logging import span
 from app.db.mongo import get_db
 from app.models.domain import APIKey
 
 
 security_scheme = HTTPBearer(auto_error=False)
 
+# `scope` claim of the short-lived tokens that may only open /dashboard/stream.
+STREAM_SCOPE = "stream"
+
+# Active API key records by client_id. Entries live for api_key_cache_ttl_seconds;
+# rotation and revocation call invalidate_api_key so they take effect at once
+# in this process.
+_api_key_cache: TTLCache[APIKey] = TTLCache(
+    get_settings().api_key_cache_max_entries,
+    ttl_seconds=get_settings().api_key_cache_ttl_seconds,
+)
+
+
+def invalidate_api_key(client_id: str) -> None:
+    _api_key_cache.pop(client_id)
+
+
+async def load_active_api_key(db, client_id: str) -> APIKey | None:
+    api_key = _api_key_cache.get(client_id)
+    if api_key is not None:
+        return api_key
+    record = await db["api_keys"].find_one({"client_id": client_id, "is_active": True})
+    if not record:
+        return None
+    api_key = APIKey(**record)
+    _api_key_cache.put(client_id, api_key)
+    return api_key
+
 
 async def _get_payload_from_credentials(
     credentials: HTTPAuthorizationCredentials | None = Depends(security_scheme),
@@ -18,20 +48,27 @@ async def _get_payload_from_credentials(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Not authenticated",
         )
-    token = credentials.credentials
+    payload = _decode(credentials.credentials)
+    if payload.get("scope") == STREAM_SCOPE:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Stream tokens are only valid for /dashboard/stream",
+        )
+    return payload
+
+
+def _decode(token: str) -> dict:
     try:
-        payload = decode_token(token)
+        with span("auth"):
+            return decode_token(token)
     except ValueError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
         )
-    return payload
 
 
-async def get_current_org_id(
-    payload=Depends(_get_payload_from_credentials),
-) -> ObjectId:
+def _org_id_from_payload(payload: dict) -> ObjectId:
     org_id = payload.get("orgId")
     if not org_id or not ObjectId.is_valid(org_id):
         raise HTTPException(
@@ -41,6 +78,33 @@ async def get_current_org_id(
     return ObjectId(org_id)
 
 
+async def get_current_org_id(
+    payload=Depends(_get_payload_from_credentials),
+) -> ObjectId:
+    return _org_id_from_payload(payload)
+
+
+async def get_stream_org_id(
+    token: str | None = None,
+    credentials: HTTPAuthorizationCredentials | None = Depends(security_scheme),
+) -> ObjectId:
+    """
+    Org for /dashboard/stream. Browser EventSource cannot send headers, so a
+    stream token from POST /dashboard/stream/token is also accepted as the
+    `token` query parameter. Only stream tokens are accepted there, which keeps
+    long-lived access tokens out of URLs and logs.
+    """
+    if token is not None:
+        payload = _decode(token)
+        if payload.get("scope") != STREAM_SCOPE:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Query tokens must be stream tokens",
+            )
+        return _org_id_from_payload(payload)
+    return _org_id_from_payload(await _get_payload_from_credentials(credentials))
+
+
 async def get_current_api_key(
     payload=Depends(_get_payload_from_credentials),
     db=Depends(get_db),
@@ -51,11 +115,11 @@ async def get_current_api_key(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token subject",
         )
-    record = await db["api_keys"].find_one({"client_id": client_id, "is_active": True})
-    if not record:
+    api_key = await load_active_api_key(db, client_id)
+    if api_key is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="API key not found or inactive",
         )
-    return APIKey(**record)
+    return api_key
 
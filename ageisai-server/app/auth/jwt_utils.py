@@ -3,13 +3,25 @@ from typing import Any, Dict
 
 from jose import JWTError, jwt
 
+from app.core.cache import TTLCache
 from app.core.config import get_settings
 
 
-def create_access_token(subject: str, extra_claims: Dict[str, Any] | None = None) -> str:
+# Verified token -> claims. Entries expire with the token's own `exp`, so a
+# cached token is never accepted past its lifetime.
+_verified_tokens: TTLCache[Dict[str, Any]] = TTLCache(
+    get_settings().jwt_cache_max_entries
+)
+
+
+def create_access_token(
+    subject: str,
+    extra_claims: Dict[str, Any] | None = None,
+    expires_in: timedelta | None = None,
+) -> str:
     settings = get_settings()
     now = datetime.now(timezone.utc)
-    expire = now + timedelta(minutes=settings.jwt_access_token_expires_minutes)
+    expire = now + (expires_in or timedelta(minutes=settings.jwt_access_token_expires_minutes))
     to_encode: Dict[str, Any] = {"sub": subject, "iat": now, "exp": expire}
     if extra_claims:
         to_encode.update(extra_claims)
@@ -21,6 +33,9 @@ def create_access_token(subject: str, extra_claims: Dict[str, Any] | None = None
 
 
 def decode_token(token: str) -> Dict[str, Any]:
+    claims = _verified_tokens.get(token)
+    if claims is not None:
+        return claims
     settings = get_settings()
     try:
         payload = jwt.decode(
@@ -28,7 +43,9 @@ def decode_token(token: str) -> Dict[str, Any]:
             settings.jwt_secret_key,
             algorithms=[settings.jwt_algorithm],
         )
-        return payload
     except JWTError as exc:
         raise ValueError("Invalid token") from exc
-
+    exp = payload.get("exp")
+    if isinstance(exp, (int, float)):
+        _verified_tokens.put(token, payload, expires_at=float(exp))
+    return payload
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 
 
@@ -9,15 +10,124 @@ class Settings(BaseSettings):
 
     mongo_uri: str = "mongodb://localhost:27017"
     mongo_db_name: str = "aegisai"
+    # "standard" or "timeseries" (MongoDB time-series collections for events)
+    event_storage_mode: str = "standard"
 
     jwt_secret_key: str = "CHANGE_ME"  # override in env
     jwt_algorithm: str = "HS256"
     jwt_access_token_expires_minutes: int = 60
+    jwt_cache_max_entries: int = 10000
+    api_key_cache_ttl_seconds: float = 60.0
+    api_key_cache_max_entries: int = 10000
+    # bcrypt runs on this many worker threads; verified logins are cached briefly
+    bcrypt_max_workers: int = 2
+    credential_cache_ttl_seconds: float = 300.0
+    credential_cache_max_entries: int = 10000
 
     drift_latency_threshold_ms: float = 2000.0
+    # Feature drift: live histograms are counted per bucket and the last
+    # drift_window_minutes are compared with the baseline profile.
+    drift_histogram_bucket_minutes: int = 5
+    drift_histogram_retention_days: int = 7
+    drift_window_minutes: int = 60
+    drift_min_events: int = 200
+    drift_psi_threshold: float = 0.25
+    # No new drift alert for a model while an unresolved one is this recent.
+    drift_alert_cooldown_minutes: int = 60
+    drift_profile_cache_seconds: float = 60.0
+    # Baseline profiles: learned from the first profile_baseline_events events
+    # of a model without one (0 disables); quantiles and histogram edges come
+    # from a reservoir sample of profile_sample_size values per field.
+    profile_baseline_events: int = 1000
+    profile_sample_size: int = 1000
+    profile_max_categories: int = 50
+    profile_window_max_events: int = 100000
+    # In-progress baselines of models that stop sending are dropped after this.
+    profile_builder_idle_seconds: float = 3600.0
     health_min_score: float = 0.0
     health_max_score: float = 100.0
 
+    # Retention: raw events expire after this many days (0 keeps them forever).
+    raw_event_ttl_days: int = 0
+    rollup_minute_retention_days: int = 7
+    rollup_hour_retention_days: int = 90
+
+    # Dashboard response cache (0 TTL disables caching; ETags still apply)
+    dashboard_cache_ttl_seconds: float = 30.0
+    dashboard_cache_max_entries: int = 10000
+
+    # Live dashboard stream: frames buffered per connection before dropping
+    stream_max_queue: int = 256
+    stream_heartbeat_seconds: float = 15.0
+    # Lifetime of the query-string tokens EventSource clients connect with
+    stream_token_ttl_seconds: int = 60
+
+    # How often each server process rebuilds risk counters from raw events
+    # (0 disables). Every rebuild scans all labeled events, so leave this off
+    # and run `python -m app.workers.background` when a rebuild is needed.
+    risk_counter_reconcile_interval_minutes: int = 0
+    # How often each worker picks up edited per-org scoring profiles (0 disables).
+    scoring_profile_refresh_seconds: float = 10.0
+
+    # Per-org ingest token buckets (0 disables a limit); overridden per org in
+    # the org_quotas collection, re-read every ingest_quota_refresh_seconds.
+    ingest_default_events_per_second: float = 2000.0
+    ingest_default_bytes_per_second: float = 8 * 1024 * 1024
+    ingest_burst_seconds: float = 5.0
+    ingest_quota_refresh_seconds: float = 60.0
+    # NDJSON streaming ingest: events per insert chunk, longest accepted line
+    ingest_stream_chunk_size: int = 1000
+    ingest_stream_max_line_bytes: int = 1024 * 1024
+    # Recently ingested X-Batch-ID values per process; a resent batch is
+    # answered from here without decoding or inserting it.
+    ingest_batch_id_ttl_seconds: float = 3600.0
+    ingest_batch_id_max_entries: int = 100000
+
+    # Store LLM prompts/responses as deduplicated, compressed segments in
+    # text_segments; texts shorter than segment_min_chars stay inline.
+    llm_segment_storage: bool = False
+    segment_min_chars: int = 256
+    segment_cache_max_entries: int = 100000
+    # With RAW_EVENT_TTL_DAYS set, a segment expires RAW_EVENT_TTL_DAYS plus
+    # this long after it was last referenced; references within this window
+    # don't rewrite its expiry.
+    segment_refresh_hours: float = 24.0
+
+    # Loop monitor: heartbeat period and the block length that captures a
+    # stack (0 disables). Admin endpoints need X-Admin-Token; empty disables them.
+    loop_lag_interval_ms: float = 25.0
+    loop_stall_threshold_ms: float = 50.0
+    admin_token: str = ""
+    profile_max_seconds: float = 60.0
+
+    # Logs go through a bounded queue to a writer thread ("json" or "text").
+    # Request logs are sampled per route path prefix; errors and requests
+    # slower than log_slow_request_ms are always logged.
+    log_format: str = "json"
+    log_queue_size: int = 10000
+    log_sample_rates: Dict[str, float] = {"/ingest/ml": 0.01, "/ingest/llm": 0.01}
+    log_slow_request_ms: float = 500.0
+
+    # Webhook alert delivery. New alerts are queued (at most webhook_queue_size)
+    # and coalesced per destination for webhook_batch_window_seconds, up to
+    # webhook_max_batch alerts per POST. Failed POSTs are retried with backoff;
+    # webhook_breaker_failures failed deliveries in a row pause a destination
+    # for webhook_breaker_reset_seconds. Destinations are re-read every
+    # webhook_config_refresh_seconds. URLs must be https and resolve to public
+    # addresses; hosts in webhook_allowed_hosts are exempt from both checks.
+    webhook_allowed_hosts: List[str] = []
+    webhook_queue_size: int = 10000
+    webhook_batch_window_seconds: float = 2.0
+    webhook_max_batch: int = 100
+    webhook_timeout_seconds: float = 5.0
+    webhook_max_retries: int = 3
+    webhook_retry_backoff_seconds: float = 0.5
+    webhook_max_concurrency_per_destination: int = 2
+    webhook_max_connections: int = 100
+    webhook_breaker_failures: int = 5
+    webhook_breaker_reset_seconds: float = 60.0
+    webhook_config_refresh_seconds: float = 60.0
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -0,0 +1,114 @@
+"""
+Binned distributions and the drift statistics computed between them.
+
+A histogram spec is either numeric, {"edges": [c1, ..., ck]} with k cut points
+and k + 1 bins (x < c1, c1 <= x < c2, ..., x >= ck), or categorical,
+{"categories": [a, b, ...]} with one bin per category plus a final bin for
+anything else. Baseline profiles store a spec and its "counts" per feature.
+Live windows count into the same bins, so baseline and live line up bin for
+bin.
+
+`distribution_distances` compares many histograms at once. Rows are features
+and columns are bins, zero-padded to the widest spec.
+"""
+import math
+from collections import Counter
+from typing import Any, Dict, List, Mapping, Sequence
+
+import numpy as np
+
+
+# Added to every bin probability before PSI so empty bins stay finite.
+PSI_EPSILON = 1e-4
+
+
+class HistogramSpec:
+    def __init__(self, spec: Mapping[str, Any]):
+        self.edges = None
+        self.categories: Dict[str, int] = {}
+        if "edges" in spec:
+            self.edges = np.asarray(spec["edges"], dtype=float)
+            self.size = len(self.edges) + 1
+        else:
+            self.categories = {str(c): i for i, c in enumerate(spec.get("categories", []))}
+            self.size = len(self.categories) + 1
+
+    @property
+    def numeric(self) -> bool:
+        return self.edges is not None
+
+    def bin_numbers(self, numbers: np.ndarray) -> Dict[int, int]:
+        """Count a float array into numeric bins; NaN (missing) is skipped."""
+        numbers = numbers[~np.isnan(numbers)]
+        if not numbers.size:
+            return {}
+        counts = np.bincount(np.searchsorted(self.edges, numbers, side="right"), minlength=self.size)
+        return {int(i): int(counts[i]) for i in np.flatnonzero(counts)}
+
+    def bin_counts(self, values: Sequence[Any]) -> Dict[int, int]:
+        """Count values into bins; values that do not fit the spec (None, a string
+        for a numeric spec) are skipped."""
+        if self.numeric:
+            return self.bin_numbers(number_matrix([values])[0])
+        other = self.size - 1
+        counted = Counter(
+            self.categories.get(str(value), other) for value in values if value is not None
+        )
+        return dict(counted)
+
+
+def _number(value: Any) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    return math.nan
+
+
+def number_matrix(rows: Sequence[Sequence[Any]]) -> np.ndarray:
+    """Float matrix of rows of values; None and non-numeric values become NaN."""
+    shape = (len(rows), len(rows[0]) if rows else 0)
+    try:
+        # Fast path: numbers and None (which numpy turns into NaN).
+        return np.array(rows, dtype=float).reshape(shape)
+    except (TypeError, ValueError):
+        return np.array([[_number(v) for v in row] for row in rows], dtype=float).reshape(shape)
+
+
+def distribution_distances(baseline: np.ndarray, live: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    PSI, Kolmogorov-Smirnov and Jensen-Shannon (base 2, 0..1) per row between
+    baseline and live bin counts of the same shape. Rows whose baseline or
+    live counts are all zero come back as NaN.
+    """
+    baseline = np.asarray(baseline, dtype=float)
+    live = np.asarray(live, dtype=float)
+    b_total = baseline.sum(axis=1, keepdims=True)
+    l_total = live.sum(axis=1, keepdims=True)
+    empty = (b_total[:, 0] == 0) | (l_total[:, 0] == 0)
+    p = baseline / np.where(b_total == 0, 1.0, b_total)
+    q = live / np.where(l_total == 0, 1.0, l_total)
+
+    # Bins that are zero-padding hold 0 on both sides and contribute nothing.
+    ps = p + PSI_EPSILON
+    qs = q + PSI_EPSILON
+    psi = ((qs - ps) * np.log(qs / ps)).sum(axis=1)
+
+    ks = np.abs(np.cumsum(p, axis=1) - np.cumsum(q, axis=1)).max(axis=1)
+
+    m = (p + q) / 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kl_pm = np.where(p > 0, p * np.log2(p / m), 0.0).sum(axis=1)
+        kl_qm = np.where(q > 0, q * np.log2(q / m), 0.0).sum(axis=1)
+    js = np.clip((kl_pm + kl_qm) / 2, 0.0, 1.0)
+
+    for values in (psi, ks, js):
+        values[empty] = np.nan
+    return {"psi": psi, "ks": ks, "js": js}
+
+
+def counts_matrix(rows: List[Mapping[Any, int]], width: int) -> np.ndarray:
+    """Dense (len(rows), width) matrix from sparse {bin: count} rows."""
+    matrix = np.zeros((len(rows), width))
+    for i, row in enumerate(rows):
+        for bin_index, count in row.items():
+            matrix[i, int(bin_index)] += count
+    return matrix
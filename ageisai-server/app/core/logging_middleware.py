@@ -1,26 +1,64 @@
 import time
+import random
 import logging
 from typing import Callable
 
 from fastapi import Request
 
+from app.core.config import get_settings
+from app.core.metrics import http_request_duration
+from app.core.structured_logging import start_spans
+
 logger = logging.getLogger("aegisai")
 
+_settings = get_settings()
+# Longest prefix first so "/ingest/ml/stream" can override "/ingest/ml".
+_sample_rates = sorted(_settings.log_sample_rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+
+def _sample_rate(path: str) -> float:
+    for prefix, rate in _sample_rates:
+        if path.startswith(prefix):
+            return rate
+    return 1.0
+
 
 async def logging_middleware(request: Request, call_next: Callable):
-    start_time = time.time()
+    start_time = time.perf_counter()
+    spans = start_spans()
     response = None
     try:
         response = await call_next(request)
         return response
     finally:
-        process_time = (time.time() - start_time) * 1000
+        elapsed = time.perf_counter() - start_time
+        process_time = elapsed * 1000
         status_code = response.status_code if response else 500
-        logger.info(
-            "%s %s - %d - %.2fms",
-            request.method,
-            request.url.path,
-            status_code,
-            process_time,
-        )
+        # Label by route template, not raw path, to keep cardinality bounded.
+        route = request.scope.get("route")
+        route_path = route.path if route is not None else "unmatched"
+        http_request_duration.observe(elapsed, request.method, route_path, str(status_code))
 
+        path = request.url.path
+        if (
+            status_code >= 400
+            or process_time >= _settings.log_slow_request_ms
+            or random.random() < _sample_rate(path)
+        ):
+            logger.info(
+                "%s %s - %d - %.2fms",
+                request.method,
+                path,
+                status_code,
+                process_time,
+                extra={
+                    "fields": {
+                        "method": request.method,
+                        "route": route_path,
+                        "path": path,
+                        "status": status_code,
+                        "duration_ms": round(process_time, 2),
+                        "spans": {name: round(ms, 2) for name, ms in spans.items()},
+                    }
+                },
+            )
@@ -0,0 +1,179 @@
+"""
+Event-loop lag sampling, stall detection and an on-demand sampling profiler.
+
+A heartbeat coroutine wakes every `loop_lag_interval_ms` and records how late
+it woke (loop lag). A watchdog thread watches that heartbeat. When the loop
+has not run it for longer than `loop_stall_threshold_ms`, the watchdog
+captures the loop thread's stack while it is still blocked, logs it and keeps
+it for GET /admin/loop. That stack shows the code holding the loop, e.g. a
+CPU-heavy scorer or a sync call.
+
+`sample_profile` samples every thread's stack from a background thread and
+returns them in collapsed-stack format, ready for flamegraph.pl or speedscope.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter as StackCounter
+from collections import deque
+from datetime import datetime
+from types import FrameType
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import get_settings
+from app.core.metrics import Counter, Histogram, registry
+
+
+logger = logging.getLogger("aegisai.loop")
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+MAX_STACK_DEPTH = 64
+RECENT_STALLS = 20
+
+loop_lag = registry.register(
+    Histogram(
+        "aegisai_event_loop_lag_seconds",
+        "How late the loop heartbeat woke up.",
+        buckets=LAG_BUCKETS,
+    )
+)
+loop_stalls = registry.register(
+    Counter("aegisai_event_loop_stalls_total", "Times the loop was blocked past the stall threshold.")
+)
+
+_CWD = os.getcwd() + os.sep
+_STDLIB = os.path.dirname(os.__file__) + os.sep
+
+
+def _short_path(filename: str) -> str:
+    marker = "site-packages" + os.sep
+    if marker in filename:
+        return filename.split(marker, 1)[1]
+    for prefix in (_CWD, _STDLIB):
+        if filename.startswith(prefix):
+            return filename[len(prefix):]
+    return filename
+
+
+def _frame_names(frame: Optional[FrameType], with_lines: bool) -> List[str]:
+    """Outermost-first frame labels for a stack."""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        line = frame.f_lineno if with_lines else code.co_firstlineno
+        names.append(f"{code.co_name} ({_short_path(code.co_filename)}:{line})")
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+class LoopMonitor:
+    def __init__(self):
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat = time.monotonic()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._stalled = False
+        self.max_lag = 0.0
+        self.recent_stalls: Deque[Dict[str, Any]] = deque(maxlen=RECENT_STALLS)
+
+    def start(self) -> None:
+        settings = get_settings()
+        if settings.loop_stall_threshold_ms <= 0:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._heartbeat_task = asyncio.get_running_loop().create_task(
+            self._beat(settings.loop_lag_interval_ms / 1000)
+        )
+        self._watchdog = threading.Thread(
+            target=self._watch,
+            args=(settings.loop_lag_interval_ms / 1000, settings.loop_stall_threshold_ms / 1000),
+            name="loop-watchdog",
+            daemon=True,
+        )
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+
+    async def _beat(self, interval: float) -> None:
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            self._heartbeat = now
+            lag = max(0.0, now - expected)
+            loop_lag.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def _watch(self, interval: float, threshold: float) -> None:
+        # Check often enough to catch the stall while it is still happening.
+        poll = min(interval, threshold) / 2
+        while not self._stopped.wait(poll):
+            blocked = time.monotonic() - self._heartbeat - interval
+            if blocked <= threshold:
+                self._stalled = False
+                continue
+            if self._stalled:
+                continue
+            self._stalled = True
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = _frame_names(frame, with_lines=True)
+            loop_stalls.inc()
+            self.recent_stalls.append(
+                {"at": datetime.utcnow(), "blocked_ms": round(blocked * 1000, 1), "stack": stack}
+            )
+            logger.warning(
+                "Event loop blocked for over %.0f ms in:\n  %s",
+                blocked * 1000,
+                "\n  ".join(stack[-15:]),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_lag_ms": round(self.max_lag * 1000, 2),
+            "stalls": list(self.recent_stalls),
+        }
+
+
+loop_monitor = LoopMonitor()
+
+_profile_lock = threading.Lock()
+
+
+def sample_profile(seconds: float, interval: float) -> Optional[str]:
+    """
+    Sample all thread stacks every `interval` seconds for `seconds` and return
+    collapsed stacks ("thread;outer;...;inner count" per line). Blocking; run
+    it off the event loop. Returns None if another profile is running.
+    """
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        counts: StackCounter = StackCounter()
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == me:
+                    continue
+                thread = names.get(thread_id) or str(thread_id)
+                counts[";".join([thread] + _frame_names(frame, with_lines=False))] += 1
+            time.sleep(interval)
+        return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+    finally:
+        _profile_lock.release()
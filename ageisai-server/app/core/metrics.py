@@ -0,0 +1,241 @@
+"""
+In-process metrics registry rendered in the Prometheus text format at /metrics.
+
+Metrics are plain dicts of floats keyed by label values. Recording is a dict
+lookup plus a few additions under an uncontended lock. The lock matters
+because the Mongo command listener runs on pymongo's threads. Nothing is
+formatted until /metrics is scraped.
+"""
+import abc
+import functools
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+
+LabelValues = Tuple[str, ...]
+
+# Seconds; covers sub-millisecond Mongo calls up to slow background tasks.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+class _Metric(abc.ABC):
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines += self._samples()
+        return lines
+
+    @abc.abstractmethod
+    def _samples(self) -> List[str]:
+        ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+        # Per label set: non-cumulative bucket counts (+Inf last), sum, count.
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0.0] * (len(self.buckets) + 3)
+            state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for labels, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket_labels = _labels(self.labelnames, labels, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {_number(cumulative)}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(state[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {_number(state[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Callable[[], Iterable[_Metric]]] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[_Metric]]) -> None:
+        """Register a callback that builds metrics from other state at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in self._collectors:
+            for metric in collector():
+                lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(
+    Histogram(
+        "aegisai_http_request_duration_seconds",
+        "HTTP request latency by route template.",
+        ("method", "route", "status"),
+    )
+)
+task_duration = registry.register(
+    Histogram(
+        "aegisai_background_task_duration_seconds",
+        "Duration of post-ingest background tasks.",
+        ("task",),
+    )
+)
+tasks_in_flight = registry.register(
+    Gauge("aegisai_background_tasks_in_flight", "Background tasks currently running.", ("task",))
+)
+task_failures = registry.register(
+    Counter("aegisai_background_task_failures_total", "Background tasks that raised.", ("task",))
+)
+mongo_command_duration = registry.register(
+    Histogram(
+        "aegisai_mongo_command_duration_seconds",
+        "MongoDB command latency by collection and command.",
+        ("collection", "command", "outcome"),
+    )
+)
+ingest_batch_size = registry.register(
+    Histogram(
+        "aegisai_ingest_batch_size",
+        "Events per ingest batch (per chunk for streaming ingest).",
+        ("source",),
+        buckets=SIZE_BUCKETS,
+    )
+)
+events_ingested = registry.register(
+    Counter("aegisai_events_ingested_total", "Events inserted per org.", ("org", "source"))
+)
+ingest_duplicates = registry.register(
+    Counter(
+        "aegisai_ingest_duplicates_total",
+        "Resent events and batches dropped by ingest, by kind (event or batch).",
+        ("source", "kind"),
+    )
+)
+
+
+def timed_task(name: str):
+    """Record duration, in-flight count and failures of an async task function."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            tasks_in_flight.inc(name)
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            except Exception:
+                task_failures.inc(name)
+                raise
+            finally:
+                task_duration.observe(time.perf_counter() - start, name)
+                tasks_in_flight.dec(name)
+
+        return wrapper
+
+    return decorator
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener feeding mongo_command_duration."""
+
+    def __init__(self):
+        self._pending: Dict[Tuple[object, int], Tuple[str, str]] = {}
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        target = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            target = event.command.get("collection")
+        collection = target if isinstance(target, str) else ""
+        self._pending[(event.connection_id, event.request_id)] = (collection, event.command_name)
+
+    def _finish(self, event, outcome: str) -> None:
+        labels: Optional[Tuple[str, str]] = self._pending.pop((event.connection_id, event.request_id), None)
+        if labels is not None:
+            mongo_command_duration.observe(event.duration_micros / 1e6, labels[0], labels[1], outcome)
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._finish(event, "ok")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._finish(event, "error")
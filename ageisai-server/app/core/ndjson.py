@@ -0,0 +1,60 @@
+import zlib
+from typing import AsyncIterator, Optional, Tuple
+
+
+# Decompressed bytes produced per step, so a small gzip body cannot inflate
+# into one huge buffer.
+INFLATE_STEP = 64 * 1024
+
+
+async def _inflate(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    async for raw in stream:
+        data = inflater.decompress(raw, INFLATE_STEP)
+        while data:
+            yield data
+            data = inflater.decompress(inflater.unconsumed_tail, INFLATE_STEP)
+    tail = inflater.flush()
+    if tail:
+        yield tail
+
+
+async def iter_ndjson_lines(
+    stream: AsyncIterator[bytes],
+    gzip: bool,
+    max_line_bytes: int,
+) -> AsyncIterator[Tuple[int, Optional[bytes]]]:
+    """
+    Yield (line_number, line) for each non-blank line of an NDJSON body as it
+    arrives. A line longer than `max_line_bytes` is discarded and yielded as
+    None, so memory stays bounded by one line plus one network read.
+    """
+    if gzip:
+        stream = _inflate(stream)
+    buffer = b""
+    line_no = 0
+    oversized = False
+    async for data in stream:
+        buffer += data
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            line_no += 1
+            if oversized or end - start > max_line_bytes:
+                oversized = False
+                yield line_no, None
+            else:
+                line = buffer[start:end].strip()
+                if line:
+                    yield line_no, line
+            start = end + 1
+        buffer = buffer[start:]
+        if len(buffer) > max_line_bytes:
+            oversized = True
+            buffer = b""
+    if oversized:
+        yield line_no + 1, None
+    elif buffer.strip():
+        yield line_no + 1, buffer.strip()
@@ -0,0 +1,78 @@
+import asyncio
+import json
+from typing import Any, Dict, Set
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import get_settings
+
+
+class Subscription:
+    """One connected viewer: a bounded queue of pre-encoded SSE frames."""
+
+    def __init__(self, org_key: str, max_queue: int):
+        self.org_key = org_key
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def offer(self, frame: bytes) -> None:
+        # Slow consumers lose their oldest frames instead of stalling the
+        # publisher or growing without bound.
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(frame)
+
+
+class Broker:
+    """
+    In-process fan-out of dashboard events to subscribed connections.
+
+    Each published event is serialized once and the same bytes are queued for
+    every subscriber of the org, so publishing stays O(viewers) queue puts.
+    """
+
+    def __init__(self, max_queue: int):
+        self.max_queue = max_queue
+        self._subscribers: Dict[str, Set[Subscription]] = {}
+
+    def subscribe(self, org_id) -> Subscription:
+        sub = Subscription(str(org_id), self.max_queue)
+        self._subscribers.setdefault(sub.org_key, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        subs = self._subscribers.get(sub.org_key)
+        if subs is None:
+            return
+        subs.discard(sub)
+        if not subs:
+            del self._subscribers[sub.org_key]
+
+    def subscriber_count(self, org_id=None) -> int:
+        if org_id is not None:
+            return len(self._subscribers.get(str(org_id), ()))
+        return sum(len(subs) for subs in self._subscribers.values())
+
+    def publish(self, org_id, event: str, data: Any) -> None:
+        subs = self._subscribers.get(str(org_id))
+        if not subs:
+            return
+        frame = encode_sse(event, data)
+        for sub in subs:
+            sub.offer(frame)
+
+
+def encode_sse(event: str, data: Any) -> bytes:
+    payload = json.dumps(
+        jsonable_encoder(data, custom_encoder={ObjectId: str}),
+        separators=(",", ":"),
+    )
+    return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+broker = Broker(get_settings().stream_max_queue)
@@ -0,0 +1,168 @@
+import math
+import time
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.config import get_settings
+from app.core.metrics import Counter, registry
+
+
+class TokenBucket:
+    """
+    Classic token bucket refilled continuously at `rate` tokens/second up to
+    `capacity`. A request larger than the capacity is admitted once the bucket
+    is full and leaves it in debt, so oversized batches are slowed, not
+    rejected forever. A non-positive rate means unlimited.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be consumed; 0 if it can be right now."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill(time.monotonic())
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        if self.rate > 0:
+            self.tokens -= amount
+
+    def reconfigure(self, rate: float, capacity: float) -> None:
+        self._refill(time.monotonic())
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = min(self.tokens, capacity)
+
+
+class OrgQuota:
+    def __init__(self, events_per_second: float, bytes_per_second: float, burst_seconds: float):
+        self.events = TokenBucket(events_per_second, events_per_second * burst_seconds)
+        self.bytes = TokenBucket(bytes_per_second, bytes_per_second * burst_seconds)
+        self.loaded_at = time.monotonic()
+        self.admitted_requests = 0
+        self.throttled_requests = 0
+        self.throttled_events = 0
+        self.throttled_bytes = 0
+
+    def configure(self, events_per_second: float, bytes_per_second: float, burst_seconds: float) -> None:
+        self.events.reconfigure(events_per_second, events_per_second * burst_seconds)
+        self.bytes.reconfigure(bytes_per_second, bytes_per_second * burst_seconds)
+        self.loaded_at = time.monotonic()
+
+    def check_bytes(self, n_bytes: int) -> Optional[float]:
+        """
+        Seconds to wait if the bytes bucket cannot take `n_bytes` now, else None.
+        Consumes nothing; lets a request be refused before its body is decoded.
+        """
+        wait = self.bytes.wait_time(n_bytes)
+        if wait > 0:
+            self.throttled_requests += 1
+            self.throttled_bytes += n_bytes
+            return wait
+        return None
+
+    def try_admit(self, n_events: int, n_bytes: int) -> Optional[float]:
+        """Consume from both buckets, or return the seconds to wait and consume nothing."""
+        wait = max(self.events.wait_time(n_events), self.bytes.wait_time(n_bytes))
+        if wait > 0:
+            self.throttled_requests += 1
+            self.throttled_events += n_events
+            self.throttled_bytes += n_bytes
+            return wait
+        self.events.consume(n_events)
+        self.bytes.consume(n_bytes)
+        self.admitted_requests += 1
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "events_per_second": self.events.rate,
+            "bytes_per_second": self.bytes.rate,
+            "available_events": max(0.0, self.events.tokens),
+            "available_bytes": max(0.0, self.bytes.tokens),
+            "admitted_requests": self.admitted_requests,
+            "throttled_requests": self.throttled_requests,
+            "throttled_events": self.throttled_events,
+            "throttled_bytes": self.throttled_bytes,
+        }
+
+
+class QuotaRegistry:
+    """
+    Per-org ingest buckets held in memory. Limits come from the `org_quotas`
+    collection (falling back to settings) and are re-read at most every
+    `ingest_quota_refresh_seconds`, so the hot path is a dict lookup.
+    Buckets are per process: N workers admit up to N times the configured rate.
+    """
+
+    def __init__(self):
+        self._quotas: Dict[str, OrgQuota] = {}
+
+    async def _load_limits(self, db: AsyncIOMotorDatabase, org_id) -> tuple:
+        settings = get_settings()
+        doc = await db["org_quotas"].find_one({"organization_id": org_id}) or {}
+        return (
+            float(doc.get("events_per_second", settings.ingest_default_events_per_second)),
+            float(doc.get("bytes_per_second", settings.ingest_default_bytes_per_second)),
+            float(doc.get("burst_seconds", settings.ingest_burst_seconds)),
+        )
+
+    async def get(self, db: AsyncIOMotorDatabase, org_id) -> OrgQuota:
+        key = str(org_id)
+        quota = self._quotas.get(key)
+        refresh = get_settings().ingest_quota_refresh_seconds
+        if quota is None:
+            quota = OrgQuota(*await self._load_limits(db, org_id))
+            self._quotas[key] = quota
+        elif time.monotonic() - quota.loaded_at > refresh:
+            # Mark first so concurrent requests don't all reload.
+            quota.loaded_at = time.monotonic()
+            quota.configure(*await self._load_limits(db, org_id))
+        return quota
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {org: quota.stats() for org, quota in self._quotas.items()}
+
+    def org_stats(self, org_id) -> Optional[Dict[str, Any]]:
+        quota = self._quotas.get(str(org_id))
+        return quota.stats() if quota else None
+
+
+ingest_quotas = QuotaRegistry()
+
+
+def _quota_metrics():
+    throttled_requests = Counter(
+        "aegisai_ingest_throttled_requests_total",
+        "Ingest requests (or stream chunks) rejected by the org's quota.",
+        ("org",),
+    )
+    throttled_events = Counter(
+        "aegisai_ingest_throttled_events_total",
+        "Events in throttled ingest requests.",
+        ("org",),
+    )
+    for org, stats in ingest_quotas.stats().items():
+        throttled_requests.inc(org, amount=stats["throttled_requests"])
+        throttled_events.inc(org, amount=stats["throttled_events"])
+    return [throttled_requests, throttled_events]
+
+
+registry.add_collector(_quota_metrics)
+
+
+def retry_after_header(wait_seconds: float) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(wait_seconds)))}
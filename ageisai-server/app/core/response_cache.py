@@ -0,0 +1,109 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from app.core.config import get_settings
+
+
+# Per-org data version, bumped whenever ingest, scoring or alerting writes
+# something the dashboard shows. Cached responses from an older version are
+# never served. Versions are per process: with several workers, a write in one
+# worker only reaches the others' caches once their entries hit the TTL.
+_org_versions: Dict[str, int] = {}
+
+CacheKey = Tuple[str, str, str]
+
+
+def bump_org_version(org_id) -> None:
+    key = str(org_id)
+    _org_versions[key] = _org_versions.get(key, 0) + 1
+
+
+def org_version(org_id) -> int:
+    return _org_versions.get(str(org_id), 0)
+
+
+class _Entry:
+    __slots__ = ("version", "expires_at", "body", "etag")
+
+    def __init__(self, version: int, expires_at: float, body: bytes, etag: str):
+        self.version = version
+        self.expires_at = expires_at
+        self.body = body
+        self.etag = etag
+
+
+class ResponseCache:
+    """Bounded LRU of serialized JSON responses keyed by (org, path, query)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+
+    def get(self, key: CacheKey, version: int) -> _Entry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.version != version or entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: CacheKey, entry: _Entry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+dashboard_cache = ResponseCache(get_settings().dashboard_cache_max_entries)
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip() for tag in header.split(","))
+
+
+def _json_response(entry: _Entry, request: Request) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request, entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+async def cached_response(
+    request: Request,
+    org_id,
+    build: Callable[[], Awaitable[Any]],
+) -> Response:
+    """
+    Serve a dashboard payload from the cache, answering 304 when the client's
+    If-None-Match still matches; otherwise run `build`, serialize and cache it.
+    """
+    settings = get_settings()
+    key: CacheKey = (str(org_id), request.url.path, str(request.query_params))
+    version = org_version(org_id)
+    entry = dashboard_cache.get(key, version)
+    if entry is None:
+        payload = await build()
+        body = json.dumps(
+            jsonable_encoder(payload), separators=(",", ":"), ensure_ascii=False
+        ).encode("utf-8")
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+        entry = _Entry(version, time.monotonic() + settings.dashboard_cache_ttl_seconds, body, etag)
+        if settings.dashboard_cache_ttl_seconds > 0:
+            dashboard_cache.put(key, entry)
+    return _json_response(entry, request)
@@ -1,3 +1,4 @@
+from dataclasses import dataclass
 from enum import Enum
 
 
@@ -7,9 +8,36 @@ class RiskLabel(str, Enum):
     RISKY = "risky"
 
 
-def classify_risk(score: float) -> RiskLabel:
-    if score >= 0.75:
+def classify_risk(score: float, risky: float = 0.75, suspicious: float = 0.4) -> RiskLabel:
+    if score >= risky:
         return RiskLabel.RISKY
-    elif score >= 0.4:
+    elif score >= suspicious:
         return RiskLabel.SUSPICIOUS
     return RiskLabel.NORMAL
+
+
+@dataclass(frozen=True)
+class ScoringProfile:
+    """
+    Weights, label thresholds and the prompt length cap used by the risk
+    scorers. The defaults are the built-in scoring; orgs can override them
+    (app/services/scoring_profiles.py). Frozen and picklable, so one instance
+    is shared by every batch of an org and can be sent to worker processes.
+    """
+
+    ml_confidence_weight: float = 0.4
+    ml_drift_weight: float = 0.3
+    ml_outlier_weight: float = 0.3
+    llm_sensitive_weight: float = 0.5
+    llm_jailbreak_weight: float = 0.3
+    llm_length_weight: float = 0.2
+    risky_threshold: float = 0.75
+    suspicious_threshold: float = 0.4
+    prompt_length_cap: int = 2000
+    version: int = 0
+
+    def classify(self, score: float) -> RiskLabel:
+        return classify_risk(score, self.risky_threshold, self.suspicious_threshold)
+
+
+DEFAULT_SCORING = ScoringProfile()
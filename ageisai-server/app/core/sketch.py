@@ -0,0 +1,75 @@
+import math
+from typing import Dict, Iterable, Mapping, Optional
+
+
+# Relative accuracy of quantile estimates (2%). Buckets grow geometrically by
+# GAMMA, so a latency range of 1 microsecond to 1 hour needs < 600 buckets.
+RELATIVE_ACCURACY = 0.02
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+
+# Values at or below this go to the zero bucket.
+MIN_VALUE = 1e-3
+ZERO_KEY = "z"
+
+
+def sketch_key(value: float) -> str:
+    """Return the bucket key for a non-negative value."""
+    if value <= MIN_VALUE:
+        return ZERO_KEY
+    return str(math.ceil(math.log(value) / _LOG_GAMMA))
+
+
+def _bucket_value(key: str) -> float:
+    """Representative value of a bucket (midpoint in relative terms)."""
+    if key == ZERO_KEY:
+        return 0.0
+    index = int(key)
+    return 2 * GAMMA ** index / (GAMMA + 1)
+
+
+class LatencySketch:
+    """
+    Mergeable log-bucketed quantile sketch (DDSketch-style).
+
+    Counts are keyed by string bucket index so they can be stored in a Mongo
+    subdocument and updated with $inc; merging two sketches is adding counts.
+    """
+
+    def __init__(self, counts: Optional[Mapping[str, int]] = None):
+        self.counts: Dict[str, int] = {}
+        if counts:
+            self.merge(counts)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, value: float, count: int = 1) -> None:
+        key = sketch_key(value)
+        self.counts[key] = self.counts.get(key, 0) + count
+
+    def extend(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, counts: Mapping[str, int]) -> None:
+        for key, n in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + int(n)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the q-quantile (0 <= q <= 1); None when the sketch is empty."""
+        total = self.count
+        if total == 0:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for key in sorted(self.counts, key=_sort_key):
+            seen += self.counts[key]
+            if seen > rank:
+                return _bucket_value(key)
+        return _bucket_value(max(self.counts, key=_sort_key))
+
+
+def _sort_key(key: str) -> float:
+    return -math.inf if key == ZERO_KEY else int(key)
@@ -0,0 +1,408 @@
+"""
+Explain-plan regression check for the query shapes in app.db.indexes.
+
+Usage:
+    python -m app.db.explain_check [--timeseries]
+
+Builds a scratch database (<db>_explain_check) on MONGO_URI, applies the index
+registry, seeds each collection with matching and non-matching documents and
+runs every QueryShape through `explain` with executionStats. A shape fails if
+its winning plan scans the collection, needs a blocking SORT for an indexed
+sort, or examines more documents than its bound. --timeseries creates the
+event collections as time-series collections and checks the shapes as issued
+in that mode, with org/model under the metaField.
+
+The check also walks the AST of every module under app/ and fails on any
+collection query without a QueryShape: a query in function `f` of module `m`
+needs a shape named "m.f" (or "m.f.<variant>") on the collection it reads.
+Collection names are resolved through module constants and imports, and
+f-strings such as f"{source}_events" match every registered collection they
+can produce. _id point lookups need no shape. Exits non-zero on any failure
+so it can gate CI; tests/test_query_shapes.py runs the same checks.
+"""
+import argparse
+import ast
+import asyncio
+import re
+import sys
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId, SON
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import BulkWriteError
+
+from app.core.config import get_settings
+from app.db.indexes import EVENT_COLLECTIONS, QUERY_SHAPES, SAMPLE_TIME, QueryShape, ensure_indexes, query_shapes
+from app.db.mongo import EVENT_META_FIELD, timeseries_options
+
+
+MATCHING_DOCS = 20
+NOISE_DOCS = 500
+INDEX_STAGES = {
+    "IXSCAN",
+    "IDHACK",
+    "EXPRESS_IXSCAN",
+    "EXPRESS_CLUSTERED_IXSCAN",
+    "COUNT_SCAN",
+    "DISTINCT_SCAN",
+}
+
+
+def _set_path(doc: Dict[str, Any], path: str, value: Any) -> None:
+    *parents, leaf = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[leaf] = value
+
+
+def _matching_doc(shape: QueryShape, i: int) -> Dict[str, Any]:
+    doc: Dict[str, Any] = {}
+    for key, value in shape.filter.items():
+        if key.startswith("$"):
+            continue
+        if isinstance(value, dict):
+            if "$in" in value:
+                value = value["$in"][0]
+            else:
+                value = value.get("$gte", value.get("$lte"))
+        _set_path(doc, key, value)
+    for key, _ in shape.sort or []:
+        if key != "_id":
+            _set_path(doc, key, SAMPLE_TIME - timedelta(minutes=i))
+    if shape.distinct:
+        _set_path(doc, shape.distinct, f"value-{i % 3}")
+    if shape.collection in EVENT_COLLECTIONS and not isinstance(doc.get("timestamp"), datetime):
+        # Time-series collections reject documents without a timeField.
+        doc["timestamp"] = SAMPLE_TIME - timedelta(minutes=i)
+    return doc
+
+
+def _noise_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Same shape as a matching document, but with every equality value changed."""
+    noise: Dict[str, Any] = {}
+    for key, value in doc.items():
+        if isinstance(value, dict):
+            noise[key] = _noise_doc(value)
+        elif isinstance(value, ObjectId):
+            noise[key] = ObjectId()
+        elif isinstance(value, str):
+            noise[key] = f"{value}-{ObjectId()}"
+        else:
+            noise[key] = value
+    return noise
+
+
+async def _seed(db: AsyncIOMotorDatabase, shapes: Iterable[QueryShape]) -> None:
+    for shape in shapes:
+        docs = [_matching_doc(shape, i) for i in range(MATCHING_DOCS)]
+        docs += [_noise_doc(docs[i % MATCHING_DOCS]) for i in range(NOISE_DOCS)]
+        try:
+            await db[shape.collection].insert_many(docs, ordered=False)
+        except BulkWriteError:
+            # Unique indexes keep only one matching document; that is fine.
+            pass
+
+
+def _walk_plan(node: Any, stages: List[str], examined: List[int]) -> None:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key in ("rejectedPlans", "allPlansExecution"):
+                continue
+            if key == "stage" and isinstance(value, str):
+                stages.append(value)
+            elif key in ("totalDocsExamined", "docsExamined") and isinstance(value, int):
+                examined.append(value)
+            else:
+                _walk_plan(value, stages, examined)
+    elif isinstance(node, list):
+        for item in node:
+            _walk_plan(item, stages, examined)
+
+
+async def _explain(db: AsyncIOMotorDatabase, shape: QueryShape) -> Dict[str, Any]:
+    if shape.distinct:
+        command: Dict[str, Any] = {"distinct": shape.collection, "key": shape.distinct, "query": shape.filter}
+    elif shape.pipeline_tail is not None:
+        command = {
+            "aggregate": shape.collection,
+            "pipeline": [{"$match": shape.filter}, *shape.pipeline_tail],
+            "cursor": {},
+        }
+    else:
+        command = {"find": shape.collection, "filter": shape.filter}
+        if shape.sort:
+            command["sort"] = SON(list(shape.sort))
+        if shape.limit:
+            command["limit"] = shape.limit
+    return await db.command(SON([("explain", command), ("verbosity", "executionStats")]))
+
+
+def check_plan(shape: QueryShape, explain: Dict[str, Any], matching: int) -> List[str]:
+    stages: List[str] = []
+    examined: List[int] = []
+    _walk_plan(explain, stages, examined)
+    problems = []
+    if "COLLSCAN" in stages:
+        problems.append("COLLSCAN in winning plan")
+    if not INDEX_STAGES.intersection(stages):
+        problems.append(f"no index scan (stages: {', '.join(stages) or 'none'})")
+    if shape.sort and "SORT" in stages:
+        problems.append("blocking SORT; index does not provide sort order")
+    bound = shape.max_docs_examined or matching
+    if examined and max(examined) > bound:
+        problems.append(f"docsExamined={max(examined)} exceeds bound {bound}")
+    return problems
+
+
+# Collection methods that run a filter (or, for bulk_write, filtered writes).
+QUERY_METHODS = {
+    "find",
+    "find_one",
+    "find_one_and_update",
+    "find_one_and_replace",
+    "find_one_and_delete",
+    "update_one",
+    "update_many",
+    "replace_one",
+    "delete_one",
+    "delete_many",
+    "count_documents",
+    "distinct",
+    "aggregate",
+    "bulk_write",
+}
+APP_ROOT = Path(__file__).resolve().parents[1]
+# Names a Motor database is bound to in app code (also as self.db).
+DB_NAMES = {"db", "mongo_db"}
+
+
+@dataclass(frozen=True)
+class QuerySite:
+    path: str
+    line: int
+    # Expected QueryShape name prefix: "<module>.<enclosing function>".
+    key: str
+    method: str
+    # Collection name if it could be resolved statically; patterns like
+    # f"{source}_events" resolve to every registered collection they match.
+    collections: FrozenSet[str]
+    resolved: bool
+
+
+def _module_name(root: Path, path: Path) -> str:
+    return ".".join(path.relative_to(root.parent).with_suffix("").parts)
+
+
+def _string_constants(tree: ast.Module) -> Dict[str, str]:
+    constants = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    constants[target.id] = node.value.value
+    return constants
+
+
+def _is_db(node: ast.expr) -> bool:
+    if isinstance(node, ast.Name):
+        return node.id in DB_NAMES
+    return isinstance(node, ast.Attribute) and node.attr in DB_NAMES
+
+
+def _query_helpers(tree: ast.Module) -> Dict[str, Set[int]]:
+    """Module functions that query a collection passed in: name -> positional indexes of those parameters."""
+    helpers: Dict[str, Set[int]] = {}
+    for node in ast.walk(tree):
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        params = [arg.arg for arg in node.args.args]
+        for call in ast.walk(node):
+            if (
+                isinstance(call, ast.Call)
+                and isinstance(call.func, ast.Attribute)
+                and call.func.attr in QUERY_METHODS
+                and isinstance(call.func.value, ast.Name)
+                and call.func.value.id in params
+            ):
+                helpers.setdefault(node.name, set()).add(params.index(call.func.value.id))
+    return helpers
+
+
+class _QueryVisitor(ast.NodeVisitor):
+    def __init__(
+        self,
+        path: str,
+        module: str,
+        names: Dict[str, str],
+        known: Set[str],
+        helpers: Dict[str, Set[int]],
+    ):
+        self.path = path
+        self.module = module
+        self.names = names
+        self.known = known
+        # Calls to these count as queries on the collections passed to them.
+        self.helpers = helpers
+        self.sites: List[QuerySite] = []
+        self._functions: List[str] = []
+        # Per function: local name -> collection expression it was bound to.
+        self._locals: List[Dict[str, ast.expr]] = [{}]
+
+    def _resolve(self, node: ast.expr) -> Tuple[FrozenSet[str], bool]:
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            return frozenset([node.value]), True
+        if isinstance(node, ast.Name) and node.id in self.names:
+            return frozenset([self.names[node.id]]), True
+        if isinstance(node, ast.JoinedStr):
+            pattern = "".join(
+                re.escape(part.value) if isinstance(part, ast.Constant) else ".+" for part in node.values
+            )
+            return frozenset(name for name in self.known if re.fullmatch(pattern, name)), True
+        return frozenset(), False
+
+    def _collection(self, node: ast.expr) -> Optional[ast.expr]:
+        """The subscript of `db[...]` that `node` evaluates to, if any."""
+        if isinstance(node, ast.Subscript) and _is_db(node.value):
+            return node.slice
+        if isinstance(node, ast.Name):
+            return self._locals[-1].get(node.id)
+        return None
+
+    def _visit_function(self, node) -> None:
+        self._functions.append(node.name)
+        self._locals.append({})
+        self.generic_visit(node)
+        self._locals.pop()
+        self._functions.pop()
+
+    visit_FunctionDef = visit_AsyncFunctionDef = _visit_function
+
+    def visit_Assign(self, node: ast.Assign) -> None:
+        collection = self._collection(node.value)
+        if collection is not None:
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    self._locals[-1][target.id] = collection
+        self.generic_visit(node)
+
+    def _add_site(self, node: ast.Call, method: str, collection: ast.expr) -> None:
+        collections, resolved = self._resolve(collection)
+        function = self._functions[-1] if self._functions else "<module>"
+        key = f"{self.module.rsplit('.', 1)[-1]}.{function}"
+        self.sites.append(QuerySite(self.path, node.lineno, key, method, collections, resolved))
+
+    def visit_Call(self, node: ast.Call) -> None:
+        func = node.func
+        if isinstance(func, ast.Attribute) and func.attr in QUERY_METHODS:
+            collection = self._collection(func.value)
+            if collection is not None and not _is_id_lookup(node):
+                self._add_site(node, func.attr, collection)
+        elif isinstance(func, ast.Name) and func.id in self.helpers:
+            for index in self.helpers[func.id]:
+                collection = self._collection(node.args[index]) if index < len(node.args) else None
+                if collection is not None:
+                    self._add_site(node, func.id, collection)
+        self.generic_visit(node)
+
+
+def _is_id_lookup(call: ast.Call) -> bool:
+    """Point reads/writes by _id always use the _id index and need no shape."""
+    if not call.args or not isinstance(call.args[0], ast.Dict):
+        return False
+    keys = call.args[0].keys
+    return bool(keys) and all(isinstance(k, ast.Constant) and k.value == "_id" for k in keys)
+
+
+def query_sites(root: Path, known: Iterable[str]) -> List[QuerySite]:
+    """Every collection query under `root`, found by walking each module's AST."""
+    known = set(known)
+    trees = {}
+    for path in sorted(root.rglob("*.py")):
+        trees[path] = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    constants = {_module_name(root, path): _string_constants(tree) for path, tree in trees.items()}
+    sites: List[QuerySite] = []
+    for path, tree in trees.items():
+        module = _module_name(root, path)
+        if module == __name__:
+            continue
+        names = dict(constants[module])
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module in constants:
+                for alias in node.names:
+                    value = constants[node.module].get(alias.name)
+                    if value is not None:
+                        names[alias.asname or alias.name] = value
+        visitor = _QueryVisitor(str(path.relative_to(root.parent)), module, names, known, _query_helpers(tree))
+        visitor.visit(tree)
+        sites += visitor.sites
+    return sites
+
+
+def unregistered_queries(root: Path, shapes: Iterable[QueryShape]) -> List[str]:
+    """
+    Queries in code under `root` without a matching QueryShape. A query in
+    function `f` of module `m` needs a shape named "m.f" or "m.f.<variant>"
+    on the collection it reads; _id point lookups are exempt.
+    """
+    shapes = list(shapes)
+    known = {shape.collection for shape in shapes}
+    problems = []
+    for site in query_sites(root, known):
+        covering = {
+            shape.collection
+            for shape in shapes
+            if shape.name == site.key or shape.name.startswith(f"{site.key}.")
+        }
+        where = f"{site.path}:{site.line} {site.method}()"
+        if not covering:
+            problems.append(f"{where}: no QueryShape named {site.key}")
+        elif site.resolved and not site.collections & covering:
+            wanted = ", ".join(sorted(site.collections)) or "an unregistered collection"
+            problems.append(f"{where}: the {site.key} shapes do not cover {wanted}")
+    return problems
+
+
+async def prepare(db: AsyncIOMotorDatabase, shapes: List[QueryShape], timeseries: bool = False) -> None:
+    """Recreate `db` with the index registry applied and documents seeded for `shapes`."""
+    await db.client.drop_database(db.name)
+    if timeseries:
+        for name in EVENT_COLLECTIONS:
+            await db.create_collection(name, **timeseries_options())
+    await ensure_indexes(db, f"{EVENT_META_FIELD}." if timeseries else "")
+    await _seed(db, shapes)
+
+
+async def check_shape(db: AsyncIOMotorDatabase, shape: QueryShape) -> List[str]:
+    matching = await db[shape.collection].count_documents(shape.filter)
+    return check_plan(shape, await _explain(db, shape), matching)
+
+
+async def main(timeseries: bool = False) -> int:
+    settings = get_settings()
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    db = client[f"{settings.mongo_db_name}_explain_check"]
+    shapes = query_shapes(f"{EVENT_META_FIELD}." if timeseries else "")
+    failures = 0
+    try:
+        await prepare(db, shapes, timeseries)
+        for shape in shapes:
+            problems = await check_shape(db, shape)
+            status = "FAIL" if problems else "ok"
+            print(f"{status:<5}{shape.name}" + (f": {'; '.join(problems)}" if problems else ""))
+            failures += bool(problems)
+        for problem in unregistered_queries(APP_ROOT, QUERY_SHAPES):
+            print(f"FAIL {problem}")
+            failures += 1
+    finally:
+        await client.drop_database(db.name)
+        client.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--timeseries", action="store_true", help="check the time-series event layout")
+    sys.exit(asyncio.run(main(parser.parse_args().timeseries)))
@@ -0,0 +1,708 @@
+"""
+Declarative registry of every index and the query shapes that rely on them.
+
+Each QueryShape mirrors a query issued somewhere in app/ with representative
+values. `ensure_indexes` applies `index_specs()` at startup; `app.db.explain_check`
+runs every shape against a scratch database and fails if one does not use an
+index. Add a QueryShape alongside any new query.
+
+Event shapes are written for standard storage; `query_shapes("meta.")` gives
+them as issued in time-series mode, where org/model filters go through
+`prefix_event_filter` to the metaField.
+"""
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+
+IndexKeys = Sequence[Tuple[str, int]]
+
+EVENT_COLLECTIONS = ("ml_events", "llm_events")
+# Event fields stored under the metaField in time-series mode.
+EVENT_META_KEYS = ("organization_id", "model_name")
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    collection: str
+    keys: IndexKeys
+    unique: bool = False
+    options: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class QueryShape:
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: Optional[IndexKeys] = None
+    limit: Optional[int] = None
+    # Aggregations: the $match stage is `filter`; remaining stages follow it.
+    pipeline_tail: Optional[List[Dict[str, Any]]] = None
+    # Upper bound on docsExamined; None means "no more than the matching documents".
+    max_docs_examined: Optional[int] = None
+    # Queries that are never issued against time-series event collections.
+    standard_only: bool = False
+    # distinct() shapes: the field whose values are read; `filter` is the query.
+    distinct: Optional[str] = None
+
+
+def _prefix_refs(value: Any, event_prefix: str) -> Any:
+    """Rewrite "$organization_id"/"$model_name" expression references."""
+    if isinstance(value, dict):
+        return {key: _prefix_refs(item, event_prefix) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_prefix_refs(item, event_prefix) for item in value]
+    if isinstance(value, str) and value.startswith("$") and value[1:] in EVENT_META_KEYS:
+        return f"${event_prefix}{value[1:]}"
+    return value
+
+
+def prefix_event_filter(query: Dict[str, Any], event_prefix: str) -> Dict[str, Any]:
+    """An event filter with organization_id/model_name at `event_prefix` + field, including nested $or/$and."""
+    if not event_prefix:
+        return query
+    prefixed: Dict[str, Any] = {}
+    for key, value in query.items():
+        if key in ("$or", "$and", "$nor"):
+            prefixed[key] = [prefix_event_filter(clause, event_prefix) for clause in value]
+        elif key in EVENT_META_KEYS:
+            prefixed[event_prefix + key] = value
+        else:
+            prefixed[key] = _prefix_refs(value, event_prefix)
+    return prefixed
+
+
+def prefix_event_pipeline(pipeline: List[Dict[str, Any]], event_prefix: str) -> List[Dict[str, Any]]:
+    """An event pipeline whose $match stages and field references use `event_prefix`."""
+    if not event_prefix:
+        return pipeline
+    return [
+        {"$match": prefix_event_filter(stage["$match"], event_prefix)}
+        if "$match" in stage
+        else _prefix_refs(stage, event_prefix)
+        for stage in pipeline
+    ]
+
+
+def prefix_event_keys(keys: IndexKeys, event_prefix: str) -> List[Tuple[str, int]]:
+    """Index or sort keys with organization_id/model_name at `event_prefix` + field."""
+    return [(event_prefix + key if key in EVENT_META_KEYS else key, direction) for key, direction in keys]
+
+
+def index_specs(event_prefix: str = "") -> List[IndexSpec]:
+    """
+    All indexes the server needs. `event_prefix` is "meta." when events live in
+    time-series collections, where org/model are stored under the metaField.
+    """
+    specs = [
+        # Auth: token issue and API key resolution
+        IndexSpec("api_keys", [("client_id", 1)], unique=True),
+        # Per-org ingest quota overrides
+        IndexSpec("org_quotas", [("organization_id", 1)], unique=True),
+        # Dashboard health card and health task upsert
+        IndexSpec("health_scores", [("organization_id", 1)], unique=True),
+        # Dashboard alert list and keyset-paginated alert browsing
+        IndexSpec("alerts", [("organization_id", 1), ("created_at", -1), ("_id", -1)]),
+        IndexSpec(
+            "alerts",
+            [("organization_id", 1), ("model_name", 1), ("created_at", -1), ("_id", -1)],
+        ),
+        # Drift alert cooldown
+        IndexSpec(
+            "alerts",
+            [("organization_id", 1), ("model_name", 1), ("type", 1), ("created_at", -1)],
+        ),
+        # Webhook destinations per org (alert delivery and the webhook routes)
+        IndexSpec("webhooks", [("organization_id", 1), ("created_at", 1)]),
+        # Per-org scoring profiles: route lookups and the periodic refresh
+        IndexSpec("scoring_profiles", [("organization_id", 1)], unique=True),
+        IndexSpec("scoring_profiles", [("updated_at", 1)]),
+        # Dashboard model drift and health drift penalty
+        IndexSpec("drift_metrics", [("organization_id", 1), ("created_at", -1)]),
+        # Latest drift per model during ML risk scoring
+        IndexSpec(
+            "drift_metrics",
+            [("organization_id", 1), ("model_name", 1), ("created_at", -1)],
+        ),
+        # Baseline lookup for drift and outlier scoring
+        IndexSpec(
+            "model_profiles",
+            [("organization_id", 1), ("model_name", 1)],
+            unique=True,
+        ),
+        # Live feature histogram upserts and drift window reads
+        IndexSpec(
+            "feature_histograms",
+            [
+                ("organization_id", 1),
+                ("model_name", 1),
+                ("profile_version", 1),
+                ("window_start", 1),
+            ],
+            unique=True,
+        ),
+        IndexSpec("feature_histograms", [("expire_at", 1)], options={"expireAfterSeconds": 0}),
+        # Rollup upserts and per-model range reads
+        IndexSpec(
+            "event_rollups",
+            [
+                ("organization_id", 1),
+                ("source", 1),
+                ("granularity", 1),
+                ("model_name", 1),
+                ("bucket_start", 1),
+            ],
+            unique=True,
+        ),
+        # Rollup range reads across all models of an org
+        IndexSpec(
+            "event_rollups",
+            [
+                ("organization_id", 1),
+                ("source", 1),
+                ("granularity", 1),
+                ("bucket_start", 1),
+            ],
+        ),
+        IndexSpec("event_rollups", [("expire_at", 1)], options={"expireAfterSeconds": 0}),
+        # LLM text segments expire after the last event referencing them
+        IndexSpec("text_segments", [("expire_at", 1)], options={"expireAfterSeconds": 0}),
+        # Risk-distribution point lookup and per-model/day counter upserts
+        IndexSpec(
+            "risk_counters",
+            [
+                ("organization_id", 1),
+                ("scope", 1),
+                ("source", 1),
+                ("model_name", 1),
+                ("day", 1),
+            ],
+            unique=True,
+        ),
+    ]
+    for name in EVENT_COLLECTIONS:
+        event_specs = [
+            # Per-org/model time range scans
+            IndexSpec(name, [("organization_id", 1), ("model_name", 1), ("timestamp", 1)]),
+            # Keyset-paginated event browsing, newest first
+            IndexSpec(name, [("organization_id", 1), ("timestamp", -1), ("_id", -1)]),
+            IndexSpec(
+                name,
+                [("organization_id", 1), ("model_name", 1), ("timestamp", -1), ("_id", -1)],
+            ),
+            # Risk review queries, risk-label browsing and counter reconciliation
+            IndexSpec(name, [("riskLabel", 1), ("timestamp", -1)]),
+            IndexSpec(
+                name,
+                [("organization_id", 1), ("riskLabel", 1), ("timestamp", -1), ("_id", -1)],
+            ),
+        ]
+        specs += [
+            IndexSpec(spec.collection, prefix_event_keys(spec.keys, event_prefix))
+            for spec in event_specs
+        ]
+        if not event_prefix:
+            # Idempotent ingest: client event IDs, unique per org. Time-series
+            # collections do not support unique indexes.
+            specs.append(
+                IndexSpec(
+                    name,
+                    [("organization_id", 1), ("event_id", 1)],
+                    unique=True,
+                    options={"partialFilterExpression": {"event_id": {"$exists": True}}},
+                )
+            )
+    return specs
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase, event_prefix: str = "") -> None:
+    for spec in index_specs(event_prefix):
+        await db[spec.collection].create_index(
+            list(spec.keys), unique=spec.unique, **spec.options
+        )
+
+
+# Representative values used by the query shapes below.
+SAMPLE_ORG = ObjectId("000000000000000000000001")
+SAMPLE_TIME = datetime(2024, 1, 1, 12, 0, 0)
+
+QUERY_SHAPES: List[QueryShape] = [
+    QueryShape(
+        "dependencies.load_active_api_key",
+        "api_keys",
+        {"client_id": "client-1", "is_active": True},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "rate_limit._load_limits",
+        "org_quotas",
+        {"organization_id": SAMPLE_ORG},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "dashboard._load_health",
+        "health_scores",
+        {"organization_id": SAMPLE_ORG},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "dashboard._load_alerts",
+        "alerts",
+        {"organization_id": SAMPLE_ORG},
+        sort=[("created_at", -1)],
+        limit=100,
+        max_docs_examined=100,
+    ),
+    QueryShape(
+        "dashboard._load_latest_drift",
+        "drift_metrics",
+        {"organization_id": SAMPLE_ORG},
+        sort=[("created_at", -1)],
+        limit=100,
+        max_docs_examined=100,
+    ),
+    QueryShape(
+        "health_service.compute_health_score",
+        "drift_metrics",
+        {"organization_id": SAMPLE_ORG},
+        sort=[("created_at", -1)],
+        limit=10,
+        max_docs_examined=10,
+    ),
+    QueryShape(
+        "ingest.score_ml_events.latest_drift",
+        "drift_metrics",
+        {"organization_id": SAMPLE_ORG, "model_name": "model-a"},
+        sort=[("created_at", -1)],
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "ingest.score_ml_events.profile",
+        "model_profiles",
+        {"organization_id": SAMPLE_ORG, "model_name": "model-a"},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "feature_drift.load_profile",
+        "model_profiles",
+        {"organization_id": SAMPLE_ORG, "model_name": "model-a"},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "baseline_profiler.save_profile",
+        "model_profiles",
+        {"organization_id": SAMPLE_ORG, "model_name": "model-a"},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "baseline_profiler.profile_from_window",
+        "ml_events",
+        {
+            "organization_id": SAMPLE_ORG,
+            "model_name": "model-a",
+            "timestamp": {"$gte": SAMPLE_TIME, "$lt": SAMPLE_TIME},
+        },
+        limit=100000,
+    ),
+    QueryShape(
+        "ingest.insert_events.ml",
+        "ml_events",
+        {"organization_id": SAMPLE_ORG, "event_id": "event-1"},
+        limit=1,
+        max_docs_examined=1,
+        # Time-series collections cannot hold the unique event_id index.
+        standard_only=True,
+    ),
+    QueryShape(
+        "ingest.insert_events.llm",
+        "llm_events",
+        {"organization_id": SAMPLE_ORG, "event_id": "event-1"},
+        limit=1,
+        max_docs_examined=1,
+        # Time-series collections cannot hold the unique event_id index.
+        standard_only=True,
+    ),
+    QueryShape(
+        "ingest._store_llm_bodies",
+        "llm_events",
+        {"organization_id": SAMPLE_ORG, "event_id": {"$in": ["event-1", "event-2"]}},
+        # Time-series storage skips this lookup.
+        standard_only=True,
+    ),
+    QueryShape(
+        "webhook_notifier._destinations_for",
+        "webhooks",
+        {"organization_id": SAMPLE_ORG, "enabled": True},
+    ),
+    QueryShape(
+        "webhooks.list_webhooks",
+        "webhooks",
+        {"organization_id": SAMPLE_ORG},
+        sort=[("created_at", 1)],
+    ),
+    QueryShape(
+        "scoring.get_scoring_profile",
+        "scoring_profiles",
+        {"organization_id": SAMPLE_ORG},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "scoring_profiles.refresh",
+        "scoring_profiles",
+        {"updated_at": {"$gte": SAMPLE_TIME}},
+    ),
+    QueryShape(
+        "rescore._rescore_partition.ml",
+        "ml_events",
+        {"_id": {"$gt": ObjectId.from_datetime(SAMPLE_TIME), "$lt": ObjectId.from_datetime(SAMPLE_TIME)}},
+        sort=[("_id", 1)],
+        limit=1000,
+        # Time-series collections have no _id index; the rescore job documents the slower scan.
+        standard_only=True,
+    ),
+    QueryShape(
+        "rescore._rescore_partition.llm",
+        "llm_events",
+        {"_id": {"$gt": ObjectId.from_datetime(SAMPLE_TIME), "$lt": ObjectId.from_datetime(SAMPLE_TIME)}},
+        sort=[("_id", 1)],
+        limit=1000,
+        # Time-series collections have no _id index; the rescore job documents the slower scan.
+        standard_only=True,
+    ),
+    QueryShape(
+        "feature_drift.record_feature_histograms",
+        "feature_histograms",
+        {
+            "organization_id": SAMPLE_ORG,
+            "model_name": "model-a",
+            "profile_version": 1,
+            "window_start": SAMPLE_TIME,
+        },
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "feature_drift.compute_feature_drift",
+        "feature_histograms",
+        {
+            "organization_id": SAMPLE_ORG,
+            "model_name": "model-a",
+            "profile_version": 1,
+            "window_start": {"$gte": SAMPLE_TIME},
+        },
+    ),
+    QueryShape(
+        "rollup_service.record_event_rollups",
+        "event_rollups",
+        {
+            "organization_id": SAMPLE_ORG,
+            "source": "ml",
+            "granularity": "minute",
+            "model_name": "model-a",
+            "bucket_start": SAMPLE_TIME,
+        },
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "rollup_service.mean_latency.model",
+        "event_rollups",
+        {
+            "organization_id": SAMPLE_ORG,
+            "source": "ml",
+            "granularity": "minute",
+            "model_name": "model-a",
+            "bucket_start": {"$gte": SAMPLE_TIME, "$lte": SAMPLE_TIME},
+        },
+        pipeline_tail=[
+            {"$group": {"_id": None, "count": {"$sum": "$count"}, "latency_sum": {"$sum": "$latency_sum"}}}
+        ],
+    ),
+    QueryShape(
+        "rollup_service.latency_percentiles",
+        "event_rollups",
+        {
+            "organization_id": SAMPLE_ORG,
+            "source": "ml",
+            "granularity": "hour",
+            "model_name": "model-a",
+            "bucket_start": {"$gte": SAMPLE_TIME, "$lte": SAMPLE_TIME},
+        },
+        sort=[("bucket_start", 1)],
+    ),
+    QueryShape(
+        "rollup_service.mean_latency_by_model",
+        "event_rollups",
+        {"organization_id": SAMPLE_ORG, "source": "ml", "granularity": "day"},
+        pipeline_tail=[
+            {"$group": {"_id": "$model_name", "count": {"$sum": "$count"}, "latency_sum": {"$sum": "$latency_sum"}}}
+        ],
+    ),
+    QueryShape(
+        "risk_counter_service.get_org_risk_counts",
+        "risk_counters",
+        {"organization_id": SAMPLE_ORG, "scope": "org"},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "risk_counter_service.record_risk_counts",
+        "risk_counters",
+        {
+            "organization_id": SAMPLE_ORG,
+            "scope": "model_day",
+            "source": "ml",
+            "model_name": "model-a",
+            "day": SAMPLE_TIME,
+        },
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "risk_counter_service.rebuild_risk_counters.stale",
+        "risk_counters",
+        {"organization_id": SAMPLE_ORG, "scope": "model_day", "day": {"$gte": SAMPLE_TIME}},
+    ),
+    QueryShape(
+        "risk_counter_service.rebuild_risk_counters.events",
+        "ml_events",
+        {
+            "organization_id": SAMPLE_ORG,
+            "riskLabel": {"$in": ["normal", "suspicious", "risky"]},
+            "timestamp": {"$gte": SAMPLE_TIME},
+        },
+        pipeline_tail=[{"$group": {"_id": "$riskLabel", "count": {"$sum": 1}}}],
+    ),
+    QueryShape(
+        "events.list_alerts",
+        "alerts",
+        {
+            "organization_id": SAMPLE_ORG,
+            "$or": [
+                {"created_at": {"$lt": SAMPLE_TIME}},
+                {"created_at": SAMPLE_TIME, "_id": {"$lt": ObjectId("ffffffffffffffffffffffff")}},
+            ],
+        },
+        sort=[("created_at", -1), ("_id", -1)],
+        limit=51,
+        max_docs_examined=51,
+    ),
+    QueryShape(
+        "alert_service._has_open_alert",
+        "alerts",
+        {
+            "organization_id": SAMPLE_ORG,
+            "model_name": "model-a",
+            "type": "drift",
+            "created_at": {"$gte": SAMPLE_TIME},
+            "resolved": False,
+        },
+        limit=1,
+    ),
+    QueryShape(
+        "events.list_alerts.model",
+        "alerts",
+        {"organization_id": SAMPLE_ORG, "model_name": "model-a"},
+        sort=[("created_at", -1), ("_id", -1)],
+        limit=51,
+        max_docs_examined=51,
+    ),
+    QueryShape(
+        "events.list_ml_events",
+        "ml_events",
+        {"organization_id": SAMPLE_ORG, "timestamp": {"$gte": SAMPLE_TIME}},
+        sort=[("timestamp", -1), ("_id", -1)],
+        limit=51,
+        max_docs_examined=51,
+    ),
+    QueryShape(
+        "events.list_ml_events.model",
+        "ml_events",
+        {"organization_id": SAMPLE_ORG, "model_name": "model-a"},
+        sort=[("timestamp", -1), ("_id", -1)],
+        limit=51,
+        max_docs_examined=51,
+    ),
+    QueryShape(
+        "events.list_llm_events.risk_label",
+        "llm_events",
+        {"organization_id": SAMPLE_ORG, "riskLabel": "risky"},
+        sort=[("timestamp", -1), ("_id", -1)],
+        limit=51,
+        max_docs_examined=51,
+    ),
+    QueryShape(
+        "segment_store.load_llm_bodies",
+        "text_segments",
+        {"_id": {"$in": [bytes(16)]}},
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "timeseries_migration.migrate_collection.checkpoint",
+        "migrations",
+        {"_id": "timeseries:ml_events"},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "ingest.update_health",
+        "health_scores",
+        {"organization_id": SAMPLE_ORG},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "profiles.get_profile",
+        "model_profiles",
+        {"organization_id": SAMPLE_ORG, "model_name": "model-a"},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "baseline_profiler.observe",
+        "model_profiles",
+        {"organization_id": SAMPLE_ORG, "model_name": "model-a"},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "drift_detector.compute_drift_score",
+        "model_profiles",
+        {"organization_id": SAMPLE_ORG, "model_name": "model-a"},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "rescore._load_context.latest_drift",
+        "drift_metrics",
+        {"organization_id": SAMPLE_ORG, "model_name": "model-a"},
+        sort=[("created_at", -1)],
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "rescore._load_context.profile",
+        "model_profiles",
+        {"organization_id": SAMPLE_ORG, "model_name": "model-a"},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "scoring._write",
+        "scoring_profiles",
+        {"organization_id": SAMPLE_ORG},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "webhooks.delete_webhook",
+        "webhooks",
+        {"_id": ObjectId("000000000000000000000002"), "organization_id": SAMPLE_ORG},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "segment_store.store_llm_bodies",
+        "text_segments",
+        {"_id": bytes(16)},
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "rollup_service.read_rollups",
+        "event_rollups",
+        {
+            "organization_id": SAMPLE_ORG,
+            "source": "ml",
+            "granularity": "hour",
+            "bucket_start": {"$gte": SAMPLE_TIME, "$lte": SAMPLE_TIME},
+        },
+        sort=[("bucket_start", 1)],
+    ),
+    QueryShape(
+        "rollup_backfill.default_cutoff",
+        "event_rollups",
+        {},
+        sort=[("_id", 1)],
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "rollup_backfill._backfill_partition",
+        "event_rollups",
+        {
+            "organization_id": SAMPLE_ORG,
+            "source": "ml",
+            "granularity": "day",
+            "model_name": "model-a",
+            "bucket_start": SAMPLE_TIME,
+        },
+        limit=1,
+        max_docs_examined=1,
+    ),
+    QueryShape(
+        "partitions.plan_partitions",
+        "ml_events",
+        {},
+        sort=[("_id", 1)],
+        limit=1,
+        max_docs_examined=1,
+        standard_only=True,
+    ),
+    QueryShape(
+        "risk_counter_service.rebuild_all_risk_counters.ml",
+        "ml_events",
+        {},
+        distinct="organization_id",
+    ),
+    QueryShape(
+        "risk_counter_service.rebuild_all_risk_counters.llm",
+        "llm_events",
+        {},
+        distinct="organization_id",
+    ),
+    QueryShape(
+        "timeseries_migration.migrate_collection",
+        "ml_events_legacy",
+        {"_id": {"$gt": ObjectId.from_datetime(SAMPLE_TIME)}},
+        sort=[("_id", 1)],
+        limit=5000,
+    ),
+]
+
+
+def query_shapes(event_prefix: str = "") -> List[QueryShape]:
+    """QUERY_SHAPES as issued with the given event layout ("meta." for time-series)."""
+    if not event_prefix:
+        return list(QUERY_SHAPES)
+    shapes = []
+    for shape in QUERY_SHAPES:
+        if shape.collection not in EVENT_COLLECTIONS:
+            shapes.append(shape)
+        elif not shape.standard_only:
+            shapes.append(
+                replace(
+                    shape,
+                    filter=prefix_event_filter(shape.filter, event_prefix),
+                    sort=prefix_event_keys(shape.sort, event_prefix) if shape.sort else None,
+                    pipeline_tail=(
+                        prefix_event_pipeline(shape.pipeline_tail, event_prefix) if shape.pipeline_tail else None
+                    ),
+                    distinct=(
+                        event_prefix + shape.distinct if shape.distinct in EVENT_META_KEYS else shape.distinct
+                    ),
+                )
+            )
+    return shapes
@@ -1,28 +1,141 @@
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure
 
 from app.core.config import get_settings
+from app.core.metrics import MongoCommandMetrics
+from app.db.indexes import EVENT_COLLECTIONS, ensure_indexes, prefix_event_filter, prefix_event_pipeline
 
 
 mongo_client: Optional[AsyncIOMotorClient] = None
 mongo_db: Optional[AsyncIOMotorDatabase] = None
 
+EVENT_META_FIELD = "meta"
+
 
 async def connect_to_mongo() -> None:
     global mongo_client, mongo_db
     settings = get_settings()
-    mongo_client = AsyncIOMotorClient(settings.mongo_uri)
+    mongo_client = AsyncIOMotorClient(
+        settings.mongo_uri,
+        event_listeners=[MongoCommandMetrics()],
+    )
     mongo_db = mongo_client[settings.mongo_db_name]
-    await _ensure_risk_indexes(mongo_db)
+    ttl_seconds = settings.raw_event_ttl_days * 86400
+    if is_timeseries_storage():
+        await _ensure_timeseries_collections(mongo_db, ttl_seconds)
+    else:
+        await _ensure_raw_event_ttl(mongo_db, ttl_seconds)
+    await ensure_indexes(mongo_db, event_prefix())
+
+
+def is_timeseries_storage() -> bool:
+    return get_settings().event_storage_mode == "timeseries"
+
+
+def event_prefix() -> str:
+    """Path prefix of organization_id/model_name in event documents: "meta." in time-series mode."""
+    return f"{EVENT_META_FIELD}." if is_timeseries_storage() else ""
+
+
+def event_filter(query: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    An event filter with organization_id/model_name pointed at the metaField in
+    time-series mode, where the event indexes are built on it.
+    """
+    return prefix_event_filter(query, event_prefix())
+
+
+def event_pipeline(pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """`event_filter` for aggregation pipelines: $match stages and field references."""
+    return prefix_event_pipeline(pipeline, event_prefix())
+
+
+def timeseries_options(ttl_seconds: int = 0) -> Dict[str, Any]:
+    """create_collection kwargs for an event time-series collection."""
+    options: Dict[str, Any] = {
+        "timeseries": {
+            "timeField": "timestamp",
+            "metaField": EVENT_META_FIELD,
+            "granularity": "seconds",
+        }
+    }
+    if ttl_seconds > 0:
+        options["expireAfterSeconds"] = ttl_seconds
+    return options
+
+
+def add_event_meta(docs: List[Dict[str, Any]]) -> None:
+    """
+    Attach the time-series metaField (org/model) to event documents in place.
+
+    A no-op in standard storage mode. Top-level organization_id/model_name are
+    kept so code reading event documents works in both modes; within a
+    time-series bucket they are constant and compress to almost nothing.
+    Queries must go through `event_filter` to hit the meta indexes.
+    """
+    if not is_timeseries_storage():
+        return
+    for doc in docs:
+        doc[EVENT_META_FIELD] = {
+            "organization_id": doc["organization_id"],
+            "model_name": doc["model_name"],
+        }
+
+
+async def _ensure_timeseries_collections(db: AsyncIOMotorDatabase, ttl_seconds: int) -> None:
+    """Create event collections as time-series collections, or sync their retention."""
+    listing = await db.command(
+        {"listCollections": 1, "filter": {"name": {"$in": list(EVENT_COLLECTIONS)}}}
+    )
+    existing = {info["name"]: info for info in listing["cursor"]["firstBatch"]}
+    for name in EVENT_COLLECTIONS:
+        info = existing.get(name)
+        if info is None:
+            await db.create_collection(name, **timeseries_options(ttl_seconds))
+            continue
+        if info.get("type") != "timeseries":
+            raise RuntimeError(
+                f"{name} is a standard collection; run "
+                "`python -m app.db.timeseries_migration` before enabling timeseries storage"
+            )
+        current_ttl = info.get("options", {}).get("expireAfterSeconds")
+        if ttl_seconds > 0 and current_ttl != ttl_seconds:
+            await db.command({"collMod": name, "expireAfterSeconds": ttl_seconds})
+        elif ttl_seconds <= 0 and current_ttl is not None:
+            await db.command({"collMod": name, "expireAfterSeconds": "off"})
+
+
+async def _ensure_raw_event_ttl(db: AsyncIOMotorDatabase, ttl_seconds: int) -> None:
+    """Expire raw events after ttl_seconds; a non-positive value removes the TTL."""
+    for name in EVENT_COLLECTIONS:
+        await _ensure_ttl_index(db[name], "timestamp", ttl_seconds)
 
 
-async def _ensure_risk_indexes(db: AsyncIOMotorDatabase) -> None:
-    """Create indexes for risk classification queries."""
-    await db["ml_events"].create_index([("riskLabel", 1), ("timestamp", -1)])
-    await db["ml_events"].create_index([("organization_id", 1), ("riskLabel", 1)])
-    await db["llm_events"].create_index([("riskLabel", 1), ("timestamp", -1)])
-    await db["llm_events"].create_index([("organization_id", 1), ("riskLabel", 1)])
+async def _ensure_ttl_index(
+    collection: AsyncIOMotorCollection,
+    field: str,
+    ttl_seconds: int,
+) -> None:
+    index_name = f"{field}_ttl"
+    if ttl_seconds <= 0:
+        existing = await collection.index_information()
+        if index_name in existing:
+            await collection.drop_index(index_name)
+        return
+    try:
+        await collection.create_index(
+            field, name=index_name, expireAfterSeconds=ttl_seconds
+        )
+    except OperationFailure:
+        # Index exists with a different TTL; change it in place.
+        await collection.database.command(
+            {
+                "collMod": collection.name,
+                "index": {"name": index_name, "expireAfterSeconds": ttl_seconds},
+            }
+        )
 
 
 async def close_mongo_connection() -> None:
@@ -0,0 +1,117 @@
+"""
+Migrate ml_events/llm_events from standard to time-series collections.
+
+Usage:
+    python -m app.db.timeseries_migration [--collections ml_events llm_events] [--batch-size 5000]
+
+Each collection is renamed to <name>_legacy, recreated as a time-series
+collection and refilled in _id order. Progress is checkpointed in the
+`migrations` collection, so re-running after an interruption resumes where it
+stopped. Time-series collections do not enforce a unique _id, so a batch cut
+off mid-write may be copied twice.
+
+Pause ingest while the rename happens; once the new collection exists, ingest
+can continue with EVENT_STORAGE_MODE=timeseries.
+"""
+import argparse
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from app.core.config import get_settings
+from app.db.mongo import EVENT_COLLECTIONS, EVENT_META_FIELD, timeseries_options
+
+
+logger = logging.getLogger("aegisai.migration")
+
+
+async def _collection_info(db: AsyncIOMotorDatabase, name: str) -> Dict[str, Any] | None:
+    listing = await db.command({"listCollections": 1, "filter": {"name": name}})
+    batch = listing["cursor"]["firstBatch"]
+    return batch[0] if batch else None
+
+
+async def migrate_collection(
+    db: AsyncIOMotorDatabase,
+    name: str,
+    batch_size: int = 5000,
+    ttl_seconds: int = 0,
+) -> int:
+    """Copy one event collection into a time-series collection; returns documents copied."""
+    legacy_name = f"{name}_legacy"
+    checkpoints = db["migrations"]
+    checkpoint_id = f"timeseries:{name}"
+
+    info = await _collection_info(db, name)
+    legacy_info = await _collection_info(db, legacy_name)
+    if info is not None and info.get("type") != "timeseries":
+        if legacy_info is not None:
+            raise RuntimeError(f"Both {name} and {legacy_name} exist; resolve manually")
+        await db[name].rename(legacy_name)
+        info = None
+        legacy_info = await _collection_info(db, legacy_name)
+    if legacy_info is None:
+        logger.info("%s: nothing to migrate", name)
+        return 0
+    if info is None:
+        await db.create_collection(name, **timeseries_options(ttl_seconds))
+
+    state = await checkpoints.find_one({"_id": checkpoint_id}) or {}
+    last_id = state.get("last_id")
+    copied = state.get("copied", 0)
+
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        batch: List[Dict[str, Any]] = (
+            await db[legacy_name]
+            .find(query)
+            .sort("_id", 1)
+            .limit(batch_size)
+            .to_list(length=batch_size)
+        )
+        if not batch:
+            break
+        for doc in batch:
+            doc[EVENT_META_FIELD] = {
+                "organization_id": doc.get("organization_id"),
+                "model_name": doc.get("model_name"),
+            }
+        await db[name].insert_many(batch, ordered=False)
+        last_id = batch[-1]["_id"]
+        copied += len(batch)
+        await checkpoints.update_one(
+            {"_id": checkpoint_id},
+            {"$set": {"last_id": last_id, "copied": copied}},
+            upsert=True,
+        )
+        logger.info("%s: copied %d documents", name, copied)
+
+    await checkpoints.update_one(
+        {"_id": checkpoint_id}, {"$set": {"done": True}}, upsert=True
+    )
+    return copied
+
+
+async def main(collections: List[str], batch_size: int) -> None:
+    settings = get_settings()
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    try:
+        db = client[settings.mongo_db_name]
+        for name in collections:
+            copied = await migrate_collection(
+                db, name, batch_size, settings.raw_event_ttl_days * 86400
+            )
+            logger.info("%s: migration complete (%d documents)", name, copied)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--collections", nargs="+", default=list(EVENT_COLLECTIONS))
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.collections, args.batch_size))
@@ -4,43 +4,58 @@ import contextlib
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import get_settings
 from app.core.logging_middleware import logging_middleware
-from app.db.mongo import connect_to_mongo, close_mongo_connection
+from app.core.loop_monitor import loop_monitor
+from app.core.metrics import registry
+from app.core.structured_logging import configure_logging
+from app.db.mongo import connect_to_mongo, close_mongo_connection, get_db
+from app.api.routes.admin import router as admin_router
 from app.api.routes.auth import router as auth_router
 from app.api.routes.ingest import router as ingest_router
 from app.api.routes.dashboard import router as dashboard_router
+from app.api.routes.events import router as events_router
+from app.api.routes.profiles import router as profiles_router
+from app.api.routes.scoring import router as scoring_router
+from app.api.routes.webhooks import router as webhooks_router
+from app.services.scoring_profiles import scoring_profiles
+from app.services.webhook_notifier import webhook_notifier
 from app.workers.background import start_periodic_tasks, stop_periodic_tasks
 
 
 settings = get_settings()
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
+configure_logging()
 logger = logging.getLogger("aegisai")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_to_mongo()
+    # Load every org's scoring profile before serving; the periodic task keeps them fresh.
+    await scoring_profiles.refresh(get_db())
+    loop_monitor.start()
+    webhook_notifier.start(get_db())
     periodic_task = asyncio.create_task(start_periodic_tasks())
     try:
         yield
     finally:
+        await loop_monitor.stop()
         await stop_periodic_tasks()
         periodic_task.cancel()
         with contextlib.suppress(asyncio.CancelledError):
             await periodic_task
+        await webhook_notifier.stop()
         await close_mongo_connection()
 
 
 app = FastAPI(
     title=settings.app_name,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 app.middleware("http")(logging_middleware)
@@ -56,6 +71,11 @@ app.add_middleware(
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(ingest_router, prefix="/ingest", tags=["ingest"])
 app.include_router(dashboard_router, prefix="/dashboard", tags=["dashboard"])
+app.include_router(events_router, prefix="/events", tags=["events"])
+app.include_router(profiles_router, prefix="/profiles", tags=["profiles"])
+app.include_router(webhooks_router, prefix="/webhooks", tags=["webhooks"])
+app.include_router(scoring_router, prefix="/scoring-profile", tags=["scoring"])
+app.include_router(admin_router, prefix="/admin", tags=["admin"])
 
 
 @app.get("/health", tags=["system"])
@@ -63,6 +83,14 @@ async def health_check():
     return {"status": "ok"}
 
 
+@app.get("/metrics", tags=["system"], response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -30,8 +30,42 @@ class ModelsResponse(BaseModel):
     models: List[ModelSummary]
 
 
+class LatencyStats(BaseModel):
+    count: int
+    error_count: int
+    error_rate: Optional[float]
+    p50_ms: Optional[float]
+    p90_ms: Optional[float]
+    p99_ms: Optional[float]
+
+
+class LatencyPoint(LatencyStats):
+    bucket_start: datetime
+
+
+class LatencyPercentilesOut(BaseModel):
+    model_name: str
+    source: str
+    granularity: str
+    start: datetime
+    end: datetime
+    total: LatencyStats
+    series: List[LatencyPoint]
+
+
 class RiskDistributionOut(BaseModel):
     normalCount: int
     suspiciousCount: int
     riskyCount: int
 
+
+class StreamTokenOut(BaseModel):
+    token: str
+    expires_in: int
+
+
+class DashboardSummaryOut(BaseModel):
+    health: HealthScoreOut
+    alerts: List[AlertOut]
+    models: List[ModelSummary]
+    risk_distribution: RiskDistributionOut
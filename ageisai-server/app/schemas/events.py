@@ -0,0 +1,45 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+from app.schemas.dashboard import AlertOut
+
+
+class MLEventOut(BaseModel):
+    id: str
+    model_name: str
+    prediction: Any
+    input_data: Optional[Dict[str, Any]] = None
+    latency_ms: float
+    timestamp: datetime
+    riskScore: Optional[float] = None
+    riskLabel: Optional[str] = None
+
+
+class LLMEventOut(BaseModel):
+    id: str
+    model_name: str
+    prompt: Optional[str] = None
+    response: Optional[str] = None
+    latency_ms: float
+    token_count: int
+    timestamp: datetime
+    riskScore: Optional[float] = None
+    riskLabel: Optional[str] = None
+    flags: List[str] = []
+
+
+class AlertPage(BaseModel):
+    items: List[AlertOut]
+    next_cursor: Optional[str]
+
+
+class MLEventPage(BaseModel):
+    items: List[MLEventOut]
+    next_cursor: Optional[str]
+
+
+class LLMEventPage(BaseModel):
+    items: List[LLMEventOut]
+    next_cursor: Optional[str]
@@ -1,7 +1,12 @@
 from datetime import datetime
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, StringConstraints, TypeAdapter
+from typing_extensions import Annotated, NotRequired, TypedDict
+
+
+# Client-chosen ID, unique per org; a resent event with the same ID is dropped.
+EventId = Annotated[str, StringConstraints(max_length=128)]
 
 
 class MLEventIn(BaseModel):
@@ -9,6 +14,8 @@ class MLEventIn(BaseModel):
     prediction: Any
     input_data: Dict[str, Any]
     latency_ms: float
+    error: bool = False
+    event_id: Optional[EventId] = None
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -17,6 +24,8 @@ class LLMEventIn(BaseModel):
     prompt: str
     response: str
     latency_ms: float
+    error: bool = False
+    event_id: Optional[EventId] = None
     timestamp: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -27,3 +36,76 @@ class MLEventBatch(BaseModel):
 class LLMEventBatch(BaseModel):
     events: List[LLMEventIn]
 
+
+# Ingest fast path: the same shapes as TypedDicts, so validation yields plain
+# dicts ready for insert_many instead of model instances. The BaseModels above
+# document the request body in OpenAPI.
+
+
+class MLEventRecord(TypedDict):
+    model_name: str
+    prediction: Any
+    input_data: Dict[str, Any]
+    latency_ms: float
+    error: NotRequired[bool]
+    event_id: NotRequired[EventId]
+    timestamp: NotRequired[datetime]
+
+
+class LLMEventRecord(TypedDict):
+    model_name: str
+    prompt: str
+    response: str
+    latency_ms: float
+    error: NotRequired[bool]
+    event_id: NotRequired[EventId]
+    timestamp: NotRequired[datetime]
+
+
+class MLEventBatchRecord(TypedDict):
+    events: List[MLEventRecord]
+
+
+class LLMEventBatchRecord(TypedDict):
+    events: List[LLMEventRecord]
+
+
+# Column-oriented batches (MessagePack wire format): one list per field, all
+# the same length. Null timestamps mean "now", as an omitted one does; null
+# error flags mean false; null event IDs mean the event has none.
+
+
+class MLEventColumns(TypedDict):
+    model_name: List[str]
+    prediction: List[Any]
+    input_data: List[Dict[str, Any]]
+    latency_ms: List[float]
+    error: NotRequired[List[Optional[bool]]]
+    event_id: NotRequired[List[Optional[EventId]]]
+    timestamp: NotRequired[List[Optional[datetime]]]
+
+
+class LLMEventColumns(TypedDict):
+    model_name: List[str]
+    prompt: List[str]
+    response: List[str]
+    latency_ms: List[float]
+    error: NotRequired[List[Optional[bool]]]
+    event_id: NotRequired[List[Optional[EventId]]]
+    timestamp: NotRequired[List[Optional[datetime]]]
+
+
+class MLColumnBatchRecord(TypedDict):
+    columns: MLEventColumns
+
+
+class LLMColumnBatchRecord(TypedDict):
+    columns: LLMEventColumns
+
+
+ml_event_adapter = TypeAdapter(MLEventRecord)
+llm_event_adapter = TypeAdapter(LLMEventRecord)
+ml_event_batch_adapter = TypeAdapter(MLEventBatchRecord)
+llm_event_batch_adapter = TypeAdapter(LLMEventBatchRecord)
+ml_column_batch_adapter = TypeAdapter(MLColumnBatchRecord)
+llm_column_batch_adapter = TypeAdapter(LLMColumnBatchRecord)
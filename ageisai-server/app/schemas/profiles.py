@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, TypeAdapter
+from typing_extensions import NotRequired, TypedDict
+
+
+class BaselineImportIn(BaseModel):
+    """Training data as columns, e.g. DataFrame.to_dict("list")."""
+
+    features: Dict[str, List[Any]]
+    predictions: Optional[List[Any]] = None
+    latency_ms: Optional[List[Optional[float]]] = None
+
+
+class BaselineImportRecord(TypedDict):
+    features: Dict[str, List[Any]]
+    predictions: NotRequired[Optional[List[Any]]]
+    latency_ms: NotRequired[Optional[List[Optional[float]]]]
+
+
+baseline_import_adapter = TypeAdapter(BaselineImportRecord)
+
+
+class ProfileSavedOut(BaseModel):
+    model_name: str
+    version: int
+    events: int
+    features: int
+
+
+class ProfileOut(BaseModel):
+    model_name: str
+    version: int
+    source: Optional[str] = None
+    events: Optional[int] = None
+    baseline_latency_ms: Optional[float] = None
+    latency_stats: Optional[Dict[str, float]] = None
+    feature_stats: Dict[str, Dict[str, float]] = {}
+    histograms: Dict[str, Dict[str, Any]] = {}
+    prediction_histogram: Optional[Dict[str, Any]] = None
+    updated_at: Optional[datetime] = None
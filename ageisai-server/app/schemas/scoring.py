@@ -0,0 +1,43 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.core.risk import DEFAULT_SCORING as D
+
+
+class MLWeights(BaseModel):
+    confidence: float = Field(D.ml_confidence_weight, ge=0)
+    drift: float = Field(D.ml_drift_weight, ge=0)
+    outlier: float = Field(D.ml_outlier_weight, ge=0)
+
+
+class LLMWeights(BaseModel):
+    sensitive: float = Field(D.llm_sensitive_weight, ge=0)
+    jailbreak: float = Field(D.llm_jailbreak_weight, ge=0)
+    length: float = Field(D.llm_length_weight, ge=0)
+
+
+class RiskThresholds(BaseModel):
+    risky: float = Field(D.risky_threshold, gt=0, le=1)
+    suspicious: float = Field(D.suspicious_threshold, gt=0, le=1)
+
+    @model_validator(mode="after")
+    def _ordered(self):
+        if self.suspicious >= self.risky:
+            raise ValueError("suspicious threshold must be below the risky threshold")
+        return self
+
+
+class ScoringProfileIn(BaseModel):
+    """Omitted sections keep the built-in defaults."""
+
+    ml_weights: MLWeights = MLWeights()
+    llm_weights: LLMWeights = LLMWeights()
+    thresholds: RiskThresholds = RiskThresholds()
+    prompt_length_cap: int = Field(D.prompt_length_cap, ge=1)
+
+
+class ScoringProfileOut(ScoringProfileIn):
+    version: int = 0
+    updated_at: Optional[datetime] = None
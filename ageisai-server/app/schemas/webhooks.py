@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import AnyHttpUrl, BaseModel, Field
+
+
+class WebhookIn(BaseModel):
+    url: AnyHttpUrl
+    # Signs each body with HMAC-SHA256 (X-AegisAI-Signature) when set.
+    secret: Optional[str] = Field(default=None, min_length=16, max_length=256)
+    min_severity: Literal["warning", "critical"] = "warning"
+
+
+class WebhookOut(BaseModel):
+    id: str
+    url: str
+    min_severity: str
+    enabled: bool
+    has_secret: bool
+    created_at: datetime
+    # Circuit breaker state in this worker: closed, open or half_open
+    # (None until the webhook has been used).
+    circuit: Optional[str] = None
@@ -4,6 +4,47 @@ from typing import List, Optional
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.core.config import get_settings
+from app.core.pubsub import broker
+from app.core.response_cache import bump_org_version
+from app.services.webhook_notifier import webhook_notifier
+
+
+async def _insert_alert(db: AsyncIOMotorDatabase, org_id, alert_doc: dict) -> str:
+    """
+    Store an alert, invalidate cached dashboards, push it to live viewers and
+    queue it for the org's webhooks (delivered later, off this task).
+    """
+    result = await db["alerts"].insert_one(alert_doc)
+    bump_org_version(org_id)
+    alert_id = str(result.inserted_id)
+    alert = {
+        "id": alert_id,
+        "model_name": alert_doc["model_name"],
+        "type": alert_doc["type"],
+        "message": alert_doc["message"],
+        "severity": alert_doc["severity"],
+        "created_at": alert_doc["created_at"],
+        "resolved": alert_doc["resolved"],
+    }
+    broker.publish(org_id, "alert", alert)
+    webhook_notifier.notify(org_id, alert)
+    return alert_id
+
+
+async def _has_open_alert(db: AsyncIOMotorDatabase, org_id, model_name: str, alert_type: str) -> bool:
+    """Whether the model has an unresolved `alert_type` alert within drift_alert_cooldown_minutes."""
+    since = datetime.utcnow() - timedelta(minutes=get_settings().drift_alert_cooldown_minutes)
+    alert = await db["alerts"].find_one(
+        {
+            "organization_id": org_id,
+            "model_name": model_name,
+            "type": alert_type,
+            "created_at": {"$gte": since},
+            "resolved": False,
+        },
+        projection={"_id": 1},
+    )
+    return alert is not None
 
 
 async def create_drift_alert_if_needed(
@@ -15,6 +56,8 @@ async def create_drift_alert_if_needed(
     settings = get_settings()
     if drift_score < settings.drift_latency_threshold_ms / 10:  # simple mapping
         return None
+    if await _has_open_alert(db, org_id, model_name, "drift"):
+        return None
 
     alert_doc = {
         "organization_id": org_id,
@@ -25,8 +68,45 @@ async def create_drift_alert_if_needed(
         "created_at": datetime.utcnow(),
         "resolved": False,
     }
-    result = await db["alerts"].insert_one(alert_doc)
-    return str(result.inserted_id)
+    return await _insert_alert(db, org_id, alert_doc)
+
+
+async def create_feature_drift_alert_if_needed(
+    db: AsyncIOMotorDatabase,
+    org_id,
+    model_name: str,
+    feature_drift: dict,
+) -> Optional[str]:
+    """
+    Alert when any feature or the prediction distribution reaches
+    drift_psi_threshold, unless the model already has a recent open one.
+    """
+    settings = get_settings()
+    max_psi = feature_drift["max_psi"]
+    if max_psi < settings.drift_psi_threshold:
+        return None
+    if await _has_open_alert(db, org_id, model_name, "feature_drift"):
+        return None
+
+    drifted = [
+        name
+        for name, stats in feature_drift["top_features"].items()
+        if stats["psi"] >= settings.drift_psi_threshold
+    ]
+    prediction = feature_drift.get("prediction")
+    if prediction and prediction["psi"] >= settings.drift_psi_threshold:
+        drifted.insert(0, "prediction")
+    alert_doc = {
+        "organization_id": org_id,
+        "model_name": model_name,
+        "type": "feature_drift",
+        "message": f"Distribution drift detected for model {model_name}: max PSI={max_psi:.2f}"
+        + (f" ({', '.join(drifted[:5])})" if drifted else ""),
+        "severity": "warning" if max_psi < 2 * settings.drift_psi_threshold else "critical",
+        "created_at": datetime.utcnow(),
+        "resolved": False,
+    }
+    return await _insert_alert(db, org_id, alert_doc)
 
 
 async def create_health_alert_if_needed(
@@ -46,8 +126,7 @@ async def create_health_alert_if_needed(
         "created_at": datetime.utcnow(),
         "resolved": False,
     }
-    result = await db["alerts"].insert_one(alert_doc)
-    return str(result.inserted_id)
+    return await _insert_alert(db, org_id, alert_doc)
 
 
 async def create_risk_alert_if_needed(
@@ -70,6 +149,5 @@ async def create_risk_alert_if_needed(
         "created_at": datetime.utcnow(),
         "resolved": False,
     }
-    result = await db["alerts"].insert_one(alert_doc)
-    return str(result.inserted_id)
+    return await _insert_alert(db, org_id, alert_doc)
 
@@ -0,0 +1,409 @@
+"""
+Build model_profiles baselines from events or training data.
+
+Usage:
+    python -m app.services.baseline_profiler --org <org id> --model <name> --csv train.csv [--prediction-column y]
+    python -m app.services.baseline_profiler --org <org id> --model <name> --start 2024-01-01 --end 2024-01-08
+
+A `ProfileBuilder` folds batches of rows into per-field accumulators. Each
+accumulator keeps a Welford mean/variance, merged per batch with Chan's
+parallel update, plus min/max, a reservoir sample for quantiles and
+histogram edges, and category counts for non-numeric values. Memory stays
+bounded however many rows go in. `build` turns the accumulators into
+`baseline_latency_ms`, `feature_stats` (outlier scoring) and the histograms
+used by feature drift.
+
+Profiles come from three sources:
+- ingest: the first `profile_baseline_events` events of a model without a profile
+- a window of already ingested events (index range on org/model/timestamp)
+- an import of training data, e.g. a DataFrame as columns
+Each is written with a single-document update, so readers never see a
+half-written profile.
+"""
+import argparse
+import asyncio
+import csv
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.histogram import number_matrix
+from app.db.mongo import event_filter
+from app.services.feature_drift import event_features, invalidate_profile
+
+
+logger = logging.getLogger("aegisai.profiler")
+
+PROFILES = "model_profiles"
+QUANTILES = {"p01": 0.01, "p05": 0.05, "p25": 0.25, "p50": 0.5, "p75": 0.75, "p95": 0.95, "p99": 0.99}
+# Numeric histograms are cut at the baseline deciles.
+HISTOGRAM_CUTS = np.linspace(0.1, 0.9, 9)
+
+
+class FieldAccumulator:
+    """Streaming statistics for one feature, the prediction or latency."""
+
+    def __init__(self, sample_size: int, rng: np.random.Generator):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.sample = np.empty(sample_size)
+        self.categories: Counter = Counter()
+        self._rng = rng
+
+    def add_numbers(self, values: np.ndarray) -> None:
+        if not values.size:
+            return
+        # Welford state of the batch, merged into the running state (Chan et al.).
+        n_b = values.size
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+        n = self.n + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / n
+        self.m2 += m2_b + delta * delta * self.n * n_b / n
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._reservoir(values)
+        self.n = n
+
+    def _reservoir(self, values: np.ndarray) -> None:
+        size = self.sample.size
+        fill = max(0, min(size - self.n, values.size))
+        self.sample[self.n : self.n + fill] = values[:fill]
+        rest = values[fill:]
+        if rest.size:
+            # Algorithm R: the i-th value seen replaces a random slot with probability size / i.
+            seen = self.n + fill + np.arange(1, rest.size + 1)
+            slots = (self._rng.random(rest.size) * seen).astype(np.int64)
+            keep = slots < size
+            self.sample[slots[keep]] = rest[keep]
+
+    def add_categories(self, values: Iterable[Any]) -> None:
+        self.categories.update(str(value) for value in values)
+
+    @property
+    def numeric(self) -> bool:
+        return self.n > 0 and self.n >= sum(self.categories.values())
+
+    def _sampled(self) -> np.ndarray:
+        return self.sample[: min(self.n, self.sample.size)]
+
+    def stats(self) -> Dict[str, float]:
+        sample = self._sampled()
+        stats = {
+            "count": self.n,
+            "mean": self.mean,
+            "std": math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0,
+            "min": self.min,
+            "max": self.max,
+        }
+        for name, value in zip(QUANTILES, np.quantile(sample, list(QUANTILES.values()))):
+            stats[name] = float(value)
+        return stats
+
+    def histogram(self, max_categories: int) -> Dict[str, Any]:
+        if self.numeric:
+            sample = self._sampled()
+            edges = np.unique(np.quantile(sample, HISTOGRAM_CUTS))
+            counts = np.bincount(np.searchsorted(edges, sample, side="right"), minlength=edges.size + 1)
+            # Scale the sample's bin counts up to the number of values seen.
+            counts = np.rint(counts * (self.n / sample.size)).astype(int)
+            return {"edges": edges.tolist(), "counts": counts.tolist()}
+        top = self.categories.most_common(max_categories)
+        other = sum(self.categories.values()) - sum(n for _, n in top)
+        return {"categories": [c for c, _ in top], "counts": [n for _, n in top] + [other]}
+
+
+class ProfileBuilder:
+    def __init__(self, sample_size: Optional[int] = None, seed: Optional[int] = None):
+        settings = get_settings()
+        self.sample_size = sample_size or settings.profile_sample_size
+        self.max_categories = settings.profile_max_categories
+        self.events = 0
+        self._rng = np.random.default_rng(seed)
+        self.features: Dict[str, FieldAccumulator] = {}
+        self.prediction = self._accumulator()
+        self.latency = self._accumulator()
+
+    def _accumulator(self) -> FieldAccumulator:
+        return FieldAccumulator(self.sample_size, self._rng)
+
+    @staticmethod
+    def _add(acc: FieldAccumulator, values: Sequence[Any]) -> None:
+        numbers = number_matrix([values])[0]
+        missing = np.isnan(numbers)
+        acc.add_numbers(numbers[~missing])
+        if missing.any():
+            acc.add_categories(
+                v for v in values if v is not None and not isinstance(v, (int, float))
+            )
+
+    def add_columns(
+        self,
+        features: Mapping[str, Sequence[Any]],
+        predictions: Optional[Sequence[Any]] = None,
+        latencies: Optional[Sequence[Any]] = None,
+    ) -> None:
+        """Fold equally long columns of feature values (and optionally predictions and latencies)."""
+        rows = 0
+        for name, values in features.items():
+            acc = self.features.get(name)
+            if acc is None:
+                acc = self.features[name] = self._accumulator()
+            self._add(acc, values)
+            rows = max(rows, len(values))
+        if predictions is not None:
+            self._add(self.prediction, predictions)
+            rows = max(rows, len(predictions))
+        if latencies is not None:
+            self._add(self.latency, latencies)
+            rows = max(rows, len(latencies))
+        self.events += rows
+
+    def add_events(self, docs: Sequence[Dict[str, Any]]) -> None:
+        """Fold ML event documents (input_data, prediction, latency_ms)."""
+        if not docs:
+            return
+        features = [event_features(doc) for doc in docs]
+        names = {name for f in features for name in f}
+        self.add_columns(
+            {name: [f.get(name) for f in features] for name in names},
+            [doc.get("prediction") for doc in docs],
+            [doc.get("latency_ms") for doc in docs],
+        )
+
+    def build(self) -> Dict[str, Any]:
+        """Profile fields ready to store in model_profiles."""
+        profile: Dict[str, Any] = {"events": self.events, "feature_stats": {}, "histograms": {}}
+        if self.latency.numeric:
+            profile["baseline_latency_ms"] = self.latency.mean
+            profile["latency_stats"] = self.latency.stats()
+        for name, acc in self.features.items():
+            if acc.numeric:
+                profile["feature_stats"][name] = acc.stats()
+            if acc.n or acc.categories:
+                profile["histograms"][name] = acc.histogram(self.max_categories)
+        if self.prediction.n or self.prediction.categories:
+            profile["prediction_histogram"] = self.prediction.histogram(self.max_categories)
+        return profile
+
+
+async def save_profile(
+    db: AsyncIOMotorDatabase,
+    org_id,
+    model_name: str,
+    profile: Dict[str, Any],
+    source: str,
+    replace: bool = True,
+) -> Optional[int]:
+    """
+    Write a profile in one atomic update and return its version. With
+    replace=False an existing profile is left alone and None is returned.
+    """
+    now = datetime.utcnow()
+    query = {"organization_id": org_id, "model_name": model_name}
+    fields = {**profile, "source": source, "updated_at": now}
+    if replace:
+        doc = await db[PROFILES].find_one_and_update(
+            query,
+            {"$set": fields, "$inc": {"version": 1}, "$setOnInsert": {"created_at": now}},
+            upsert=True,
+            projection={"version": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        version = doc["version"]
+    else:
+        try:
+            result = await db[PROFILES].update_one(
+                query,
+                {"$setOnInsert": {**fields, "version": 1, "created_at": now}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return None
+        if result.upserted_id is None:
+            return None
+        version = 1
+    invalidate_profile(org_id, model_name)
+    logger.info(
+        "Saved %s profile v%d for org %s model %s (%d events)",
+        source, version, org_id, model_name, profile.get("events", 0),
+    )
+    return version
+
+
+async def profile_from_window(
+    db: AsyncIOMotorDatabase,
+    org_id,
+    model_name: str,
+    start: datetime,
+    end: datetime,
+    batch_size: int = 1000,
+) -> ProfileBuilder:
+    """Fold the model's events in [start, end) into a builder, at most `profile_window_max_events`."""
+    builder = ProfileBuilder()
+    cursor = (
+        db["ml_events"]
+        .find(
+            event_filter(
+                {"organization_id": org_id, "model_name": model_name, "timestamp": {"$gte": start, "$lt": end}}
+            ),
+            projection={"input_data": 1, "prediction": 1, "latency_ms": 1},
+        )
+        .limit(get_settings().profile_window_max_events)
+        .batch_size(batch_size)
+    )
+    batch: List[Dict[str, Any]] = []
+    async for doc in cursor:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            builder.add_events(batch)
+            batch = []
+    builder.add_events(batch)
+    return builder
+
+
+class BaselineLearner:
+    """Learns a profile from the first `profile_baseline_events` events of unprofiled models."""
+
+    def __init__(self):
+        self._builders: Dict[tuple, ProfileBuilder] = {}
+        # Monotonic time of each builder's last batch, for idle eviction.
+        self._last_seen: Dict[tuple, float] = {}
+        self._next_sweep = 0.0
+        # Whether (org, model) already has a profile; rechecked after the TTL.
+        self._profiled: TTLCache[bool] = TTLCache(100000, ttl_seconds=300)
+
+    def _evict_idle(self, now: float) -> None:
+        """Drop builders of models that stopped sending before reaching the target."""
+        idle_seconds = get_settings().profile_builder_idle_seconds
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + min(idle_seconds, 60.0)
+        for key in [key for key, seen in self._last_seen.items() if now - seen >= idle_seconds]:
+            del self._last_seen[key]
+            del self._builders[key]
+
+    async def observe(self, db: AsyncIOMotorDatabase, org_id, docs: Iterable[Dict[str, Any]]) -> None:
+        target = get_settings().profile_baseline_events
+        if target <= 0:
+            return
+        by_model: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for doc in docs:
+            by_model[doc["model_name"]].append(doc)
+        now = time.monotonic()
+        self._evict_idle(now)
+        for model_name, model_docs in by_model.items():
+            key = (str(org_id), model_name)
+            builder = self._builders.get(key)
+            if builder is None:
+                profiled = self._profiled.get(key)
+                if profiled:
+                    continue
+                # Claimed before the lookup below, so concurrent batches for
+                # the model share this builder instead of replacing it.
+                builder = self._builders[key] = ProfileBuilder()
+                self._last_seen[key] = now
+                if profiled is None:
+                    profiled = await db[PROFILES].find_one(
+                        {"organization_id": org_id, "model_name": model_name}, projection={"_id": 1}
+                    ) is not None
+                    self._profiled.put(key, profiled)
+                if self._builders.get(key) is not builder:
+                    # Completed or evicted by another batch meanwhile.
+                    continue
+                if profiled:
+                    self._release(key)
+                    continue
+            self._last_seen[key] = now
+            builder.add_events(model_docs[: target - builder.events])
+            if builder.events >= target:
+                self._release(key)
+                self._profiled.put(key, True)
+                await save_profile(db, org_id, model_name, builder.build(), "ingest", replace=False)
+
+    def _release(self, key: tuple) -> None:
+        del self._builders[key]
+        del self._last_seen[key]
+
+
+baseline_learner = BaselineLearner()
+
+
+def _csv_value(raw: str) -> Any:
+    if raw == "":
+        return None
+    try:
+        return float(raw)
+    except ValueError:
+        return raw
+
+
+def read_csv_columns(path: str, drop: Sequence[str] = ()) -> Dict[str, List[Any]]:
+    """Columns of a CSV file (e.g. DataFrame.to_csv output); numeric cells become floats."""
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        columns: Dict[str, List[Any]] = {
+            name: [] for name in reader.fieldnames or [] if name not in drop
+        }
+        for row in reader:
+            for name, values in columns.items():
+                values.append(_csv_value(row.get(name) or ""))
+    return columns
+
+
+async def main(args: argparse.Namespace) -> None:
+    settings = get_settings()
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    try:
+        db = client[settings.mongo_db_name]
+        org_id = ObjectId(args.org)
+        if args.csv:
+            columns = read_csv_columns(args.csv, args.drop)
+            predictions = columns.pop(args.prediction_column, None) if args.prediction_column else None
+            latencies = columns.pop(args.latency_column, None) if args.latency_column else None
+            builder = ProfileBuilder()
+            builder.add_columns(columns, predictions, latencies)
+            source = "import"
+        else:
+            builder = await profile_from_window(
+                db, org_id, args.model, datetime.fromisoformat(args.start), datetime.fromisoformat(args.end)
+            )
+            source = "window"
+        if not builder.events:
+            logger.warning("No rows to profile")
+            return
+        await save_profile(db, org_id, args.model, builder.build(), source)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--org", required=True)
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--csv", help="training data with one column per feature")
+    parser.add_argument("--prediction-column")
+    parser.add_argument("--latency-column")
+    parser.add_argument("--drop", nargs="*", default=[], help="CSV columns to ignore, e.g. ids")
+    parser.add_argument("--start", help="window start (ISO 8601, UTC) when profiling ingested events")
+    parser.add_argument("--end", help="window end (ISO 8601, UTC)")
+    args = parser.parse_args()
+    if not args.csv and not (args.start and args.end):
+        parser.error("pass --csv, or --start and --end")
+    asyncio.run(main(args))
@@ -4,6 +4,7 @@ from typing import Optional, Tuple
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.core.config import get_settings
+from app.services.rollup_service import mean_latency as rollup_mean_latency
 
 
 async def compute_mean_latency(
@@ -12,30 +13,15 @@ async def compute_mean_latency(
     model_name: str,
     window_minutes: int = 5,
 ) -> Optional[Tuple[float, datetime, datetime]]:
-    """Compute mean latency for recent ML events for a given model."""
+    """Compute mean latency for recent ML events for a given model from minute rollups."""
     end_time = datetime.utcnow()
     start_time = end_time - timedelta(minutes=window_minutes)
 
-    pipeline = [
-        {
-            "$match": {
-                "organization_id": org_id,
-                "model_name": model_name,
-                "timestamp": {"$gte": start_time, "$lte": end_time},
-            }
-        },
-        {
-            "$group": {
-                "_id": None,
-                "mean_latency_ms": {"$avg": "$latency_ms"},
-            }
-        },
-    ]
-    cursor = db["ml_events"].aggregate(pipeline)
-    result = await cursor.to_list(length=1)
-    if not result:
+    mean_latency = await rollup_mean_latency(
+        db, org_id, "ml", "minute", start=start_time, end=end_time, model_name=model_name
+    )
+    if mean_latency is None:
         return None
-    mean_latency = result[0]["mean_latency_ms"]
     return mean_latency, start_time, end_time
 
 
@@ -48,7 +34,7 @@ async def compute_drift_score(
     baseline = await db["model_profiles"].find_one(
         {"organization_id": org_id, "model_name": model_name}
     )
-    if not baseline:
+    if not baseline or "baseline_latency_ms" not in baseline:
         return None
     baseline_latency = baseline["baseline_latency_ms"]
     mean_info = await compute_mean_latency(db, org_id, model_name)
@@ -0,0 +1,232 @@
+"""
+Feature and prediction drift against a model's baseline histograms.
+
+`model_profiles.histograms` holds a baseline histogram per input feature and
+`model_profiles.prediction_histogram` one for predictions (see
+app/core/histogram.py for the format). Ingest counts each batch into the
+same bins, one `$inc` per model and window into `feature_histograms`. Drift
+then sums the windows of the last `drift_window_minutes` and compares them
+with the baseline for every feature in one NumPy pass. It never reads
+`ml_events`.
+
+Live counts are keyed by feature position in the profile, so each window
+document also records the profile version it was counted against.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.histogram import HistogramSpec, counts_matrix, distribution_distances, number_matrix
+from app.services.rollup_service import to_utc_naive
+
+
+HISTOGRAMS = "feature_histograms"
+PREDICTION_KEY = "p"
+# Features kept in each drift_metrics document, highest PSI first.
+TOP_FEATURES = 10
+
+
+def event_features(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Feature values of an ML event: input_data["features"] when present, else input_data."""
+    input_data = doc.get("input_data") or {}
+    features = input_data.get("features", input_data)
+    return features if isinstance(features, dict) else {}
+
+
+class CompiledProfile:
+    """Baseline histograms of a model_profiles document as one padded count matrix."""
+
+    def __init__(self, doc: Optional[Dict[str, Any]]):
+        doc = doc or {}
+        histograms = doc.get("histograms") or {}
+        self.version = doc.get("version", 0)
+        self.features: List[str] = sorted(histograms)
+        self.specs = [HistogramSpec(histograms[name]) for name in self.features]
+        rows = [histograms[name].get("counts", []) for name in self.features]
+        prediction = doc.get("prediction_histogram")
+        self.prediction = HistogramSpec(prediction) if prediction else None
+        if self.prediction is not None:
+            self.specs.append(self.prediction)
+            rows.append(prediction.get("counts", []))
+        self.width = max((spec.size for spec in self.specs), default=0)
+        self.baseline = counts_matrix([dict(enumerate(row)) for row in rows], self.width)
+        self.numeric = np.array([spec.numeric for spec in self.specs], dtype=bool)
+        self.numeric_features = [i for i, spec in enumerate(self.specs[: len(self.features)]) if spec.numeric]
+
+    @property
+    def empty(self) -> bool:
+        return not self.specs
+
+
+_settings = get_settings()
+_profiles: TTLCache[CompiledProfile] = TTLCache(10000, ttl_seconds=_settings.drift_profile_cache_seconds)
+
+
+async def load_profile(db: AsyncIOMotorDatabase, org_id, model_name: str) -> CompiledProfile:
+    key = (str(org_id), model_name)
+    profile = _profiles.get(key)
+    if profile is None:
+        doc = await db["model_profiles"].find_one(
+            {"organization_id": org_id, "model_name": model_name},
+            projection={"version": 1, "histograms": 1, "prediction_histogram": 1},
+        )
+        profile = CompiledProfile(doc)
+        _profiles.put(key, profile)
+    return profile
+
+
+def invalidate_profile(org_id, model_name: str) -> None:
+    _profiles.pop((str(org_id), model_name))
+
+
+def window_start(ts: datetime) -> datetime:
+    minutes = get_settings().drift_histogram_bucket_minutes
+    ts = to_utc_naive(ts)
+    return ts.replace(minute=ts.minute - ts.minute % minutes, second=0, microsecond=0)
+
+
+def _window_filter(org_id, model_name: str, profile: CompiledProfile) -> Dict[str, Any]:
+    return {
+        "organization_id": org_id,
+        "model_name": model_name,
+        "profile_version": profile.version,
+    }
+
+
+async def record_feature_histograms(
+    db: AsyncIOMotorDatabase,
+    org_id,
+    docs: Iterable[Dict[str, Any]],
+) -> None:
+    """Count a batch of ML events into the live histograms of their models' windows."""
+    settings = get_settings()
+    groups: Dict[str, Dict[datetime, List[Dict[str, Any]]]] = defaultdict(lambda: defaultdict(list))
+    for doc in docs:
+        groups[doc["model_name"]][window_start(doc["timestamp"])].append(doc)
+
+    ops = []
+    for model_name, windows in groups.items():
+        profile = await load_profile(db, org_id, model_name)
+        if profile.empty:
+            continue
+        for start, window_docs in windows.items():
+            inc: Dict[str, int] = {"count": len(window_docs)}
+            features = [event_features(doc) for doc in window_docs]
+            # All numeric features are converted in one matrix, one column each.
+            names = [profile.features[i] for i in profile.numeric_features]
+            numbers = number_matrix([[f.get(name) for name in names] for f in features])
+            binned = {
+                i: profile.specs[i].bin_numbers(numbers[:, column])
+                for column, i in enumerate(profile.numeric_features)
+            }
+            for i, name in enumerate(profile.features):
+                if i not in binned:
+                    binned[i] = profile.specs[i].bin_counts([f.get(name) for f in features])
+            for i, counts in binned.items():
+                for bin_index, n in counts.items():
+                    inc[f"bins.{i}.{bin_index}"] = n
+            if profile.prediction is not None:
+                counts = profile.prediction.bin_counts([doc.get("prediction") for doc in window_docs])
+                for bin_index, n in counts.items():
+                    inc[f"bins.{PREDICTION_KEY}.{bin_index}"] = n
+            ops.append(
+                UpdateOne(
+                    {**_window_filter(org_id, model_name, profile), "window_start": start},
+                    {
+                        "$inc": inc,
+                        "$setOnInsert": {
+                            "expire_at": start + timedelta(days=settings.drift_histogram_retention_days)
+                        },
+                    },
+                    upsert=True,
+                )
+            )
+    if ops:
+        await db[HISTOGRAMS].bulk_write(ops, ordered=False)
+
+
+def _stats(psi: float, ks: Optional[float], js: float) -> Dict[str, Optional[float]]:
+    return {
+        "psi": round(psi, 4),
+        "ks": round(ks, 4) if ks is not None else None,
+        "js": round(js, 4),
+    }
+
+
+async def compute_feature_drift(
+    db: AsyncIOMotorDatabase,
+    org_id,
+    model_name: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    PSI, KS and Jensen-Shannon distance of every profiled feature and of the
+    predictions, live window vs baseline. None without a profile with
+    histograms or with fewer than `drift_min_events` live events.
+    KS is only reported for numeric histograms.
+    """
+    settings = get_settings()
+    profile = await load_profile(db, org_id, model_name)
+    if profile.empty:
+        return None
+    end = datetime.utcnow()
+    start = end - timedelta(minutes=settings.drift_window_minutes)
+    cursor = db[HISTOGRAMS].find(
+        {**_window_filter(org_id, model_name, profile), "window_start": {"$gte": window_start(start)}},
+        projection={"count": 1, "bins": 1},
+    )
+    prediction_row = len(profile.features)
+    rows: List[Dict[int, int]] = [defaultdict(int) for _ in profile.specs]
+    total = 0
+    async for window in cursor:
+        total += window.get("count", 0)
+        for key, bins in (window.get("bins") or {}).items():
+            row = rows[prediction_row if key == PREDICTION_KEY else int(key)]
+            for bin_index, n in bins.items():
+                row[int(bin_index)] += n
+    if total < settings.drift_min_events:
+        return None
+
+    distances = distribution_distances(profile.baseline, counts_matrix(rows, profile.width))
+    psi, js = distances["psi"], distances["js"]
+    ks = np.where(profile.numeric, distances["ks"], np.nan)
+
+    feature_psi = psi[: len(profile.features)]
+    measured = np.flatnonzero(~np.isnan(feature_psi))
+    ranked = measured[np.argsort(-feature_psi[measured])]
+    top = {
+        profile.features[i]: _stats(
+            float(psi[i]), None if np.isnan(ks[i]) else float(ks[i]), float(js[i])
+        )
+        for i in ranked[:TOP_FEATURES]
+    }
+    prediction = None
+    if profile.prediction is not None and not np.isnan(psi[prediction_row]):
+        i = prediction_row
+        prediction = _stats(float(psi[i]), None if np.isnan(ks[i]) else float(ks[i]), float(js[i]))
+
+    all_psi = psi[~np.isnan(psi)]
+    all_js = js[~np.isnan(js)]
+    return {
+        "window_start": start,
+        "window_end": end,
+        "events": total,
+        "max_psi": round(float(all_psi.max()), 4) if all_psi.size else 0.0,
+        "max_js": round(float(all_js.max()), 4) if all_js.size else 0.0,
+        "drifted_features": int((feature_psi[measured] >= settings.drift_psi_threshold).sum()),
+        "top_features": top,
+        "prediction": prediction,
+    }
+
+
+def feature_drift_score(max_psi: float) -> float:
+    """Map PSI onto the 0-100 drift score scale; `drift_psi_threshold` scores 50."""
+    threshold = get_settings().drift_psi_threshold
+    if threshold <= 0:
+        return 0.0
+    return min(100.0, max_psi / threshold * 50.0)
@@ -3,6 +3,7 @@ from datetime import datetime, timedelta
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 from app.core.config import get_settings
+from app.services.rollup_service import mean_latency as rollup_mean_latency
 
 
 async def compute_health_score(db: AsyncIOMotorDatabase, org_id) -> float:
@@ -28,21 +29,11 @@ async def compute_health_score(db: AsyncIOMotorDatabase, org_id) -> float:
     # Penalize for high LLM latency in last 15 minutes
     now = datetime.utcnow()
     window_start = now - timedelta(minutes=15)
-    pipeline = [
-        {
-            "$match": {
-                "organization_id": org_id,
-                "timestamp": {"$gte": window_start, "$lte": now},
-            }
-        },
-        {"$group": {"_id": None, "mean_latency_ms": {"$avg": "$latency_ms"}}},
-    ]
-    llm_cursor = db["llm_events"].aggregate(pipeline)
-    llm_results = await llm_cursor.to_list(length=1)
-    if llm_results:
-        mean_latency = llm_results[0]["mean_latency_ms"]
-        if mean_latency > 1000:
-            score -= min((mean_latency - 1000) / 50.0, 30.0)
+    mean_latency = await rollup_mean_latency(
+        db, org_id, "llm", "minute", start=window_start, end=now
+    )
+    if mean_latency is not None and mean_latency > 1000:
+        score -= min((mean_latency - 1000) / 50.0, 30.0)
 
     return float(max(settings.health_min_score, min(score, max_score)))
 
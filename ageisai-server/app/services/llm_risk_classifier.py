@@ -1,5 +1,7 @@
 import re
-from typing import List
+from typing import List, Tuple
+
+from app.core.risk import DEFAULT_SCORING, ScoringProfile
 
 
 # Sensitive patterns (case-insensitive)
@@ -33,39 +35,59 @@ def _pattern_score(text: str, pattern: re.Pattern, max_matches: int = 5) -> floa
     return min(1.0, count / max_matches)
 
 
-def compute_llm_risk(prompt: str, response: str = "") -> dict:
+def scan_llm_text(text: str) -> Tuple[int, int]:
+    """Return (sensitive, jailbreak) pattern match counts for a piece of text."""
+    if not text:
+        return 0, 0
+    return len(_sensitive_re.findall(text)), len(_jailbreak_re.findall(text))
+
+
+def score_llm_counts(
+    sensitive_count: int,
+    jailbreak_count: int,
+    prompt_length: int,
+    profile: ScoringProfile = DEFAULT_SCORING,
+) -> dict:
     """
-    Compute risk for an LLM event from prompt and response.
+    Turn pattern counts and prompt length into a risk result, weighted and
+    labeled by `profile`. Counts are additive, so they can be summed over
+    separately scanned pieces of text.
     Returns dict with riskScore, riskLabel, flags.
     """
-    combined = f"{prompt}\n{response}"
     flags: List[str] = []
 
-    sensitive_matches = _sensitive_re.findall(combined)
-    sensitive_count = len(sensitive_matches) if sensitive_matches else 0
     sensitive_score = min(1.0, sensitive_count / 5.0)
     if sensitive_count:
         flags.append("sensitive_content")
 
-    jailbreak_matches = _jailbreak_re.findall(combined)
-    jailbreak_count = len(jailbreak_matches) if jailbreak_matches else 0
     jailbreak_score = min(1.0, jailbreak_count / 5.0)
     if jailbreak_count:
         flags.append("jailbreak_pattern")
 
-    length_risk = min(1.0, len(prompt) / 2000.0)
+    length_risk = min(1.0, prompt_length / profile.prompt_length_cap)
     if length_risk >= 0.8:
         flags.append("long_prompt")
 
-    risk_score = 0.5 * sensitive_score + 0.3 * jailbreak_score + 0.2 * length_risk
+    risk_score = (
+        profile.llm_sensitive_weight * sensitive_score
+        + profile.llm_jailbreak_weight * jailbreak_score
+        + profile.llm_length_weight * length_risk
+    )
     risk_score = min(1.0, max(0.0, risk_score))
 
-    from app.core.risk import classify_risk
-
-    risk_label = classify_risk(risk_score)
+    risk_label = profile.classify(risk_score)
 
     return {
         "riskScore": round(risk_score, 4),
         "riskLabel": risk_label.value,
         "flags": flags,
     }
+
+
+def compute_llm_risk(prompt: str, response: str = "", profile: ScoringProfile = DEFAULT_SCORING) -> dict:
+    """
+    Compute risk for an LLM event from prompt and response.
+    Returns dict with riskScore, riskLabel, flags.
+    """
+    sensitive_count, jailbreak_count = scan_llm_text(f"{prompt}\n{response}")
+    return score_llm_counts(sensitive_count, jailbreak_count, len(prompt), profile)
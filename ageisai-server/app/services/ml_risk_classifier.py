@@ -1,6 +1,6 @@
 from typing import Any, Dict, List, Optional
 
-from app.core.risk import RiskLabel, classify_risk
+from app.core.risk import DEFAULT_SCORING, ScoringProfile
 
 
 def _confidence_risk(probabilities: List[float]) -> float:
@@ -47,9 +47,10 @@ def compute_ml_risk(
     drift_score: float = 0.0,
     feature_stats: Optional[Dict[str, Dict[str, float]]] = None,
     features: Optional[Dict[str, Any]] = None,
+    profile: ScoringProfile = DEFAULT_SCORING,
 ) -> Dict[str, Any]:
     """
-    Compute risk for an ML event.
+    Compute risk for an ML event with the weights and thresholds of `profile`.
     Returns dict with riskScore, riskLabel, factors.
     """
     probs = probabilities or []
@@ -57,9 +58,13 @@ def compute_ml_risk(
     drift = _drift_risk(drift_score)
     outlier = _outlier_risk(features, feature_stats)
 
-    risk_score = 0.4 * confidence + 0.3 * drift + 0.3 * outlier
+    risk_score = (
+        profile.ml_confidence_weight * confidence
+        + profile.ml_drift_weight * drift
+        + profile.ml_outlier_weight * outlier
+    )
     risk_score = min(1.0, max(0.0, risk_score))
-    risk_label = classify_risk(risk_score)
+    risk_label = profile.classify(risk_score)
 
     return {
         "riskScore": round(risk_score, 4),
@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.core.config import get_settings
+from app.core.response_cache import bump_org_version
+from app.core.risk import RiskLabel
+from app.db.mongo import event_pipeline, event_prefix
+from app.services.rollup_service import bucket_start
+
+
+COUNTERS = "risk_counters"
+LABELS = [label.value for label in RiskLabel]
+
+
+def _empty_counts() -> Dict[str, int]:
+    return {label: 0 for label in LABELS}
+
+
+async def record_risk_counts(
+    db: AsyncIOMotorDatabase,
+    org_id,
+    source: str,
+    labeled: Iterable[Tuple[str, datetime, str]],
+) -> None:
+    """
+    Increment org and per-model/day counters for (model_name, timestamp, label)
+    tuples in a single bulk write.
+    """
+    org_counts: Dict[str, int] = {}
+    model_day_counts: Dict[Tuple[str, datetime], Dict[str, int]] = {}
+    for model_name, ts, label in labeled:
+        org_counts[label] = org_counts.get(label, 0) + 1
+        counts = model_day_counts.setdefault((model_name, bucket_start(ts, "day")), {})
+        counts[label] = counts.get(label, 0) + 1
+    if not org_counts:
+        return
+
+    ops = [
+        UpdateOne(
+            {"organization_id": org_id, "scope": "org"},
+            {"$inc": {f"counts.{label}": n for label, n in org_counts.items()}},
+            upsert=True,
+        )
+    ]
+    for (model_name, day), counts in model_day_counts.items():
+        ops.append(
+            UpdateOne(
+                {
+                    "organization_id": org_id,
+                    "scope": "model_day",
+                    "source": source,
+                    "model_name": model_name,
+                    "day": day,
+                },
+                {"$inc": {f"counts.{label}": n for label, n in counts.items()}},
+                upsert=True,
+            )
+        )
+    await db[COUNTERS].bulk_write(ops, ordered=False)
+    bump_org_version(org_id)
+
+
+async def get_org_risk_counts(db: AsyncIOMotorDatabase, org_id) -> Dict[str, int]:
+    doc = await db[COUNTERS].find_one(
+        {"organization_id": org_id, "scope": "org"},
+        projection={"counts": 1},
+    )
+    counts = _empty_counts()
+    if doc:
+        for label in LABELS:
+            counts[label] = int(doc.get("counts", {}).get(label, 0))
+    return counts
+
+
+def _rebuild_since() -> Optional[datetime]:
+    """
+    First day whose raw events are all still retained. Older per-day counters
+    are left untouched so history survives the raw-event TTL.
+    """
+    ttl_days = get_settings().raw_event_ttl_days
+    if ttl_days <= 0:
+        return None
+    oldest = datetime.utcnow() - timedelta(days=ttl_days)
+    return bucket_start(oldest, "day") + timedelta(days=1)
+
+
+async def rebuild_risk_counters(db: AsyncIOMotorDatabase, org_id) -> Dict[str, int]:
+    """
+    Recompute an org's counters from labeled raw events and return its totals.
+
+    Events labeled while the rebuild runs may be counted twice or missed until
+    the next rebuild.
+    """
+    since = _rebuild_since()
+    match: Dict[str, Any] = {"organization_id": org_id, "riskLabel": {"$in": LABELS}}
+    if since is not None:
+        match["timestamp"] = {"$gte": since}
+    pipeline = [
+        {"$match": match},
+        {
+            "$group": {
+                "_id": {
+                    "model_name": "$model_name",
+                    "day": {"$dateTrunc": {"date": "$timestamp", "unit": "day"}},
+                    "label": "$riskLabel",
+                },
+                "count": {"$sum": 1},
+            }
+        },
+    ]
+
+    rebuilt: Dict[Tuple[str, str, datetime], Dict[str, int]] = {}
+    for source, collection in (("ml", "ml_events"), ("llm", "llm_events")):
+        async for row in db[collection].aggregate(event_pipeline(pipeline)):
+            key = (source, row["_id"]["model_name"], row["_id"]["day"])
+            rebuilt.setdefault(key, _empty_counts())[row["_id"]["label"]] = row["count"]
+
+    ops: List[Any] = [
+        UpdateOne(
+            {
+                "organization_id": org_id,
+                "scope": "model_day",
+                "source": source,
+                "model_name": model_name,
+                "day": day,
+            },
+            {"$set": {"counts": counts}},
+            upsert=True,
+        )
+        for (source, model_name, day), counts in rebuilt.items()
+    ]
+    if ops:
+        await db[COUNTERS].bulk_write(ops, ordered=False)
+
+    stale: Dict[str, Any] = {"organization_id": org_id, "scope": "model_day"}
+    if since is not None:
+        stale["day"] = {"$gte": since}
+    async for doc in db[COUNTERS].find(stale, projection={"source": 1, "model_name": 1, "day": 1}):
+        if (doc["source"], doc["model_name"], doc["day"]) not in rebuilt:
+            await db[COUNTERS].delete_one({"_id": doc["_id"]})
+
+    totals = _empty_counts()
+    async for doc in db[COUNTERS].find(
+        {"organization_id": org_id, "scope": "model_day"}, projection={"counts": 1}
+    ):
+        for label in LABELS:
+            totals[label] += int(doc.get("counts", {}).get(label, 0))
+    await db[COUNTERS].update_one(
+        {"organization_id": org_id, "scope": "org"},
+        {"$set": {"counts": totals, "reconciled_at": datetime.utcnow()}},
+        upsert=True,
+    )
+    bump_org_version(org_id)
+    return totals
+
+
+async def rebuild_all_risk_counters(db: AsyncIOMotorDatabase) -> int:
+    """Rebuild counters for every org that has events; returns the number of orgs."""
+    org_field = f"{event_prefix()}organization_id"
+    org_ids = set(await db["ml_events"].distinct(org_field))
+    org_ids.update(await db["llm_events"].distinct(org_field))
+    for org_id in org_ids:
+        await rebuild_risk_counters(db, org_id)
+    return len(org_ids)
@@ -0,0 +1,297 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.core.config import get_settings
+from app.core.metrics import timed_task
+from app.core.pubsub import broker
+from app.core.response_cache import bump_org_version
+from app.core.sketch import LatencySketch, sketch_key
+
+
+ROLLUPS = "event_rollups"
+GRANULARITIES = ("minute", "hour", "day")
+
+
+def to_utc_naive(ts: datetime) -> datetime:
+    """Normalize a timestamp to naive UTC, matching what Mongo returns."""
+    if ts.tzinfo is not None:
+        return ts.astimezone(timezone.utc).replace(tzinfo=None)
+    return ts
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    ts = to_utc_naive(ts)
+    if granularity == "minute":
+        return ts.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    if granularity == "day":
+        return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unknown granularity: {granularity}")
+
+
+def pick_granularity(start: datetime, end: datetime) -> str:
+    """Choose the coarsest granularity that still resolves the range and is retained."""
+    settings = get_settings()
+    span = end - start
+    age = datetime.utcnow() - to_utc_naive(start)
+    if span <= timedelta(hours=6) and age <= timedelta(days=settings.rollup_minute_retention_days):
+        return "minute"
+    if span <= timedelta(days=7) and age <= timedelta(days=settings.rollup_hour_retention_days):
+        return "hour"
+    return "day"
+
+
+def _expire_at(bucket: datetime, granularity: str) -> Optional[datetime]:
+    settings = get_settings()
+    if granularity == "minute":
+        return bucket + timedelta(days=settings.rollup_minute_retention_days)
+    if granularity == "hour":
+        return bucket + timedelta(days=settings.rollup_hour_retention_days)
+    return None
+
+
+def _rollup_filter(org_id, source: str, model_name: str, granularity: str, bucket: datetime) -> Dict[str, Any]:
+    return {
+        "organization_id": org_id,
+        "source": source,
+        "granularity": granularity,
+        "model_name": model_name,
+        "bucket_start": bucket,
+    }
+
+
+RollupGroups = Dict[Tuple[str, str, datetime], Dict[str, Any]]
+
+
+def fold_rollups(docs: Iterable[Dict[str, Any]]) -> RollupGroups:
+    """Aggregate events into (model_name, granularity, bucket_start) groups."""
+    groups: RollupGroups = {}
+    for doc in docs:
+        latency = float(doc.get("latency_ms") or 0.0)
+        key_for_sketch = sketch_key(latency)
+        for granularity in GRANULARITIES:
+            key = (doc["model_name"], granularity, bucket_start(doc["timestamp"], granularity))
+            agg = groups.get(key)
+            if agg is None:
+                agg = groups[key] = {
+                    "count": 0,
+                    "error_count": 0,
+                    "latency_sum": 0.0,
+                    "latency_min": latency,
+                    "latency_max": latency,
+                    "sketch": {},
+                }
+            agg["count"] += 1
+            agg["error_count"] += 1 if doc.get("error") else 0
+            agg["latency_sum"] += latency
+            agg["latency_min"] = min(agg["latency_min"], latency)
+            agg["latency_max"] = max(agg["latency_max"], latency)
+            agg["sketch"][key_for_sketch] = agg["sketch"].get(key_for_sketch, 0) + 1
+    return groups
+
+
+def rollup_updates(org_id, source: str, groups: RollupGroups) -> List[UpdateOne]:
+    """Upserts that add `groups` to the org's rollups. Buckets already past their retention are skipped."""
+    now = datetime.utcnow()
+    ops = []
+    for (model_name, granularity, bucket), agg in groups.items():
+        expire_at = _expire_at(bucket, granularity)
+        if expire_at is not None and expire_at <= now:
+            continue
+        inc = {"count": agg["count"], "latency_sum": agg["latency_sum"]}
+        if agg["error_count"]:
+            inc["error_count"] = agg["error_count"]
+        for sk, n in agg["sketch"].items():
+            inc[f"sketch.{sk}"] = n
+        ops.append(
+            UpdateOne(
+                _rollup_filter(org_id, source, model_name, granularity, bucket),
+                {
+                    "$inc": inc,
+                    "$min": {"latency_min": agg["latency_min"]},
+                    "$max": {"latency_max": agg["latency_max"]},
+                    "$setOnInsert": {"expire_at": expire_at},
+                },
+                upsert=True,
+            )
+        )
+    return ops
+
+
+@timed_task("rollup_task")
+async def record_event_rollups(
+    db: AsyncIOMotorDatabase,
+    org_id,
+    source: str,
+    docs: Iterable[Dict[str, Any]],
+) -> None:
+    """Fold a batch of freshly inserted events into minute/hour/day rollups."""
+    groups = fold_rollups(docs)
+    ops = rollup_updates(org_id, source, groups)
+    if not ops:
+        return
+    await db[ROLLUPS].bulk_write(ops, ordered=False)
+    bump_org_version(org_id)
+
+    for (model_name, granularity, bucket), agg in groups.items():
+        if granularity != "minute":
+            continue
+        broker.publish(
+            org_id,
+            "rollup",
+            {
+                "source": source,
+                "model_name": model_name,
+                "bucket_start": bucket,
+                "count": agg["count"],
+                "latency_sum": agg["latency_sum"],
+                "latency_min": agg["latency_min"],
+                "latency_max": agg["latency_max"],
+            },
+        )
+
+
+def _range_match(
+    org_id,
+    source: str,
+    granularity: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    model_name: Optional[str],
+) -> Dict[str, Any]:
+    match: Dict[str, Any] = {
+        "organization_id": org_id,
+        "source": source,
+        "granularity": granularity,
+    }
+    if model_name is not None:
+        match["model_name"] = model_name
+    bounds: Dict[str, datetime] = {}
+    if start is not None:
+        bounds["$gte"] = bucket_start(start, granularity)
+    if end is not None:
+        bounds["$lte"] = to_utc_naive(end)
+    if bounds:
+        match["bucket_start"] = bounds
+    return match
+
+
+async def read_rollups(
+    db: AsyncIOMotorDatabase,
+    org_id,
+    source: str,
+    granularity: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    model_name: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    cursor = (
+        db[ROLLUPS]
+        .find(_range_match(org_id, source, granularity, start, end, model_name))
+        .sort("bucket_start", 1)
+    )
+    return await cursor.to_list(length=None)
+
+
+async def mean_latency_by_model(
+    db: AsyncIOMotorDatabase,
+    org_id,
+    source: str,
+    granularity: str = "day",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    model_name: Optional[str] = None,
+) -> Dict[str, float]:
+    """Mean latency per model over the rollup buckets in [start, end]."""
+    pipeline = [
+        {"$match": _range_match(org_id, source, granularity, start, end, model_name)},
+        {
+            "$group": {
+                "_id": "$model_name",
+                "count": {"$sum": "$count"},
+                "latency_sum": {"$sum": "$latency_sum"},
+            }
+        },
+    ]
+    rows = await db[ROLLUPS].aggregate(pipeline).to_list(length=None)
+    return {
+        row["_id"]: row["latency_sum"] / row["count"]
+        for row in rows
+        if row.get("count")
+    }
+
+
+async def mean_latency(
+    db: AsyncIOMotorDatabase,
+    org_id,
+    source: str,
+    granularity: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    model_name: Optional[str] = None,
+) -> Optional[float]:
+    """Mean latency across all matching rollup buckets, or None when there is no traffic."""
+    pipeline = [
+        {"$match": _range_match(org_id, source, granularity, start, end, model_name)},
+        {
+            "$group": {
+                "_id": None,
+                "count": {"$sum": "$count"},
+                "latency_sum": {"$sum": "$latency_sum"},
+            }
+        },
+    ]
+    rows = await db[ROLLUPS].aggregate(pipeline).to_list(length=1)
+    if not rows or not rows[0].get("count"):
+        return None
+    return rows[0]["latency_sum"] / rows[0]["count"]
+
+
+def _latency_stats(count: int, error_count: int, sketch: LatencySketch) -> Dict[str, Any]:
+    return {
+        "count": count,
+        "error_count": error_count,
+        "error_rate": error_count / count if count else None,
+        "p50_ms": sketch.quantile(0.5),
+        "p90_ms": sketch.quantile(0.9),
+        "p99_ms": sketch.quantile(0.99),
+    }
+
+
+async def latency_percentiles(
+    db: AsyncIOMotorDatabase,
+    org_id,
+    source: str,
+    model_name: str,
+    granularity: str,
+    start: datetime,
+    end: datetime,
+) -> Dict[str, Any]:
+    """
+    p50/p90/p99 latency, request and error counts for one model: one point per
+    rollup bucket in [start, end] plus the whole range, both from merged sketches.
+    """
+    cursor = (
+        db[ROLLUPS]
+        .find(
+            _range_match(org_id, source, granularity, start, end, model_name),
+            projection={"bucket_start": 1, "count": 1, "error_count": 1, "sketch": 1},
+        )
+        .sort("bucket_start", 1)
+    )
+    series = []
+    total = LatencySketch()
+    total_count = total_errors = 0
+    async for row in cursor:
+        sketch = LatencySketch(row.get("sketch"))
+        count = row.get("count", 0)
+        errors = row.get("error_count", 0)
+        series.append({"bucket_start": row["bucket_start"], **_latency_stats(count, errors, sketch)})
+        total.merge(sketch.counts)
+        total_count += count
+        total_errors += errors
+    return {"total": _latency_stats(total_count, total_errors, total), "series": series}
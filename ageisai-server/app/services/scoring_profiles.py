@@ -0,0 +1,93 @@
+"""
+Per-organization risk scoring profiles.
+
+An org's overrides of the scoring weights, label thresholds and prompt length
+cap live in one `scoring_profiles` document:
+
+    {"organization_id": ..., "version": 3, "updated_at": ...,
+     "ml_weights": {"confidence": 0.4, "drift": 0.3, "outlier": 0.3},
+     "llm_weights": {"sensitive": 0.5, "jailbreak": 0.3, "length": 0.2},
+     "thresholds": {"risky": 0.75, "suspicious": 0.4},
+     "prompt_length_cap": 2000}
+
+Missing fields take the built-in defaults (core/risk.DEFAULT_SCORING). Each
+document is compiled once into a frozen ScoringProfile. `scoring_profiles.get`
+is a plain dict lookup, so scoring a batch never touches Mongo for its
+profile. Every write bumps `version` and sets `updated_at`. The background
+worker calls `refresh` every `scoring_profile_refresh_seconds`, which reads
+only documents updated since the last refresh and recompiles those whose
+version changed, so edits reach every worker without a restart.
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.risk import DEFAULT_SCORING, ScoringProfile
+
+
+logger = logging.getLogger("aegisai.scoring")
+
+SCORING_PROFILES = "scoring_profiles"
+# Re-read this far behind the newest updated_at seen, so a write that
+# committed late with an older timestamp is not missed.
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+def compile_scoring_profile(doc: Dict[str, Any]) -> ScoringProfile:
+    ml = doc.get("ml_weights") or {}
+    llm = doc.get("llm_weights") or {}
+    thresholds = doc.get("thresholds") or {}
+    d = DEFAULT_SCORING
+    return ScoringProfile(
+        ml_confidence_weight=float(ml.get("confidence", d.ml_confidence_weight)),
+        ml_drift_weight=float(ml.get("drift", d.ml_drift_weight)),
+        ml_outlier_weight=float(ml.get("outlier", d.ml_outlier_weight)),
+        llm_sensitive_weight=float(llm.get("sensitive", d.llm_sensitive_weight)),
+        llm_jailbreak_weight=float(llm.get("jailbreak", d.llm_jailbreak_weight)),
+        llm_length_weight=float(llm.get("length", d.llm_length_weight)),
+        risky_threshold=float(thresholds.get("risky", d.risky_threshold)),
+        suspicious_threshold=float(thresholds.get("suspicious", d.suspicious_threshold)),
+        prompt_length_cap=int(doc.get("prompt_length_cap") or d.prompt_length_cap),
+        version=doc.get("version", 0),
+    )
+
+
+class ScoringProfiles:
+    def __init__(self):
+        self._compiled: Dict[str, ScoringProfile] = {}
+        self._watermark: Optional[datetime] = None
+
+    def get(self, org_id) -> ScoringProfile:
+        """The org's compiled profile, or the defaults; no I/O."""
+        return self._compiled.get(str(org_id), DEFAULT_SCORING)
+
+    def put(self, doc: Dict[str, Any]) -> ScoringProfile:
+        """Compile a just-written document so this worker uses it right away."""
+        key = str(doc["organization_id"])
+        current = self._compiled.get(key)
+        if current is None or current.version < doc.get("version", 0):
+            self._compiled[key] = compile_scoring_profile(doc)
+        return self._compiled[key]
+
+    async def refresh(self, db: AsyncIOMotorDatabase) -> int:
+        """Recompile profiles changed since the last refresh; returns how many changed."""
+        since = datetime.min if self._watermark is None else self._watermark - REFRESH_OVERLAP
+        changed = 0
+        async for doc in db[SCORING_PROFILES].find({"updated_at": {"$gte": since}}):
+            if self._watermark is None or doc["updated_at"] > self._watermark:
+                self._watermark = doc["updated_at"]
+            current = self._compiled.get(str(doc["organization_id"]))
+            if current is not None and current.version >= doc.get("version", 0):
+                continue
+            try:
+                self.put(doc)
+            except (TypeError, ValueError):
+                logger.exception("Invalid scoring profile for org %s", doc["organization_id"])
+                continue
+            changed += 1
+        return changed
+
+
+scoring_profiles = ScoringProfiles()
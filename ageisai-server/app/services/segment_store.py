@@ -0,0 +1,217 @@
+"""
+Content-addressed storage for LLM prompt and response text.
+
+With `llm_segment_storage` enabled, prompts and responses are split at the
+last blank line into a prefix (system prompt, instructions, history) and a
+final paragraph (usually the user's message). Each part of at least
+`segment_min_chars` is stored once per org in `text_segments`, zlib-compressed
+and keyed by a hash of its content; shorter parts stay inline. Events keep
+`prompt_segments` / `response_segments` lists whose entries are either a
+16-byte segment id or an inline string. A system prompt shared by every event
+is then stored once and costs each event one reference.
+
+Each segment also stores its risk pattern counts. The scorer sums per-segment
+counts and only scans text it has not seen before.
+
+With a raw event TTL, segments carry an `expire_at` that a TTL index acts on.
+Storing an event pushes the expiry of every segment it references to
+`raw_event_ttl_days + segment_refresh_hours` from now, at most once per
+`segment_refresh_hours` per segment and process. A segment therefore outlives
+every event that references it and is removed once none has been stored for
+the raw event TTL.
+"""
+import hashlib
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import Binary
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.risk import DEFAULT_SCORING, ScoringProfile
+from app.services.llm_risk_classifier import scan_llm_text, score_llm_counts
+
+
+SEGMENTS = "text_segments"
+TEXT_FIELDS = ("prompt", "response")
+
+# (sensitive, jailbreak, length) per segment id; a hit means the segment is
+# already stored and scanned.
+SegmentScan = Tuple[int, int, int]
+
+_settings = get_settings()
+_known_segments: TTLCache[SegmentScan] = TTLCache(_settings.segment_cache_max_entries)
+# Segments this process stored or re-dated within segment_refresh_hours: they
+# exist and their expiry is recent enough, so new references skip the write.
+_fresh_segments: TTLCache[bool] = TTLCache(
+    _settings.segment_cache_max_entries,
+    ttl_seconds=_settings.segment_refresh_hours * 3600 if _settings.raw_event_ttl_days > 0 else None,
+)
+
+
+def split_segments(text: str) -> List[str]:
+    """Split after the last blank line; the parts concatenate back to `text`."""
+    cut = text.rfind("\n\n")
+    if cut < 0:
+        return [text]
+    return [part for part in (text[: cut + 2], text[cut + 2 :]) if part]
+
+
+def segment_id(org_id, text: str) -> bytes:
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(str(org_id).encode("ascii"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.digest()
+
+
+def _expire_at(now: datetime) -> Optional[datetime]:
+    settings = get_settings()
+    if settings.raw_event_ttl_days <= 0:
+        return None
+    return now + timedelta(days=settings.raw_event_ttl_days, hours=settings.segment_refresh_hours)
+
+
+def _scan(text: str) -> SegmentScan:
+    sensitive, jailbreak = scan_llm_text(text)
+    return sensitive, jailbreak, len(text)
+
+
+async def store_llm_bodies(db: AsyncIOMotorDatabase, org_id, docs: List[Dict[str, Any]]) -> None:
+    """
+    Replace prompt/response text in `docs` with segment references and make
+    sure every referenced segment exists, with an expiry past the events',
+    before the events are inserted. Texts shorter than `segment_min_chars`
+    stay inline.
+    """
+    min_chars = get_settings().segment_min_chars
+    new_segments: Dict[bytes, str] = {}
+    for doc in docs:
+        for field in TEXT_FIELDS:
+            text = doc.get(field)
+            if not text or len(text) < min_chars:
+                continue
+            refs: List[Any] = []
+            for part in split_segments(text):
+                if len(part) < min_chars:
+                    refs.append(part)
+                    continue
+                sid = segment_id(org_id, part)
+                if sid not in new_segments and _fresh_segments.get(sid) is None:
+                    new_segments[sid] = part
+                refs.append(Binary(sid))
+            del doc[field]
+            doc[f"{field}_segments"] = refs
+
+    if not new_segments:
+        return
+    now = datetime.utcnow()
+    expire_at = _expire_at(now)
+    ops = []
+    scans: Dict[bytes, SegmentScan] = {}
+    for sid, text in new_segments.items():
+        scan = scans[sid] = _known_segments.get(sid) or _scan(text)
+        # Upserted even when known: the stored copy may have expired since.
+        update: Dict[str, Any] = {
+            "$setOnInsert": {
+                "organization_id": org_id,
+                "data": Binary(zlib.compress(text.encode("utf-8"), 6)),
+                "length": scan[2],
+                "scan": {"sensitive": scan[0], "jailbreak": scan[1]},
+                "created_at": now,
+            }
+        }
+        if expire_at is not None:
+            update["$max"] = {"expire_at": expire_at}
+        ops.append(UpdateOne({"_id": Binary(sid)}, update, upsert=True))
+    try:
+        await db[SEGMENTS].bulk_write(ops, ordered=False)
+    except BulkWriteError as exc:
+        # Two batches upserting the same new segment race on _id; the loser's
+        # duplicate-key error just means the segment is already stored.
+        if any(err.get("code") != 11000 for err in exc.details.get("writeErrors", [])):
+            raise
+    for sid, scan in scans.items():
+        _known_segments.put(sid, scan)
+        _fresh_segments.put(sid, True)
+
+
+async def _segment_scans(db: AsyncIOMotorDatabase, ids: Iterable[bytes]) -> Dict[bytes, SegmentScan]:
+    scans: Dict[bytes, SegmentScan] = {}
+    missing = []
+    for sid in set(ids):
+        scan = _known_segments.get(sid)
+        if scan is None:
+            missing.append(Binary(sid))
+        else:
+            scans[sid] = scan
+    if missing:
+        cursor = db[SEGMENTS].find({"_id": {"$in": missing}}, projection={"scan": 1, "length": 1})
+        async for seg in cursor:
+            scan = (seg["scan"]["sensitive"], seg["scan"]["jailbreak"], seg["length"])
+            scans[bytes(seg["_id"])] = scan
+            _known_segments.put(bytes(seg["_id"]), scan)
+    return scans
+
+
+def _segment_ids(refs: Iterable[Any]) -> List[bytes]:
+    return [bytes(ref) for ref in refs if not isinstance(ref, str)]
+
+
+def is_segmented(doc: Dict[str, Any]) -> bool:
+    return any(f"{field}_segments" in doc for field in TEXT_FIELDS)
+
+
+async def compute_segmented_llm_risk(
+    db: AsyncIOMotorDatabase,
+    doc: Dict[str, Any],
+    profile: ScoringProfile = DEFAULT_SCORING,
+) -> dict:
+    """
+    compute_llm_risk for an event stored by `store_llm_bodies`, summing the
+    cached pattern counts of its segments. Matches that would straddle a
+    segment boundary are not counted.
+    """
+    ids = [sid for field in TEXT_FIELDS for sid in _segment_ids(doc.get(f"{field}_segments", []))]
+    scans = await _segment_scans(db, ids)
+    sensitive = jailbreak = 0
+    lengths = {}
+    for field in TEXT_FIELDS:
+        if f"{field}_segments" in doc:
+            field_scans = [
+                _scan(ref) if isinstance(ref, str) else scans.get(bytes(ref), (0, 0, 0))
+                for ref in doc[f"{field}_segments"]
+            ]
+        else:
+            field_scans = [_scan(doc.get(field) or "")]
+        sensitive += sum(scan[0] for scan in field_scans)
+        jailbreak += sum(scan[1] for scan in field_scans)
+        lengths[field] = sum(scan[2] for scan in field_scans)
+    return score_llm_counts(sensitive, jailbreak, lengths["prompt"], profile)
+
+
+async def load_llm_bodies(db: AsyncIOMotorDatabase, docs: List[Dict[str, Any]]) -> None:
+    """Reassemble prompt/response text in place for segmented event documents."""
+    ids = {
+        sid
+        for doc in docs
+        for field in TEXT_FIELDS
+        for sid in _segment_ids(doc.get(f"{field}_segments", []))
+    }
+    texts: Dict[bytes, str] = {}
+    if ids:
+        cursor = db[SEGMENTS].find({"_id": {"$in": [Binary(sid) for sid in ids]}}, projection={"data": 1})
+        async for seg in cursor:
+            texts[bytes(seg["_id"])] = zlib.decompress(seg["data"]).decode("utf-8")
+    for doc in docs:
+        for field in TEXT_FIELDS:
+            refs: Optional[List[Any]] = doc.pop(f"{field}_segments", None)
+            if refs is not None:
+                doc[field] = "".join(
+                    ref if isinstance(ref, str) else texts.get(bytes(ref), "")
+                    for ref in refs
+                )
@@ -0,0 +1,345 @@
+"""
+Outbound alert delivery to org webhooks.
+
+`_insert_alert` passes every new alert to `webhook_notifier.notify`. That call
+only puts the alert on a bounded queue and never waits on the network, so
+creating an alert costs the same with or without webhooks. One dispatcher task
+reads the queue, looks up the org's destinations (cached) and buffers alerts
+per destination. A destination's buffer is posted as a single
+{"organization_id": ..., "alerts": [...]} request once it is
+`webhook_batch_window_seconds` old or holds `webhook_max_batch` alerts.
+
+All deliveries share one pooled httpx.AsyncClient. Each destination has:
+
+- a concurrency limit;
+- retries with exponential backoff for 429s, 5xx responses and network errors;
+- a circuit breaker: after `webhook_breaker_failures` failed deliveries in a
+  row, the destination is skipped for `webhook_breaker_reset_seconds`, then a
+  single delivery is let through to probe it.
+
+Alerts for a skipped destination are dropped and counted. They stay in the
+alerts collection either way.
+
+Webhook URLs must be https and their host must resolve only to public
+addresses, so an org cannot point the server at loopback, link-local (cloud
+metadata) or private-network services. `check_webhook_url` runs when a
+webhook is registered and again before every delivery, since DNS can change
+in between. Hosts in `webhook_allowed_hosts` (e.g. a stub server in tests)
+skip the check.
+
+With a secret set, each body is signed:
+X-AegisAI-Signature: sha256=<hex HMAC-SHA256 of the body>.
+"""
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import logging
+import random
+import socket
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import httpx
+import orjson
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import PyMongoError
+
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.metrics import Counter, registry
+
+
+logger = logging.getLogger("aegisai.webhooks")
+
+WEBHOOKS = "webhooks"
+SIGNATURE_HEADER = "X-AegisAI-Signature"
+SEVERITY_RANK = {"warning": 0, "critical": 1}
+# Longest Retry-After a destination can make a retry wait.
+MAX_RETRY_AFTER_SECONDS = 30.0
+
+webhook_alerts = registry.register(
+    Counter(
+        "aegisai_webhook_alerts_total",
+        "Alerts handled by webhook delivery, by outcome "
+        "(delivered, failed, queue_full, circuit_open, blocked).",
+        ("outcome",),
+    )
+)
+webhook_requests = registry.register(
+    Counter("aegisai_webhook_requests_total", "Webhook POST attempts by result.", ("result",))
+)
+
+
+class UnsafeWebhookURL(ValueError):
+    """A webhook URL the server must not post to."""
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def check_webhook_url(url: str) -> None:
+    """
+    Raise UnsafeWebhookURL unless `url` is https and every address its host
+    resolves to is public. Hosts in webhook_allowed_hosts are not checked.
+    """
+    parsed = httpx.URL(url)
+    host = parsed.host.lower()
+    if host in {allowed.lower() for allowed in get_settings().webhook_allowed_hosts}:
+        return
+    if parsed.scheme != "https":
+        raise UnsafeWebhookURL("webhook URLs must use https")
+    if not host:
+        raise UnsafeWebhookURL("webhook URL has no host")
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(
+            host, parsed.port or 443, type=socket.SOCK_STREAM
+        )
+    except socket.gaierror as exc:
+        raise UnsafeWebhookURL(f"cannot resolve {host}") from exc
+    for *_, sockaddr in infos:
+        if not _is_public(sockaddr[0]):
+            raise UnsafeWebhookURL(f"{host} resolves to a non-public address ({sockaddr[0]})")
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one probe) -> closed."""
+
+    def __init__(self, failures: int, reset_seconds: float):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if self._probing or time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self._probing or time.monotonic() - self.opened_at < self.reset_seconds:
+            return False
+        self._probing = True
+        return True
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._probing = False
+        if self.consecutive_failures >= self.failures:
+            self.opened_at = time.monotonic()
+
+
+class _Destination:
+    def __init__(self, org_key: str, webhook: Dict[str, Any]):
+        settings = get_settings()
+        self.org_key = org_key
+        self.update(webhook)
+        self.semaphore = asyncio.Semaphore(settings.webhook_max_concurrency_per_destination)
+        self.breaker = CircuitBreaker(settings.webhook_breaker_failures, settings.webhook_breaker_reset_seconds)
+        self.pending: List[Dict[str, Any]] = []
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def update(self, webhook: Dict[str, Any]) -> None:
+        self.url: str = webhook["url"]
+        self.secret: Optional[str] = webhook.get("secret")
+        self.min_rank = SEVERITY_RANK.get(webhook.get("min_severity", "warning"), 0)
+
+    def wants(self, alert: Dict[str, Any]) -> bool:
+        return SEVERITY_RANK.get(alert.get("severity"), 0) >= self.min_rank
+
+    def headers(self, body: bytes) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.secret:
+            digest = hmac.new(self.secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+            headers[SIGNATURE_HEADER] = f"sha256={digest}"
+        return headers
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return min(float(response.headers["retry-after"]), MAX_RETRY_AFTER_SECONDS)
+    except (KeyError, ValueError):
+        return None
+
+
+class WebhookNotifier:
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._deliveries: Set[asyncio.Task] = set()
+        # webhook _id -> destination; kept across config refreshes so breaker
+        # state and buffered alerts survive them.
+        self._destinations: Dict[str, _Destination] = {}
+        self._org_webhooks: TTLCache[List[str]] = TTLCache(10000)
+
+    def start(self, db: AsyncIOMotorDatabase, transport: Optional[httpx.AsyncBaseTransport] = None) -> None:
+        settings = get_settings()
+        self._queue = asyncio.Queue(maxsize=settings.webhook_queue_size)
+        self._org_webhooks = TTLCache(10000, ttl_seconds=settings.webhook_config_refresh_seconds)
+        self._client = httpx.AsyncClient(
+            timeout=settings.webhook_timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=settings.webhook_max_connections,
+                max_keepalive_connections=settings.webhook_max_connections,
+            ),
+            headers={"User-Agent": "AegisAI-Webhooks"},
+            transport=transport,
+        )
+        self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch(db))
+
+    async def stop(self, timeout: float = 5.0) -> None:
+        """Post whatever is buffered, wait up to `timeout` for deliveries, then close."""
+        if self._dispatcher is None:
+            return
+        self._dispatcher.cancel()
+        try:
+            await self._dispatcher
+        except asyncio.CancelledError:
+            pass
+        for destination in self._destinations.values():
+            if destination.pending:
+                self._flush(destination)
+        if self._deliveries:
+            _, unfinished = await asyncio.wait(self._deliveries, timeout=timeout)
+            for task in unfinished:
+                task.cancel()
+        await self._client.aclose()
+        self._dispatcher = None
+        self._client = None
+        self._queue = None
+        self._destinations.clear()
+
+    def notify(self, org_id, alert: Dict[str, Any]) -> None:
+        """Queue an alert for the org's webhooks. Never blocks; drops when the queue is full."""
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait((org_id, alert))
+        except asyncio.QueueFull:
+            webhook_alerts.inc("queue_full")
+
+    def invalidate(self, org_id) -> None:
+        """Re-read the org's webhooks on its next alert."""
+        self._org_webhooks.pop(str(org_id))
+
+    def circuit_state(self, webhook_id: str) -> Optional[str]:
+        destination = self._destinations.get(webhook_id)
+        return destination.breaker.state if destination is not None else None
+
+    async def _dispatch(self, db: AsyncIOMotorDatabase) -> None:
+        settings = get_settings()
+        loop = asyncio.get_running_loop()
+        while True:
+            org_id, alert = await self._queue.get()
+            try:
+                destinations = await self._destinations_for(db, org_id)
+            except PyMongoError:
+                logger.exception("Could not load webhooks for org %s", org_id)
+                webhook_alerts.inc("failed")
+                continue
+            for destination in destinations:
+                if not destination.wants(alert):
+                    continue
+                destination.pending.append(alert)
+                if len(destination.pending) >= settings.webhook_max_batch:
+                    self._flush(destination)
+                elif destination.flush_handle is None:
+                    destination.flush_handle = loop.call_later(
+                        settings.webhook_batch_window_seconds, self._flush, destination
+                    )
+
+    async def _destinations_for(self, db: AsyncIOMotorDatabase, org_id) -> List[_Destination]:
+        org_key = str(org_id)
+        keys = self._org_webhooks.get(org_key)
+        if keys is None:
+            keys = []
+            async for webhook in db[WEBHOOKS].find({"organization_id": org_id, "enabled": True}):
+                key = str(webhook["_id"])
+                if key in self._destinations:
+                    self._destinations[key].update(webhook)
+                else:
+                    self._destinations[key] = _Destination(org_key, webhook)
+                keys.append(key)
+            self._org_webhooks.put(org_key, keys)
+        return [self._destinations[key] for key in keys if key in self._destinations]
+
+    def _flush(self, destination: _Destination) -> None:
+        if destination.flush_handle is not None:
+            destination.flush_handle.cancel()
+            destination.flush_handle = None
+        alerts, destination.pending = destination.pending, []
+        if not alerts:
+            return
+        task = asyncio.get_running_loop().create_task(self._deliver(destination, alerts))
+        self._deliveries.add(task)
+        task.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, destination: _Destination, alerts: List[Dict[str, Any]]) -> None:
+        try:
+            await check_webhook_url(destination.url)
+        except UnsafeWebhookURL as exc:
+            webhook_alerts.inc("blocked", amount=len(alerts))
+            logger.warning("Webhook delivery of %d alerts to %s blocked: %s", len(alerts), destination.url, exc)
+            return
+        body = orjson.dumps({"organization_id": destination.org_key, "alerts": alerts})
+        async with destination.semaphore:
+            # Checked after waiting for a slot, so queued deliveries see the
+            # outcome of the ones ahead of them.
+            if not destination.breaker.allow():
+                webhook_alerts.inc("circuit_open", amount=len(alerts))
+                return
+            delivered, error = await self._post(destination, body)
+        if delivered:
+            destination.breaker.record_success()
+            webhook_alerts.inc("delivered", amount=len(alerts))
+        else:
+            destination.breaker.record_failure()
+            webhook_alerts.inc("failed", amount=len(alerts))
+            logger.warning(
+                "Webhook delivery of %d alerts to %s failed: %s", len(alerts), destination.url, error
+            )
+
+    async def _post(self, destination: _Destination, body: bytes) -> Tuple[bool, str]:
+        settings = get_settings()
+        headers = destination.headers(body)
+        error = ""
+        for attempt in range(settings.webhook_max_retries + 1):
+            try:
+                response = await self._client.post(destination.url, content=body, headers=headers)
+            except httpx.HTTPError as exc:
+                webhook_requests.inc("error")
+                error = repr(exc)
+                wait = None
+            else:
+                webhook_requests.inc(f"{response.status_code // 100}xx")
+                if response.status_code < 300:
+                    return True, ""
+                error = f"HTTP {response.status_code}"
+                if response.status_code != 429 and response.status_code < 500:
+                    return False, error
+                wait = _retry_after(response)
+            if attempt < settings.webhook_max_retries:
+                if wait is None:
+                    # Jitter keeps retries to one destination from lining up.
+                    wait = settings.webhook_retry_backoff_seconds * 2**attempt * random.uniform(0.5, 1.5)
+                await asyncio.sleep(wait)
+        return False, error
+
+
+webhook_notifier = WebhookNotifier()
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from app.core.config import get_settings
+from app.db.mongo import close_mongo_connection, connect_to_mongo, get_db
+from app.services.risk_counter_service import rebuild_all_risk_counters
+from app.services.scoring_profiles import scoring_profiles
+
+
+logger = logging.getLogger("aegisai.workers")
+
+_stop_event: Optional[asyncio.Event] = None
+
+
+async def _reconcile_risk_counters() -> None:
+    try:
+        orgs = await rebuild_all_risk_counters(get_db())
+        logger.info("Reconciled risk counters for %d organizations", orgs)
+    except Exception:
+        logger.exception("Risk counter reconciliation failed")
+
+
+async def _refresh_scoring_profiles() -> None:
+    try:
+        changed = await scoring_profiles.refresh(get_db())
+        if changed:
+            logger.info("Reloaded %d scoring profiles", changed)
+    except Exception:
+        logger.exception("Scoring profile refresh failed")
+
+
+async def _every(interval: float, job: Callable[[], Awaitable[None]]) -> None:
+    while not _stop_event.is_set():
+        try:
+            await asyncio.wait_for(_stop_event.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            await job()
+
+
+async def start_periodic_tasks() -> None:
+    """Run periodic maintenance jobs until stop_periodic_tasks is called."""
+    global _stop_event
+    _stop_event = asyncio.Event()
+    settings = get_settings()
+    jobs = [
+        (settings.risk_counter_reconcile_interval_minutes * 60, _reconcile_risk_counters),
+        (settings.scoring_profile_refresh_seconds, _refresh_scoring_profiles),
+    ]
+    loops = [_every(interval, job) for interval, job in jobs if interval > 0]
+    if not loops:
+        await _stop_event.wait()
+        return
+    await asyncio.gather(*loops)
+
+
+async def stop_periodic_tasks() -> None:
+    if _stop_event is not None:
+        _stop_event.set()
+
+
+async def _reconcile_once() -> None:
+    await connect_to_mongo()
+    try:
+        await _reconcile_risk_counters()
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    # One-off rebuild, e.g. to backfill counters after upgrading:
+    #   python -m app.workers.background
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(message)s")
+    asyncio.run(_reconcile_once())
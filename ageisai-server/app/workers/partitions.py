@@ -0,0 +1,52 @@
+"""
+Helpers shared by the batch jobs that walk whole event collections
+(app.workers.rescore, app.workers.rollup_backfill).
+
+A collection is split into _id ranges cut evenly by ObjectId creation time,
+so the ranges can be walked concurrently and checkpointed one by one. A
+`ReadLimiter` shared by all ranges caps the events read per second, leaving
+Mongo headroom for live ingest.
+"""
+import asyncio
+from typing import Any, Dict, List
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from app.core.rate_limit import TokenBucket
+
+
+class ReadLimiter:
+    def __init__(self, events_per_second: float):
+        self.bucket = TokenBucket(events_per_second, events_per_second)
+
+    async def acquire(self, n: int) -> None:
+        while (wait := self.bucket.wait_time(n)) > 0:
+            await asyncio.sleep(wait)
+        self.bucket.consume(n)
+
+
+async def plan_partitions(
+    db: AsyncIOMotorDatabase,
+    name: str,
+    query: Dict[str, Any],
+    count: int,
+    **counters: int,
+) -> List[Dict[str, Any]]:
+    """
+    Split the matching _id range into `count` partitions, cut evenly by
+    ObjectId time. Each partition starts with `counters` (e.g. scored=0) for
+    the job's progress counts.
+    """
+    first = await db[name].find_one(query, sort=[("_id", 1)], projection={"_id": 1})
+    if first is None:
+        return []
+    last = await db[name].find_one(query, sort=[("_id", -1)], projection={"_id": 1})
+    start = first["_id"].generation_time
+    step = (last["_id"].generation_time - start) / count
+    cuts = sorted({ObjectId.from_datetime(start + step * i) for i in range(1, count)})
+    bounds = [None] + cuts + [None]
+    return [
+        {"lo": lo, "hi": hi, "last_id": None, **counters, "done": False}
+        for lo, hi in zip(bounds, bounds[1:])
+    ]
@@ -0,0 +1,320 @@
+"""
+Recompute riskScore/riskLabel of stored events after a scoring change.
+
+Usage:
+    python -m app.workers.rescore [--collections ml_events llm_events] [--org <org id>]
+        [--partitions 8] [--workers 4] [--batch-size 1000] [--max-events-per-second 2000] [--restart]
+
+Each collection is split into `--partitions` _id ranges, cut evenly by
+ObjectId creation time. The ranges are walked concurrently in _id order.
+Every batch is scored in a pool of worker processes with the same scorers
+ingest uses. Scores that changed are written back with one unordered
+bulk_write. Progress per partition is checkpointed in `migrations`, so
+re-running after an interruption resumes where each partition stopped;
+--restart starts over. A token bucket shared by all partitions caps the
+events read per second, leaving Mongo headroom for live ingest. Risk
+counters are rebuilt at the end.
+
+Events are scored with their org's current scoring profile, and ML events
+with each model's latest drift score and current model profile, not the
+ones in effect when they were ingested. With time-series storage the _id
+ranges are not index-backed, so batches are slower.
+"""
+import argparse
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from app.core.config import get_settings
+from app.core.risk import DEFAULT_SCORING, ScoringProfile
+from app.db.mongo import EVENT_COLLECTIONS, event_filter
+from app.services.feature_drift import event_features
+from app.services.llm_risk_classifier import compute_llm_risk
+from app.services.ml_risk_classifier import compute_ml_risk
+from app.services.risk_counter_service import rebuild_all_risk_counters, rebuild_risk_counters
+from app.services.scoring_profiles import scoring_profiles
+from app.services.segment_store import compute_segmented_llm_risk, is_segmented
+from app.workers.partitions import ReadLimiter, plan_partitions
+
+
+logger = logging.getLogger("aegisai.rescore")
+
+CHECKPOINT_PREFIX = "rescore:"
+PROJECTIONS = {
+    "ml_events": {
+        "organization_id": 1, "model_name": 1, "prediction": 1, "input_data": 1,
+        "riskScore": 1, "riskLabel": 1,
+    },
+    "llm_events": {
+        "organization_id": 1, "prompt": 1, "response": 1, "prompt_segments": 1, "response_segments": 1,
+        "riskScore": 1, "riskLabel": 1, "flags": 1,
+    },
+}
+
+ModelContext = Dict[Tuple[str, str], Tuple[float, Optional[Dict[str, Any]]]]
+# org id (str) -> compiled scoring profile, for the orgs in one batch
+OrgProfiles = Dict[str, ScoringProfile]
+Scorer = Callable[[List[Dict[str, Any]]], Awaitable[List[Dict[str, Any]]]]
+
+
+# Batch scorers; these run in the worker processes.
+
+
+def score_ml_batch(
+    events: List[Dict[str, Any]],
+    context: ModelContext,
+    profiles: OrgProfiles,
+) -> List[Dict[str, Any]]:
+    results = []
+    for event in events:
+        drift_score, feature_stats = context.get(event["key"], (0.0, None))
+        result = compute_ml_risk(
+            prediction=event["prediction"],
+            probabilities=event["probabilities"],
+            drift_score=drift_score,
+            feature_stats=feature_stats,
+            features=event["features"],
+            profile=profiles.get(event["key"][0], DEFAULT_SCORING),
+        )
+        results.append({"riskScore": result["riskScore"], "riskLabel": result["riskLabel"]})
+    return results
+
+
+def score_llm_batch(events: List[Tuple[str, str, str]], profiles: OrgProfiles) -> List[Dict[str, Any]]:
+    results = []
+    for org_key, prompt, response in events:
+        result = compute_llm_risk(
+            prompt=prompt, response=response, profile=profiles.get(org_key, DEFAULT_SCORING)
+        )
+        results.append(
+            {"riskScore": result["riskScore"], "riskLabel": result["riskLabel"], "flags": result.get("flags", [])}
+        )
+    return results
+
+
+class _MLScorer:
+    def __init__(self, db: AsyncIOMotorDatabase, pool: ProcessPoolExecutor):
+        self.db = db
+        self.pool = pool
+        self.context: ModelContext = {}
+
+    async def _load_context(self, org_id, model_name: str) -> None:
+        latest = await self.db["drift_metrics"].find_one(
+            {"organization_id": org_id, "model_name": model_name},
+            sort=[("created_at", -1)],
+            projection={"drift_score": 1},
+        )
+        profile = await self.db["model_profiles"].find_one(
+            {"organization_id": org_id, "model_name": model_name},
+            projection={"feature_stats": 1},
+        )
+        self.context[(str(org_id), model_name)] = (
+            latest["drift_score"] if latest else 0.0,
+            profile.get("feature_stats") if profile else None,
+        )
+
+    async def __call__(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        events = []
+        for doc in batch:
+            key = (str(doc.get("organization_id")), doc.get("model_name"))
+            if key not in self.context:
+                await self._load_context(doc.get("organization_id"), doc.get("model_name"))
+            events.append(
+                {
+                    "key": key,
+                    "prediction": doc.get("prediction"),
+                    "probabilities": (doc.get("input_data") or {}).get("probabilities"),
+                    "features": event_features(doc) or None,
+                }
+            )
+        context = {event["key"]: self.context[event["key"]] for event in events}
+        profiles = {org_key: scoring_profiles.get(org_key) for org_key, _ in context}
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, score_ml_batch, events, context, profiles)
+
+
+class _LLMScorer:
+    def __init__(self, db: AsyncIOMotorDatabase, pool: ProcessPoolExecutor):
+        self.db = db
+        self.pool = pool
+
+    async def __call__(self, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        results: List[Optional[Dict[str, Any]]] = [None] * len(batch)
+        plain = [i for i, doc in enumerate(batch) if not is_segmented(doc)]
+        events = [
+            (str(batch[i].get("organization_id")), batch[i].get("prompt") or "", batch[i].get("response") or "")
+            for i in plain
+        ]
+        profiles = {org_key: scoring_profiles.get(org_key) for org_key, _, _ in events}
+        loop = asyncio.get_running_loop()
+        scored = await loop.run_in_executor(self.pool, score_llm_batch, events, profiles)
+        for i, result in zip(plain, scored):
+            results[i] = result
+        # Segmented events reuse the stored per-segment pattern counts; no text scan.
+        for i, doc in enumerate(batch):
+            if results[i] is None:
+                result = await compute_segmented_llm_risk(
+                    self.db, doc, scoring_profiles.get(doc.get("organization_id"))
+                )
+                results[i] = {
+                    "riskScore": result["riskScore"],
+                    "riskLabel": result["riskLabel"],
+                    "flags": result.get("flags", []),
+                }
+        return results  # type: ignore[return-value]
+
+
+def _changed(doc: Dict[str, Any], result: Dict[str, Any]) -> bool:
+    return any(doc.get(field) != value for field, value in result.items())
+
+
+async def _rescore_partition(
+    db: AsyncIOMotorDatabase,
+    name: str,
+    checkpoint_id: str,
+    index: int,
+    partition: Dict[str, Any],
+    query: Dict[str, Any],
+    score: Scorer,
+    limiter: ReadLimiter,
+    batch_size: int,
+) -> None:
+    last_id = partition["last_id"]
+    scored = partition["scored"]
+    updated = partition["updated"]
+    while True:
+        id_range: Dict[str, Any] = {}
+        if last_id is not None:
+            id_range["$gt"] = last_id
+        elif partition["lo"] is not None:
+            id_range["$gte"] = partition["lo"]
+        if partition["hi"] is not None:
+            id_range["$lt"] = partition["hi"]
+        batch_query = {**query, "_id": id_range} if id_range else query
+
+        await limiter.acquire(batch_size)
+        batch = (
+            await db[name]
+            .find(batch_query, projection=PROJECTIONS[name])
+            .sort("_id", 1)
+            .limit(batch_size)
+            .to_list(length=batch_size)
+        )
+        if not batch:
+            break
+        results = await score(batch)
+        ops = [
+            UpdateOne({"_id": doc["_id"]}, {"$set": result})
+            for doc, result in zip(batch, results)
+            if _changed(doc, result)
+        ]
+        if ops:
+            await db[name].bulk_write(ops, ordered=False)
+        last_id = batch[-1]["_id"]
+        scored += len(batch)
+        updated += len(ops)
+        await db["migrations"].update_one(
+            {"_id": checkpoint_id},
+            {
+                "$set": {
+                    f"partitions.{index}.last_id": last_id,
+                    f"partitions.{index}.scored": scored,
+                    f"partitions.{index}.updated": updated,
+                }
+            },
+        )
+    await db["migrations"].update_one(
+        {"_id": checkpoint_id}, {"$set": {f"partitions.{index}.done": True}}
+    )
+    logger.info("%s partition %d: %d scored, %d updated", name, index, scored, updated)
+
+
+async def rescore_collection(
+    db: AsyncIOMotorDatabase,
+    name: str,
+    score: Scorer,
+    limiter: ReadLimiter,
+    org_id: Optional[ObjectId] = None,
+    partitions: int = 8,
+    batch_size: int = 1000,
+    restart: bool = False,
+) -> Tuple[int, int]:
+    """Rescore one event collection; returns (events scored, events updated) over the whole run."""
+    checkpoints = db["migrations"]
+    checkpoint_id = f"{CHECKPOINT_PREFIX}{name}"
+    query: Dict[str, Any] = event_filter({"organization_id": org_id}) if org_id is not None else {}
+
+    state = None if restart else await checkpoints.find_one({"_id": checkpoint_id})
+    if state is not None and state.get("done"):
+        state = None
+    if state is not None and state.get("organization_id") != org_id:
+        raise RuntimeError(
+            f"{name}: an unfinished rescore for a different --org exists; pass --restart to discard it"
+        )
+    if state is None:
+        state = {
+            "_id": checkpoint_id,
+            "organization_id": org_id,
+            "partitions": await plan_partitions(db, name, query, partitions, scored=0, updated=0),
+            "started_at": datetime.utcnow(),
+            "done": False,
+        }
+        await checkpoints.replace_one({"_id": checkpoint_id}, state, upsert=True)
+    else:
+        logger.info("%s: resuming rescore started at %s", name, state["started_at"])
+
+    await asyncio.gather(
+        *(
+            _rescore_partition(db, name, checkpoint_id, i, part, query, score, limiter, batch_size)
+            for i, part in enumerate(state["partitions"])
+            if not part["done"]
+        )
+    )
+    await checkpoints.update_one({"_id": checkpoint_id}, {"$set": {"done": True}})
+    final = await checkpoints.find_one({"_id": checkpoint_id})
+    parts = final["partitions"] if final else []
+    return sum(p["scored"] for p in parts), sum(p["updated"] for p in parts)
+
+
+async def main(args: argparse.Namespace) -> None:
+    settings = get_settings()
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    org_id = ObjectId(args.org) if args.org else None
+    limiter = ReadLimiter(args.max_events_per_second)
+    try:
+        db = client[settings.mongo_db_name]
+        await scoring_profiles.refresh(db)
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            scorers = {"ml_events": _MLScorer(db, pool), "llm_events": _LLMScorer(db, pool)}
+            for name in args.collections:
+                scored, updated = await rescore_collection(
+                    db, name, scorers[name], limiter, org_id, args.partitions, args.batch_size, args.restart
+                )
+                logger.info("%s: rescore complete (%d scored, %d updated)", name, scored, updated)
+        if org_id is not None:
+            await rebuild_risk_counters(db, org_id)
+        else:
+            await rebuild_all_risk_counters(db)
+        logger.info("Risk counters rebuilt")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--collections", nargs="+", default=list(EVENT_COLLECTIONS), choices=list(EVENT_COLLECTIONS))
+    parser.add_argument("--org", help="only rescore this organization's events")
+    parser.add_argument("--partitions", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--max-events-per-second", type=float, default=2000.0, help="0 disables the limit")
+    parser.add_argument("--restart", action="store_true", help="discard checkpoints and start over")
+    args = parser.parse_args()
+    asyncio.run(main(args))
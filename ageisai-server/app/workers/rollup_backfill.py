@@ -0,0 +1,178 @@
+"""
+Build event_rollups from raw events stored before rollups existed.
+
+Usage:
+    python -m app.workers.rollup_backfill [--collections ml_events llm_events] [--until <ISO time>]
+        [--partitions 8] [--batch-size 5000] [--max-events-per-second 20000]
+
+Run once after upgrading to a version with rollups. Only events created
+before the cutoff are folded in; events after it were already rolled up at
+ingest. The cutoff defaults to the creation time of the oldest rollup
+document (or now, when there are none yet); pass --until with the time the
+upgraded servers started taking traffic to set it explicitly.
+
+Each collection is split into _id ranges that are walked concurrently, the
+same way as app.workers.rescore (see app.workers.partitions). Every batch is
+folded per (org, model, bucket) and written with one unordered bulk_write.
+Minute and hour buckets already past their retention are skipped. Progress is checkpointed per
+partition in `migrations` and a finished backfill is not run again, so
+re-running after an interruption resumes it. Rollups are additive: an
+interruption between a batch's write and its checkpoint counts that one
+batch twice. With time-series storage the _id ranges are not index-backed,
+so batches are slower.
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from app.core.config import get_settings
+from app.db.mongo import EVENT_COLLECTIONS
+from app.services.rollup_service import ROLLUPS, fold_rollups, rollup_updates, to_utc_naive
+from app.workers.partitions import ReadLimiter, plan_partitions
+
+
+logger = logging.getLogger("aegisai.rollup_backfill")
+
+CHECKPOINT_PREFIX = "rollup_backfill:"
+SOURCES = {"ml_events": "ml", "llm_events": "llm"}
+PROJECTION = {"organization_id": 1, "model_name": 1, "timestamp": 1, "latency_ms": 1, "error": 1}
+
+
+async def default_cutoff(db: AsyncIOMotorDatabase) -> datetime:
+    """When rollups started being written: the creation time of the oldest rollup document."""
+    oldest = await db[ROLLUPS].find_one({}, sort=[("_id", 1)], projection={"_id": 1})
+    if oldest is None:
+        return datetime.utcnow()
+    return to_utc_naive(oldest["_id"].generation_time)
+
+
+async def _backfill_partition(
+    db: AsyncIOMotorDatabase,
+    name: str,
+    checkpoint_id: str,
+    index: int,
+    partition: Dict[str, Any],
+    limiter: ReadLimiter,
+    batch_size: int,
+) -> None:
+    source = SOURCES[name]
+    last_id = partition["last_id"]
+    folded = partition["folded"]
+    while True:
+        id_range: Dict[str, Any] = {"$lt": partition["hi"]}
+        if last_id is not None:
+            id_range["$gt"] = last_id
+        elif partition["lo"] is not None:
+            id_range["$gte"] = partition["lo"]
+
+        await limiter.acquire(batch_size)
+        batch = (
+            await db[name]
+            .find({"_id": id_range}, projection=PROJECTION)
+            .sort("_id", 1)
+            .limit(batch_size)
+            .to_list(length=batch_size)
+        )
+        if not batch:
+            break
+        by_org: Dict[Any, List[Dict[str, Any]]] = {}
+        for doc in batch:
+            if doc.get("model_name") and doc.get("timestamp"):
+                by_org.setdefault(doc.get("organization_id"), []).append(doc)
+        ops = [
+            op
+            for org_id, docs in by_org.items()
+            for op in rollup_updates(org_id, source, fold_rollups(docs))
+        ]
+        if ops:
+            await db[ROLLUPS].bulk_write(ops, ordered=False)
+        last_id = batch[-1]["_id"]
+        folded += len(batch)
+        await db["migrations"].update_one(
+            {"_id": checkpoint_id},
+            {"$set": {f"partitions.{index}.last_id": last_id, f"partitions.{index}.folded": folded}},
+        )
+    await db["migrations"].update_one(
+        {"_id": checkpoint_id}, {"$set": {f"partitions.{index}.done": True}}
+    )
+    logger.info("%s partition %d: %d events folded", name, index, folded)
+
+
+async def backfill_collection(
+    db: AsyncIOMotorDatabase,
+    name: str,
+    limiter: ReadLimiter,
+    until: Optional[datetime] = None,
+    partitions: int = 8,
+    batch_size: int = 5000,
+) -> Tuple[int, bool]:
+    """Backfill rollups from one event collection; returns (events folded, whether this run did any work)."""
+    checkpoints = db["migrations"]
+    checkpoint_id = f"{CHECKPOINT_PREFIX}{name}"
+
+    state = await checkpoints.find_one({"_id": checkpoint_id})
+    if state is not None and state.get("done"):
+        return sum(p["folded"] for p in state["partitions"]), False
+    if state is None:
+        cutoff = until or await default_cutoff(db)
+        cutoff_id = ObjectId.from_datetime(cutoff)
+        parts = await plan_partitions(db, name, {"_id": {"$lt": cutoff_id}}, partitions, folded=0)
+        for part in parts:
+            # Bound the open-ended last range by the cutoff.
+            part["hi"] = part["hi"] or cutoff_id
+        state = {
+            "_id": checkpoint_id,
+            "cutoff": cutoff,
+            "partitions": parts,
+            "started_at": datetime.utcnow(),
+            "done": False,
+        }
+        await checkpoints.replace_one({"_id": checkpoint_id}, state, upsert=True)
+        logger.info("%s: backfilling rollups for events before %s", name, cutoff)
+    else:
+        logger.info("%s: resuming rollup backfill started at %s", name, state["started_at"])
+
+    await asyncio.gather(
+        *(
+            _backfill_partition(db, name, checkpoint_id, i, part, limiter, batch_size)
+            for i, part in enumerate(state["partitions"])
+            if not part["done"]
+        )
+    )
+    await checkpoints.update_one({"_id": checkpoint_id}, {"$set": {"done": True}})
+    final = await checkpoints.find_one({"_id": checkpoint_id})
+    return sum(p["folded"] for p in (final["partitions"] if final else [])), True
+
+
+async def main(args: argparse.Namespace) -> None:
+    settings = get_settings()
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    until = to_utc_naive(datetime.fromisoformat(args.until)) if args.until else None
+    limiter = ReadLimiter(args.max_events_per_second)
+    try:
+        db = client[settings.mongo_db_name]
+        for name in args.collections:
+            folded, ran = await backfill_collection(db, name, limiter, until, args.partitions, args.batch_size)
+            if ran:
+                logger.info("%s: rollup backfill complete (%d events folded)", name, folded)
+            else:
+                logger.info("%s: rollups already backfilled (%d events folded)", name, folded)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(message)s")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--collections", nargs="+", default=list(EVENT_COLLECTIONS), choices=list(EVENT_COLLECTIONS))
+    parser.add_argument("--until", help="only fold events created before this time (default: oldest rollup)")
+    parser.add_argument("--partitions", type=int, default=8)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--max-events-per-second", type=float, default=20000.0, help="0 disables the limit")
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,122 @@
+"""
+Measure the per-request cost of the auth dependencies on /ingest/ml.
+
+Usage:
+    python -m benchmarks.auth_overhead [--requests 20000] [--events 50]
+
+Drives POST /ingest/ml in-process through the ASGI app (requires httpx) with
+the database dependency swapped for a no-op stand-in, so only routing, auth,
+validation, serialization and task scheduling remain. Reports mean request
+time with the token cache cold (every request runs jwt.decode) and warm, next
+to the raw cost of the auth dependency chain, so the auth share is visible.
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime
+
+import httpx
+from bson import ObjectId
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.auth import jwt_utils
+from app.auth.dependencies import _get_payload_from_credentials, get_current_org_id
+from app.auth.jwt_utils import create_access_token
+from app.core.config import get_settings
+from app.db.mongo import get_db
+from app.main import app
+
+
+class _InsertResult:
+    def __init__(self, n: int):
+        self.inserted_ids = [ObjectId() for _ in range(n)]
+
+
+class _NullCollection:
+    """Accepts every collection call; background scoring tasks become no-ops."""
+
+    async def insert_many(self, docs, *args, **kwargs):
+        return _InsertResult(len(docs))
+
+    def __getattr__(self, name):
+        async def _noop(*args, **kwargs):
+            return None
+
+        return _noop
+
+
+class _NullDb:
+    def __getitem__(self, name):
+        return _NullCollection()
+
+
+async def _auth_chain(token: str, n: int) -> float:
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    start = time.perf_counter()
+    for _ in range(n):
+        payload = await _get_payload_from_credentials(creds)
+        await get_current_org_id(payload)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+async def _auth_chain_cold(token: str, n: int) -> float:
+    creds = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    start = time.perf_counter()
+    for _ in range(n):
+        jwt_utils._verified_tokens.clear()
+        payload = await _get_payload_from_credentials(creds)
+        await get_current_org_id(payload)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+async def _ingest(client: httpx.AsyncClient, token: str, body: dict, n: int, cold: bool) -> float:
+    headers = {"Authorization": f"Bearer {token}"}
+    start = time.perf_counter()
+    for _ in range(n):
+        if cold:
+            jwt_utils._verified_tokens.clear()
+        resp = await client.post("/ingest/ml", json=body, headers=headers)
+        resp.raise_for_status()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+async def main(n_requests: int, n_events: int) -> None:
+    app.dependency_overrides[get_db] = lambda: _NullDb()
+    # Measure auth, not ingest quotas.
+    settings = get_settings()
+    settings.ingest_default_events_per_second = 0
+    settings.ingest_default_bytes_per_second = 0
+    token = create_access_token("bench-client", extra_claims={"orgId": str(ObjectId())})
+    body = {
+        "events": [
+            {
+                "model_name": "bench-model",
+                "prediction": 1,
+                "input_data": {"features": {"a": 1.0, "b": 2.0}},
+                "latency_ms": 12.5,
+                "timestamp": datetime.utcnow().isoformat(),
+            }
+            for _ in range(n_events)
+        ]
+    }
+
+    jwt_utils._verified_tokens.clear()
+    cold_chain = await _auth_chain_cold(token, min(n_requests, 2000))
+    warm_chain = await _auth_chain(token, n_requests)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        cold_req = await _ingest(client, token, body, min(n_requests, 2000), cold=True)
+        warm_req = await _ingest(client, token, body, n_requests, cold=False)
+
+    print(f"{'':<22}{'auth chain us':>16}{'request us':>14}{'auth share':>12}")
+    print(f"{'cold (jwt.decode)':<22}{cold_chain:>16.1f}{cold_req:>14.1f}{cold_chain / cold_req:>12.1%}")
+    print(f"{'warm (cached)':<22}{warm_chain:>16.1f}{warm_req:>14.1f}{warm_chain / warm_req:>12.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark auth overhead on /ingest/ml")
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--events", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.events))
@@ -0,0 +1,128 @@
+"""
+Compare standard vs time-series storage for ml_events.
+
+Usage:
+    python -m benchmarks.event_storage [--events 200000] [--models 20] [--batch-size 1000]
+
+Writes synthetic events into two scratch databases (<db>_bench_standard and
+<db>_bench_timeseries) on MONGO_URI, then reports insert throughput, storage
+size from collStats and the latency of the 5-minute per-model window
+aggregation that drift detection runs. Scratch databases are dropped at the end.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from app.core.config import get_settings
+from app.db.mongo import EVENT_META_FIELD, timeseries_options
+
+
+def _make_events(n: int, org_ids: List[ObjectId], models: int) -> List[Dict[str, Any]]:
+    start = datetime.utcnow() - timedelta(hours=24)
+    step = timedelta(hours=24) / n
+    events = []
+    for i in range(n):
+        org_id = random.choice(org_ids)
+        model_name = f"model-{random.randrange(models)}"
+        events.append(
+            {
+                "organization_id": org_id,
+                "model_name": model_name,
+                "prediction": random.randint(0, 1),
+                "input_data": {"features": {f"f{j}": random.random() for j in range(8)}},
+                "latency_ms": random.lognormvariate(3.0, 0.5),
+                "timestamp": start + step * i,
+            }
+        )
+    return events
+
+
+async def _setup(db: AsyncIOMotorDatabase, mode: str) -> None:
+    await db.drop_collection("ml_events")
+    if mode == "timeseries":
+        await db.create_collection("ml_events", **timeseries_options())
+        keys = [
+            (f"{EVENT_META_FIELD}.organization_id", 1),
+            (f"{EVENT_META_FIELD}.model_name", 1),
+            ("timestamp", 1),
+        ]
+    else:
+        keys = [("organization_id", 1), ("model_name", 1), ("timestamp", 1)]
+    await db["ml_events"].create_index(keys)
+
+
+async def _insert(db: AsyncIOMotorDatabase, mode: str, events, batch_size: int) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(events), batch_size):
+        batch = [dict(e) for e in events[i : i + batch_size]]
+        if mode == "timeseries":
+            for doc in batch:
+                doc[EVENT_META_FIELD] = {
+                    "organization_id": doc["organization_id"],
+                    "model_name": doc["model_name"],
+                }
+        await db["ml_events"].insert_many(batch, ordered=False)
+    return time.perf_counter() - start
+
+
+async def _window_latency(db: AsyncIOMotorDatabase, mode: str, org_ids, models: int, runs: int) -> float:
+    prefix = f"{EVENT_META_FIELD}." if mode == "timeseries" else ""
+    end = datetime.utcnow()
+    timings = []
+    for _ in range(runs):
+        window_end = end - timedelta(minutes=random.randrange(24 * 60))
+        pipeline = [
+            {
+                "$match": {
+                    f"{prefix}organization_id": random.choice(org_ids),
+                    f"{prefix}model_name": f"model-{random.randrange(models)}",
+                    "timestamp": {"$gte": window_end - timedelta(minutes=5), "$lte": window_end},
+                }
+            },
+            {"$group": {"_id": None, "mean_latency_ms": {"$avg": "$latency_ms"}}},
+        ]
+        start = time.perf_counter()
+        await db["ml_events"].aggregate(pipeline).to_list(length=1)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+async def main(n_events: int, models: int, batch_size: int, runs: int) -> None:
+    settings = get_settings()
+    client = AsyncIOMotorClient(settings.mongo_uri)
+    org_ids = [ObjectId() for _ in range(5)]
+    events = _make_events(n_events, org_ids, models)
+    print(f"{'mode':<12}{'insert/s':>12}{'storage MB':>12}{'index MB':>12}{'window p50 ms':>16}")
+    try:
+        for mode in ("standard", "timeseries"):
+            db = client[f"{settings.mongo_db_name}_bench_{mode}"]
+            await _setup(db, mode)
+            elapsed = await _insert(db, mode, events, batch_size)
+            stats = await db.command({"collStats": "ml_events"})
+            window_ms = await _window_latency(db, mode, org_ids, models, runs)
+            print(
+                f"{mode:<12}{n_events / elapsed:>12.0f}"
+                f"{stats.get('storageSize', 0) / 1e6:>12.1f}"
+                f"{stats.get('totalIndexSize', 0) / 1e6:>12.1f}"
+                f"{window_ms:>16.2f}"
+            )
+            await client.drop_database(db.name)
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark event storage modes")
+    parser.add_argument("--events", type=int, default=200_000)
+    parser.add_argument("--models", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.events, args.models, args.batch_size, args.runs))
@@ -0,0 +1,139 @@
+"""
+Compare the old and new request-side CPU cost of /ingest/llm and /ingest/ml.
+
+Usage:
+    python -m benchmarks.ingest_parsing [--events 1000] [--rounds 200]
+
+"before" is the previous path: stdlib json decoding, one pydantic model per
+event, then a hand-written copy into insertable dicts. "after" is the current
+path: orjson decoding and a TypedDict TypeAdapter that validates straight into
+dicts. Both produce the same documents; no database is involved.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+import orjson
+from bson import ObjectId
+
+from app.api.routes.ingest import approximate_token_count
+from app.schemas.ingest import (
+    LLMEventBatch,
+    MLEventBatch,
+    llm_event_batch_adapter,
+    ml_event_batch_adapter,
+)
+
+
+def _llm_body(n: int) -> bytes:
+    words = ["model", "token", "prompt", "safety", "latency", "user", "answer"]
+    events = [
+        {
+            "model_name": f"llm-{i % 4}",
+            "prompt": " ".join(random.choices(words, k=60)),
+            "response": " ".join(random.choices(words, k=200)),
+            "latency_ms": random.uniform(50, 900),
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        for i in range(n)
+    ]
+    return json.dumps({"events": events}).encode("utf-8")
+
+
+def _ml_body(n: int) -> bytes:
+    events = [
+        {
+            "model_name": f"model-{i % 4}",
+            "prediction": random.randint(0, 1),
+            "input_data": {"features": {f"f{j}": random.random() for j in range(8)}},
+            "latency_ms": random.uniform(1, 50),
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        for i in range(n)
+    ]
+    return json.dumps({"events": events}).encode("utf-8")
+
+
+def llm_before(body: bytes, org_id: ObjectId) -> List[Dict[str, Any]]:
+    payload = LLMEventBatch.model_validate(json.loads(body))
+    return [
+        {
+            "organization_id": org_id,
+            "model_name": event.model_name,
+            "prompt": event.prompt,
+            "response": event.response,
+            "latency_ms": event.latency_ms,
+            "token_count": approximate_token_count(event.prompt + event.response),
+            "timestamp": event.timestamp,
+        }
+        for event in payload.events
+    ]
+
+
+def llm_after(body: bytes, org_id: ObjectId) -> List[Dict[str, Any]]:
+    docs = llm_event_batch_adapter.validate_python(orjson.loads(body))["events"]
+    now = datetime.utcnow()
+    for doc in docs:
+        doc["organization_id"] = org_id
+        doc["token_count"] = approximate_token_count(doc["prompt"] + doc["response"])
+        doc.setdefault("timestamp", now)
+    return docs
+
+
+def ml_before(body: bytes, org_id: ObjectId) -> List[Dict[str, Any]]:
+    payload = MLEventBatch.model_validate(json.loads(body))
+    return [
+        {
+            "organization_id": org_id,
+            "model_name": event.model_name,
+            "prediction": event.prediction,
+            "input_data": event.input_data,
+            "latency_ms": event.latency_ms,
+            "timestamp": event.timestamp,
+        }
+        for event in payload.events
+    ]
+
+
+def ml_after(body: bytes, org_id: ObjectId) -> List[Dict[str, Any]]:
+    docs = ml_event_batch_adapter.validate_python(orjson.loads(body))["events"]
+    now = datetime.utcnow()
+    for doc in docs:
+        doc["organization_id"] = org_id
+        doc.setdefault("timestamp", now)
+    return docs
+
+
+def _time(func: Callable, body: bytes, rounds: int) -> float:
+    org_id = ObjectId()
+    func(body, org_id)
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func(body, org_id)
+    return (time.perf_counter() - start) / rounds * 1e3
+
+
+def main(n_events: int, rounds: int) -> None:
+    print(f"{'batch':<10}{'KiB':>8}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    for name, body, before, after in (
+        ("llm", _llm_body(n_events), llm_before, llm_after),
+        ("ml", _ml_body(n_events), ml_before, ml_after),
+    ):
+        assert before(body, ObjectId("0" * 24)) == after(body, ObjectId("0" * 24))
+        t_before = _time(before, body, rounds)
+        t_after = _time(after, body, rounds)
+        print(
+            f"{name:<10}{len(body) / 1024:>8.0f}{t_before:>12.2f}{t_after:>12.2f}"
+            f"{t_before / t_after:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ingest body parsing")
+    parser.add_argument("--events", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    main(args.events, args.rounds)
@@ -0,0 +1,162 @@
+"""
+Measure webhook alert delivery against a local stub HTTP server.
+
+Usage:
+    python -m benchmarks.webhook_delivery [--alerts 5000] [--destinations 4] [--fail-rate 0.0]
+
+Starts a minimal keep-alive HTTP server on 127.0.0.1 that counts POSTs and
+the alerts in their bodies, and optionally answers a share of them with 503.
+The notifier reads its destinations from an in-memory stand-in for the
+webhooks collection; 127.0.0.1 is added to webhook_allowed_hosts for the run. Runs the same alerts twice: one POST per alert
+(batching off) and coalesced with the configured window. Reports POSTs sent,
+alerts received and delivery time. With --fail-rate, retries and the
+circuit breaker are exercised too.
+"""
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+import orjson
+from bson import ObjectId
+
+from app.core.config import get_settings
+from app.services.webhook_notifier import WebhookNotifier, webhook_alerts
+
+
+class _StubServer:
+    def __init__(self, fail_rate: float):
+        self.fail_rate = fail_rate
+        self.posts = 0
+        self.alerts = 0
+        self.server = None
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n")[1:]:
+                    name, _, value = line.partition(b":")
+                    if name.strip().lower() == b"content-length":
+                        length = int(value)
+                body = await reader.readexactly(length)
+                self.posts += 1
+                if random.random() < self.fail_rate:
+                    status = b"503 Service Unavailable"
+                else:
+                    status = b"204 No Content"
+                    self.alerts += len(orjson.loads(body)["alerts"])
+                writer.write(b"HTTP/1.1 " + status + b"\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+class _Cursor:
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class _WebhooksDb:
+    """Stand-in for the webhooks collection: the same destinations for every org."""
+
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = docs
+
+    def __getitem__(self, name):
+        return self
+
+    def find(self, *args, **kwargs):
+        return _Cursor(self.docs)
+
+
+def _outcomes() -> Dict[str, float]:
+    return {k: webhook_alerts._values.get((k,), 0.0) for k in ("delivered", "failed", "circuit_open")}
+
+
+async def _run(n_alerts: int, n_destinations: int, fail_rate: float, batched: bool) -> None:
+    settings = get_settings()
+    window, max_batch = settings.webhook_batch_window_seconds, settings.webhook_max_batch
+    allowed_hosts = settings.webhook_allowed_hosts
+    settings.webhook_allowed_hosts = ["127.0.0.1"]
+    if not batched:
+        settings.webhook_batch_window_seconds, settings.webhook_max_batch = 0.0, 1
+    server = _StubServer(fail_rate)
+    port = await server.start()
+    db = _WebhooksDb(
+        [
+            {"_id": ObjectId(), "url": f"http://127.0.0.1:{port}/hook/{i}", "secret": "bench-secret-0123456789"}
+            for i in range(n_destinations)
+        ]
+    )
+    before = _outcomes()
+    notifier = WebhookNotifier()
+    notifier.start(db)
+    org_id = ObjectId()
+    start = time.perf_counter()
+    try:
+        for i in range(n_alerts):
+            notifier.notify(
+                org_id,
+                {
+                    "id": str(ObjectId()),
+                    "model_name": "bench-model",
+                    "type": "risk",
+                    "message": f"Risky ml event #{i}",
+                    "severity": "critical",
+                    "created_at": datetime.utcnow(),
+                    "resolved": False,
+                },
+            )
+            if i % 100 == 0:
+                await asyncio.sleep(0)
+        # Let the dispatcher drain the queue, then flush and wait for delivery.
+        while not notifier._queue.empty():
+            await asyncio.sleep(0.01)
+        await notifier.stop(timeout=60.0)
+    finally:
+        await server.stop()
+        settings.webhook_batch_window_seconds, settings.webhook_max_batch = window, max_batch
+        settings.webhook_allowed_hosts = allowed_hosts
+    elapsed = time.perf_counter() - start
+    outcomes = {k: v - before[k] for k, v in _outcomes().items()}
+    label = "batched" if batched else "one per alert"
+    print(
+        f"{label:<16}{server.posts:>8}{server.alerts:>10}{outcomes['delivered']:>11.0f}"
+        f"{outcomes['failed']:>8.0f}{outcomes['circuit_open']:>8.0f}{elapsed:>10.2f}"
+    )
+
+
+async def main(n_alerts: int, n_destinations: int, fail_rate: float) -> None:
+    print(f"{'':<16}{'POSTs':>8}{'received':>10}{'delivered':>11}{'failed':>8}{'open':>8}{'seconds':>10}")
+    await _run(n_alerts, n_destinations, fail_rate, batched=False)
+    await _run(n_alerts, n_destinations, fail_rate, batched=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark webhook alert delivery")
+    parser.add_argument("--alerts", type=int, default=5000)
+    parser.add_argument("--destinations", type=int, default=4)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.alerts, args.destinations, args.fail_rate))
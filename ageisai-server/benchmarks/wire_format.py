@@ -0,0 +1,109 @@
+"""
+Compare JSON rows against columnar MessagePack for SDK ingest batches.
+
+Usage:
+    python -m benchmarks.wire_format [--events 50,1000] [--rounds 200]
+
+Encodes the same synthetic ML and LLM batches the way ageisai/sender.py does
+for each WIRE_FORMAT, then reports bytes on the wire (raw and gzip) and the
+server-side CPU to decode and validate each body into insert documents, using
+the same functions as /ingest/ml and /ingest/llm. No database is involved.
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import msgpack
+import orjson
+
+from app.api.routes.ingest import validate_batch
+from app.schemas.ingest import (
+    llm_column_batch_adapter,
+    llm_event_batch_adapter,
+    ml_column_batch_adapter,
+    ml_event_batch_adapter,
+)
+
+
+def _ml_events(n: int) -> List[Dict[str, Any]]:
+    now = time.time()
+    return [
+        {
+            "model_name": f"model-{i % 4}",
+            "prediction": random.randint(0, 1),
+            "input_data": {"features": {f"f{j}": random.random() for j in range(8)}},
+            "latency_ms": random.uniform(1, 50),
+            "timestamp": now + i * 0.01,
+        }
+        for i in range(n)
+    ]
+
+
+def _llm_events(n: int) -> List[Dict[str, Any]]:
+    words = ["model", "token", "prompt", "safety", "latency", "user", "answer"]
+    now = time.time()
+    return [
+        {
+            "model_name": f"llm-{i % 4}",
+            "prompt": " ".join(random.choices(words, k=60)),
+            "response": " ".join(random.choices(words, k=200)),
+            "latency_ms": random.uniform(50, 900),
+            "timestamp": now + i * 0.01,
+        }
+        for i in range(n)
+    ]
+
+
+def encode_json(events: List[Dict[str, Any]]) -> bytes:
+    return json.dumps({"events": events}).encode("utf-8")
+
+
+def encode_msgpack(events: List[Dict[str, Any]]) -> bytes:
+    columns = {key: [event[key] for event in events] for key in events[0]}
+    return msgpack.packb({"columns": columns}, use_bin_type=True)
+
+
+def _decode_time(decode: Callable[[], Any], rounds: int) -> float:
+    decode()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        decode()
+    return (time.perf_counter() - start) / rounds * 1e3
+
+
+def _row(name: str, body: bytes, ms: float, base: Tuple[int, float]) -> str:
+    return (
+        f"{name:<20}{len(body):>10}{len(gzip.compress(body)):>10}"
+        f"{len(body) / base[0]:>8.0%}{ms:>10.3f}{ms / base[1]:>8.0%}"
+    )
+
+
+def main(sizes: List[int], rounds: int) -> None:
+    print(f"{'batch':<20}{'bytes':>10}{'gzip':>10}{'size':>8}{'ms':>10}{'cpu':>8}")
+    for size in sizes:
+        for source, events, adapter, column_adapter in (
+            ("ml", _ml_events(size), ml_event_batch_adapter, ml_column_batch_adapter),
+            ("llm", _llm_events(size), llm_event_batch_adapter, llm_column_batch_adapter),
+        ):
+            as_json = encode_json(events)
+            as_msgpack = encode_msgpack(events)
+            json_ms = _decode_time(
+                lambda: validate_batch(adapter, column_adapter, orjson.loads(as_json)), rounds
+            )
+            msgpack_ms = _decode_time(
+                lambda: validate_batch(adapter, column_adapter, msgpack.unpackb(as_msgpack)), rounds
+            )
+            base = (len(as_json), json_ms)
+            print(_row(f"{source} x{size} json", as_json, json_ms, base))
+            print(_row(f"{source} x{size} msgpack", as_msgpack, msgpack_ms, base))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ingest wire formats")
+    parser.add_argument("--events", default="50,1000", help="comma-separated batch sizes")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+    main([int(n) for n in args.events.split(",")], args.rounds)
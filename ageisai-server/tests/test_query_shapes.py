@@ -0,0 +1,137 @@
+"""
+The query-shape registry against the code and against a real mongod.
+
+The static checks always run. The explain-plan checks need a reachable
+MONGO_URI and are skipped without one; each QueryShape is explained in both
+event storage layouts.
+"""
+import asyncio
+from pathlib import Path
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import PyMongoError
+
+from app.core.config import get_settings
+from app.db.explain_check import APP_ROOT, check_shape, prepare, query_sites, unregistered_queries
+from app.db.indexes import QUERY_SHAPES, QueryShape, query_shapes
+
+
+LAYOUTS = {"standard": "", "timeseries": "meta."}
+
+
+def test_every_query_has_a_shape():
+    assert unregistered_queries(APP_ROOT, QUERY_SHAPES) == []
+
+
+def test_shape_names_are_unique():
+    names = [shape.name for shape in QUERY_SHAPES]
+    assert len(names) == len(set(names))
+
+
+def _write_app(tmp_path: Path, code: str) -> Path:
+    root = tmp_path / "app"
+    root.mkdir()
+    (root / "names.py").write_text('ROLLUPS = "event_rollups"\n')
+    (root / "queries.py").write_text(code)
+    return root
+
+
+def test_collections_resolve_through_constants_and_fstrings(tmp_path):
+    root = _write_app(
+        tmp_path,
+        "from app.names import ROLLUPS\n"
+        "COUNTERS = 'risk_counters'\n"
+        "async def read(db, source):\n"
+        "    await db[ROLLUPS].find_one({'organization_id': 1})\n"
+        "    coll = db[COUNTERS]\n"
+        "    await coll.find({'scope': 'org'}).to_list(None)\n"
+        "    await db[f'{source}_events'].count_documents({})\n"
+        "    await db['alerts'].find_one({'_id': 1})\n",
+    )
+    known = {"event_rollups", "risk_counters", "ml_events", "llm_events", "alerts"}
+    sites = query_sites(root, known)
+    assert [(site.key, sorted(site.collections)) for site in sites] == [
+        ("queries.read", ["event_rollups"]),
+        ("queries.read", ["risk_counters"]),
+        ("queries.read", ["llm_events", "ml_events"]),
+    ]
+
+
+def test_unregistered_query_is_reported(tmp_path):
+    root = _write_app(
+        tmp_path,
+        "from app.names import ROLLUPS\n"
+        "async def read(db):\n"
+        "    await db[ROLLUPS].find_one({'organization_id': 1})\n"
+        "async def write(db):\n"
+        "    await db[ROLLUPS].update_one({'organization_id': 1}, {'$set': {'x': 1}})\n",
+    )
+    shapes = [
+        QueryShape("queries.read", "event_rollups", {"organization_id": 1}),
+        QueryShape("queries.write.other", "alerts", {"organization_id": 1}),
+    ]
+    problems = unregistered_queries(root, shapes)
+    assert len(problems) == 1
+    assert "queries.write shapes do not cover event_rollups" in problems[0]
+
+
+def test_helpers_taking_a_collection_count_at_the_caller(tmp_path):
+    root = _write_app(
+        tmp_path,
+        "async def _page(collection, query):\n"
+        "    return await collection.find(query).to_list(None)\n"
+        "async def list_alerts(db):\n"
+        "    return await _page(db['alerts'], {'organization_id': 1})\n",
+    )
+    sites = query_sites(root, {"alerts"})
+    assert [(site.key, site.method, sorted(site.collections)) for site in sites] == [
+        ("queries.list_alerts", "_page", ["alerts"])
+    ]
+
+
+# Explain plans against a real server.
+
+
+@pytest.fixture(scope="module")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="module")
+def scratch(loop):
+    settings = get_settings()
+    client = AsyncIOMotorClient(settings.mongo_uri, serverSelectionTimeoutMS=1000, io_loop=loop)
+    try:
+        loop.run_until_complete(client.admin.command("ping"))
+    except PyMongoError:
+        client.close()
+        pytest.skip(f"no mongod reachable at {settings.mongo_uri}")
+    prepared = {}
+
+    def get(layout: str):
+        if layout not in prepared:
+            db = client[f"{settings.mongo_db_name}_test_query_shapes_{layout}"]
+            shapes = query_shapes(LAYOUTS[layout])
+            loop.run_until_complete(prepare(db, shapes, timeseries=layout == "timeseries"))
+            prepared[layout] = db
+        return prepared[layout]
+
+    yield get
+    for db in prepared.values():
+        loop.run_until_complete(client.drop_database(db.name))
+    client.close()
+
+
+@pytest.mark.parametrize(
+    "layout,shape",
+    [
+        pytest.param(layout, shape, id=f"{layout}:{shape.name}")
+        for layout, prefix in LAYOUTS.items()
+        for shape in query_shapes(prefix)
+    ],
+)
+def test_shape_uses_an_index(loop, scratch, layout, shape):
+    assert loop.run_until_complete(check_shape(scratch(layout), shape)) == []
@@ -0,0 +1,304 @@
+"""
+Webhook delivery against an httpx.MockTransport: batching, severity
+filtering, retries, the circuit breaker and the URL checks.
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+import httpx
+import orjson
+import pytest
+from bson import ObjectId
+
+from app.core.config import get_settings
+from app.services.webhook_notifier import (
+    CircuitBreaker,
+    UnsafeWebhookURL,
+    WebhookNotifier,
+    check_webhook_url,
+    webhook_alerts,
+)
+
+
+HOOK_HOST = "hooks.test"
+ORG = ObjectId()
+
+
+class _Cursor:
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = docs
+
+    def __aiter__(self):
+        return self._iter()
+
+    async def _iter(self):
+        for doc in self.docs:
+            yield doc
+
+
+class _WebhooksDb:
+    """Stand-in for the webhooks collection."""
+
+    def __init__(self, docs: List[Dict[str, Any]]):
+        self.docs = docs
+
+    def __getitem__(self, name):
+        return self
+
+    def find(self, query):
+        return _Cursor([doc for doc in self.docs if doc["organization_id"] == query["organization_id"]])
+
+
+def _webhook(path: str = "/hook", **fields) -> Dict[str, Any]:
+    return {"_id": ObjectId(), "organization_id": ORG, "url": f"https://{HOOK_HOST}{path}", **fields}
+
+
+def _alert(severity: str = "critical") -> Dict[str, Any]:
+    return {
+        "id": str(ObjectId()),
+        "model_name": "m1",
+        "type": "risk",
+        "message": "Risky ml event",
+        "severity": severity,
+        "created_at": datetime.utcnow(),
+        "resolved": False,
+    }
+
+
+class _Recorder:
+    """Mock transport handler: records POSTs and answers from `responses`, then 204."""
+
+    def __init__(self, responses: List[httpx.Response] = ()):
+        self.responses = list(responses)
+        self.requests: List[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.responses.pop(0) if self.responses else httpx.Response(204)
+
+    def batches(self, path: str = "/hook") -> List[int]:
+        return [len(orjson.loads(r.content)["alerts"]) for r in self.requests if r.url.path == path]
+
+
+@pytest.fixture(autouse=True)
+def webhook_settings(monkeypatch):
+    settings = get_settings()
+    for name, value in {
+        "webhook_allowed_hosts": [HOOK_HOST],
+        "webhook_batch_window_seconds": 0.01,
+        "webhook_max_batch": 100,
+        "webhook_max_retries": 0,
+        "webhook_retry_backoff_seconds": 0.0,
+        "webhook_max_concurrency_per_destination": 1,
+        "webhook_breaker_failures": 5,
+        "webhook_breaker_reset_seconds": 60.0,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    return settings
+
+
+def _outcomes() -> Dict[str, float]:
+    return dict(webhook_alerts._values)
+
+
+def _delta(before: Dict[str, float], outcome: str) -> float:
+    return webhook_alerts._values.get((outcome,), 0.0) - before.get((outcome,), 0.0)
+
+
+async def _settle(notifier: WebhookNotifier) -> None:
+    """Wait until the dispatcher has taken every queued alert."""
+    while not notifier._queue.empty():
+        await asyncio.sleep(0)
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def _drain(notifier: WebhookNotifier) -> None:
+    """Wait for the queued alerts and every delivery started so far."""
+    await _settle(notifier)
+    if notifier._deliveries:
+        await asyncio.wait(notifier._deliveries)
+
+
+def _run(webhooks: List[Dict[str, Any]], recorder: Callable, scenario) -> WebhookNotifier:
+    async def main():
+        notifier = WebhookNotifier()
+        notifier.start(_WebhooksDb(webhooks), transport=httpx.MockTransport(recorder))
+        try:
+            await scenario(notifier)
+            await _settle(notifier)
+        finally:
+            await notifier.stop()
+        return notifier
+
+    return asyncio.run(main())
+
+
+def test_alerts_are_coalesced_up_to_the_batch_size(webhook_settings):
+    webhook_settings.webhook_max_batch = 3
+    recorder = _Recorder()
+
+    async def scenario(notifier):
+        for _ in range(7):
+            notifier.notify(ORG, _alert())
+
+    _run([_webhook()], recorder, scenario)
+    assert recorder.batches() == [3, 3, 1]
+    body = orjson.loads(recorder.requests[0].content)
+    assert body["organization_id"] == str(ORG)
+
+
+def test_window_flushes_a_partial_batch():
+    recorder = _Recorder()
+
+    async def scenario(notifier):
+        notifier.notify(ORG, _alert())
+        notifier.notify(ORG, _alert())
+        await _settle(notifier)
+        await asyncio.sleep(0.05)
+        assert recorder.batches() == [2]
+
+    _run([_webhook()], recorder, scenario)
+    assert recorder.batches() == [2]
+
+
+def test_min_severity_filters_per_destination():
+    recorder = _Recorder()
+
+    async def scenario(notifier):
+        for severity in ("warning", "critical", "warning"):
+            notifier.notify(ORG, _alert(severity))
+
+    _run(
+        [_webhook("/all"), _webhook("/critical", min_severity="critical")],
+        recorder,
+        scenario,
+    )
+    assert recorder.batches("/all") == [3]
+    assert recorder.batches("/critical") == [1]
+
+
+def test_signature_header_when_secret_set():
+    recorder = _Recorder()
+
+    async def scenario(notifier):
+        notifier.notify(ORG, _alert())
+
+    _run([_webhook(secret="s" * 16)], recorder, scenario)
+    assert recorder.requests[0].headers["X-AegisAI-Signature"].startswith("sha256=")
+
+
+def test_retries_honour_retry_after(webhook_settings):
+    webhook_settings.webhook_max_retries = 2
+    # Backoff alone would wait far longer than the test allows.
+    webhook_settings.webhook_retry_backoff_seconds = 30.0
+    recorder = _Recorder(
+        [
+            httpx.Response(503, headers={"Retry-After": "0"}),
+            httpx.Response(429, headers={"Retry-After": "0.01"}),
+        ]
+    )
+    before = _outcomes()
+
+    async def scenario(notifier):
+        notifier.notify(ORG, _alert())
+
+    start = time.monotonic()
+    _run([_webhook()], recorder, scenario)
+    assert time.monotonic() - start < 5
+    assert len(recorder.requests) == 3
+    assert _delta(before, "delivered") == 1
+
+
+def test_client_errors_are_not_retried(webhook_settings):
+    webhook_settings.webhook_max_retries = 3
+    recorder = _Recorder([httpx.Response(400)])
+    before = _outcomes()
+
+    async def scenario(notifier):
+        notifier.notify(ORG, _alert())
+
+    _run([_webhook()], recorder, scenario)
+    assert len(recorder.requests) == 1
+    assert _delta(before, "failed") == 1
+
+
+def test_breaker_opens_then_probes_and_closes(webhook_settings):
+    webhook_settings.webhook_max_batch = 1
+    webhook_settings.webhook_breaker_failures = 2
+    webhook_settings.webhook_breaker_reset_seconds = 0.05
+    hook = _webhook()
+    recorder = _Recorder([httpx.Response(500), httpx.Response(500)])
+    before = _outcomes()
+
+    async def scenario(notifier):
+        for _ in range(3):
+            notifier.notify(ORG, _alert())
+        await _drain(notifier)
+        # Two failures opened the circuit; the third alert never hit the wire.
+        assert len(recorder.requests) == 2
+        assert notifier.circuit_state(str(hook["_id"])) == "open"
+        assert _delta(before, "circuit_open") == 1
+
+        await asyncio.sleep(0.06)
+        assert notifier.circuit_state(str(hook["_id"])) == "half_open"
+        notifier.notify(ORG, _alert())
+        await _drain(notifier)
+        assert len(recorder.requests) == 3
+        assert notifier.circuit_state(str(hook["_id"])) == "closed"
+
+    _run([hook], recorder, scenario)
+    assert _delta(before, "failed") == 2
+    assert _delta(before, "delivered") == 1
+
+
+def test_breaker_lets_one_probe_through():
+    breaker = CircuitBreaker(failures=1, reset_seconds=0.0)
+    breaker.record_failure()
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "http://93.184.216.34/hook",
+        "https://127.0.0.1/hook",
+        "https://169.254.169.254/latest/meta-data",
+        "https://10.0.0.5/hook",
+        "https://192.168.1.1/hook",
+        "https://[::1]/hook",
+        "https://[::ffff:127.0.0.1]/hook",
+        "https://0.0.0.0/hook",
+        "https://localhost/hook",
+    ],
+)
+def test_unsafe_urls_are_refused(url):
+    with pytest.raises(UnsafeWebhookURL):
+        asyncio.run(check_webhook_url(url))
+
+
+def test_public_https_url_is_accepted():
+    asyncio.run(check_webhook_url("https://93.184.216.34/hook"))
+
+
+def test_allowed_hosts_skip_the_checks(webhook_settings):
+    webhook_settings.webhook_allowed_hosts = ["127.0.0.1"]
+    asyncio.run(check_webhook_url("http://127.0.0.1:8080/hook"))
+
+
+def test_delivery_to_unsafe_url_is_blocked(webhook_settings):
+    recorder = _Recorder()
+    before = _outcomes()
+
+    async def scenario(notifier):
+        notifier.notify(ORG, _alert())
+
+    _run([{**_webhook(), "url": "https://169.254.169.254/hook"}], recorder, scenario)
+    assert recorder.requests == []
+    assert _delta(before, "blocked") == 1